@@ -0,0 +1,6 @@
+"""Benchmarks of the topology NApp.
+
+Synthetic topologies built with kytos.core objects are fed to ``Main``
+running against an in-memory stand-in controller and storehouse. Run them
+with ``python3 -m napps.kytos.topology.benchmarks --help``.
+"""
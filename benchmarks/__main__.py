@@ -0,0 +1,6 @@
+"""Run the benchmarks from the command line."""
+import sys
+
+from napps.kytos.topology.benchmarks.runner import main
+
+sys.exit(main())
@@ -0,0 +1,153 @@
+"""In-memory stand-ins for the Kytos controller and the storehouse NApp."""
+import re
+from collections import Counter
+from uuid import uuid4
+
+__all__ = ('Connection', 'MemoryStorehouse', 'StandInController',
+           'synchronous')
+
+
+class Connection:
+    """Connection of a switch, as carried by `connection.lost` events."""
+
+    def __init__(self, switch):
+        self.switch = switch
+
+
+class _Box:
+    """Storehouse box, with the attributes read by the NApp."""
+
+    def __init__(self, namespace, data):
+        self.namespace = namespace
+        self.box_id = uuid4().hex
+        self.data = data
+
+
+class MemoryStorehouse:
+    """Answer the storehouse events of the NApp from memory.
+
+    Callbacks are called in the thread sending the event, as if storehouse
+    answered instantly.
+    """
+
+    def __init__(self):
+        self.boxes = {}
+
+    def handle(self, event):
+        """Answer a `kytos.storehouse.*` event through its callback."""
+        content = event.content
+        namespace = content['namespace']
+        action = event.name.rsplit('.', 1)[-1]
+        if action == 'list':
+            data = [box.box_id for box in self.boxes.get(namespace, {})
+                    .values()]
+        elif action == 'create':
+            box = _Box(namespace, dict(content.get('data', {})))
+            self.boxes.setdefault(namespace, {})[box.box_id] = box
+            data = box
+        elif action == 'retrieve':
+            data = self.boxes[namespace][content['box_id']]
+        elif action == 'update':
+            box = self.boxes[namespace][content['box_id']]
+            box.data.update(content['data'])
+            data = box
+        else:
+            raise ValueError(f'Unknown storehouse event {event.name}')
+        content['callback'](event, data, None)
+
+
+class _AppBuffer:
+    """Buffer of the events sent by the NApp.
+
+    Storehouse events are answered by the stand-in storehouse and events
+    listened to by the NApp are handed back to it synchronously; every
+    other event is only counted.
+    """
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.sent = Counter()
+
+    def put(self, event):
+        """Count an event and deliver it."""
+        self.sent[event.name] += 1
+        if event.name.startswith('kytos.storehouse.'):
+            self.controller.storehouse.handle(event)
+            return
+        self.controller.dispatch(event)
+
+
+class _Buffers:
+    def __init__(self, controller):
+        self.app = _AppBuffer(controller)
+
+
+class StandInController:
+    """The parts of the Kytos controller the topology NApp uses."""
+
+    def __init__(self, switches=None):
+        self.switches = dict(switches or {})
+        self.storehouse = MemoryStorehouse()
+        self.buffers = _Buffers(self)
+        self.napp = None
+        self.listeners = []
+
+    def add_new_switch(self, switch):
+        """Add a switch, as the controller does when one connects."""
+        self.switches[switch.id] = switch
+
+    def dispatch(self, event):
+        """Hand an event to the NApp handlers listening to it."""
+        for pattern, handler in self.listeners:
+            if pattern.match(event.name):
+                handler(event)
+
+    def load_napp(self, napp_class, listen=('kytos/topology.',)):
+        """Create a NApp and deliver it the events it sends to itself.
+
+        Only events starting with one of the ``listen`` prefixes are
+        delivered, and dispatched with :meth:`dispatch`. Pass ``('',)``
+        to deliver every event.
+        """
+        self.napp = napp_class(self)
+        self.listeners = [
+            (re.compile(pattern), synchronous(self.napp, name))
+            for name, pattern in _listened(type(self.napp))
+            if pattern.startswith(listen)]
+        return self.napp
+
+
+def _listened(napp_class):
+    """Yield the method names of a NApp class and the events they handle."""
+    for name in dir(napp_class):
+        for pattern in getattr(getattr(napp_class, name), 'events', ()):
+            yield name, pattern
+
+
+def synchronous(napp, name):
+    """Return an event handler of a NApp that runs in the calling thread.
+
+    `listen_to` runs handlers on other threads, so the function it wraps
+    is looked up through `__wrapped__` and the wrappers' closures: it is
+    the innermost function named after the method that is not itself
+    marked with the handled events.
+    """
+    qualname = f'{type(napp).__name__}.{name}'
+    pending = [getattr(type(napp), name)]
+    seen = set()
+    while pending:
+        func = pending.pop(0)
+        if id(func) in seen or not callable(func):
+            continue
+        seen.add(id(func))
+        if getattr(func, '__qualname__', None) == qualname and \
+                not hasattr(func, 'events'):
+            return func.__get__(napp)
+        if hasattr(func, '__wrapped__'):
+            pending.append(func.__wrapped__)
+        for cell in getattr(func, '__closure__', None) or ():
+            try:
+                pending.append(cell.cell_contents)
+            except ValueError:
+                pass
+    raise LookupError(f'No synchronous handler found for {qualname}')
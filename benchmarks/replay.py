@@ -0,0 +1,169 @@
+"""Replay a recorded event trace against the NApp, offline.
+
+Traces are recorded by the NApp when ``TRACE_FILE`` is set. Events are
+replayed at their original pace, N times faster, or as fast as possible,
+against the in-memory stand-in controller.
+"""
+import argparse
+import cProfile
+import json
+import logging
+import sys
+from time import perf_counter, sleep
+
+from kytos.core import KytosEvent
+from kytos.core.interface import Interface
+from kytos.core.switch import Switch
+
+from napps.kytos.topology import settings
+from napps.kytos.topology.benchmarks.controller import (Connection,
+                                                        StandInController)
+from napps.kytos.topology.benchmarks.runner import percentiles
+from napps.kytos.topology.tracing import read_trace
+
+__all__ = ('Replayer', 'main')
+
+
+class Replayer:
+    """Rebuild the objects referenced by a trace and hand its events over.
+
+    Switches and interfaces are created the first time they are
+    referenced, as the controller would when they connect.
+    """
+
+    def __init__(self, controller, napp):
+        self.controller = controller
+        self.napp = napp
+
+    def _switch(self, dpid):
+        switch = self.controller.switches.get(dpid)
+        if switch is None:
+            switch = Switch(dpid)
+            self.controller.add_new_switch(switch)
+        return switch
+
+    def _interface(self, dpid, port, name):
+        switch = self._switch(dpid)
+        interface = switch.interfaces.get(port)
+        if interface is None:
+            interface = Interface(name, port, switch)
+            switch.update_interface(interface)
+        return interface
+
+    def decode(self, reference):
+        """Return the object a trace reference stands for."""
+        if not isinstance(reference, list) or not reference:
+            return reference
+        kind = reference[0]
+        if kind == 'S':
+            switch = self._switch(reference[1])
+            for port, name in reference[2]:
+                self._interface(reference[1], port, name)
+            return switch
+        if kind == 'I':
+            return self._interface(*reference[1:])
+        if kind == 'L':
+            return self.napp._get_link_or_create(self.decode(reference[1]),
+                                                 self.decode(reference[2]))
+        if kind == 'C':
+            return Connection(self.decode(reference[1]))
+        return [self.decode(item) for item in reference]
+
+    def event(self, name, content):
+        """Return the event of a trace line, with its objects rebuilt.
+
+        The metadata carried by metadata events is set on their objects,
+        as it was when they were recorded.
+        """
+        content = {key: value if key == 'metadata' else self.decode(value)
+                   for key, value in content.items()}
+        metadata = content.get('metadata')
+        if metadata is not None:
+            for key, value in content.items():
+                if isinstance(value, list):
+                    for obj in value:
+                        obj.metadata = dict(metadata.get(obj.id, {}))
+                elif key != 'metadata':
+                    value.metadata = dict(metadata)
+        return KytosEvent(name=name, content=content)
+
+    def replay(self, records, speed=1.0):
+        """Hand the events over at ``speed`` times their original pace.
+
+        A speed of 0 replays them as fast as possible.
+
+        Returns:
+            list: The seconds taken to handle each event.
+        """
+        latencies = []
+        first = None
+        start = perf_counter()
+        for timestamp, name, content in records:
+            event = self.event(name, content)
+            if first is None:
+                first = timestamp
+            if speed:
+                delay = start + (timestamp - first) / speed - perf_counter()
+                if delay > 0:
+                    sleep(delay)
+            began = perf_counter()
+            self.controller.dispatch(event)
+            latencies.append(perf_counter() - began)
+        self.napp._topology_updates.flush()
+        self.napp._metadata_writes.flush()
+        self.napp._host_updates.flush()
+        return latencies
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m napps.kytos.topology.benchmarks.replay',
+        description='Replay a recorded event trace against the topology '
+                    'NApp.')
+    parser.add_argument('trace', help='trace file, read with its rotated '
+                                      'files')
+    parser.add_argument('-s', '--speed', type=float, default=1.0,
+                        help='times the original pace, 0 for as fast as '
+                             'possible')
+    parser.add_argument('--profile', help='file to write cProfile stats to')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Replay a trace and print the handling rate and latencies."""
+    args = _parse_args(argv)
+    # kytos.core reads its own options from the command line whenever an
+    # event is created.
+    sys.argv = sys.argv[:1]
+    logging.getLogger('kytos').setLevel(logging.ERROR)
+    from napps.kytos.topology.main import Main
+
+    settings.WARM_START_FILE = None
+    settings.LINK_AGING_TTL = None
+    settings.HOST_AGING_TTL = None
+    settings.TRACE_FILE = None
+    controller = StandInController()
+    napp = controller.load_napp(Main, listen=('',))
+    replayer = Replayer(controller, napp)
+
+    profile = cProfile.Profile() if args.profile else None
+    if profile:
+        profile.enable()
+    start = perf_counter()
+    latencies = replayer.replay(read_trace(args.trace), args.speed)
+    elapsed = perf_counter() - start
+    if profile:
+        profile.disable()
+        profile.dump_stats(args.profile)
+
+    results = {'events': len(latencies), 'seconds': round(elapsed, 6),
+               'sent': dict(controller.buffers.app.sent)}
+    if latencies:
+        results['per_second'] = round(len(latencies) / elapsed, 1)
+        results['latency'] = percentiles(latencies)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,472 @@
+"""Run the benchmarks and compare their results with a baseline."""
+import argparse
+import gc
+import json
+import logging
+import platform
+import random
+import resource
+import sys
+import tracemalloc
+import types
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from flask import Flask
+from kytos.core import KytosEvent
+
+from napps.kytos.topology import settings
+from napps.kytos.topology.benchmarks.controller import (Connection,
+                                                        StandInController,
+                                                        synchronous)
+from napps.kytos.topology.benchmarks.topologies import TOPOLOGIES
+from napps.kytos.topology.warm_start import write_snapshot
+
+__all__ = ('BASELINES', 'calibrate', 'compare', 'deep_size', 'main',
+           'percentiles', 'run')
+
+#: Directory of the baseline results, one file per topology.
+BASELINES = Path(__file__).parent / 'baselines'
+
+#: Latency changes in milliseconds too small to be told from noise.
+LATENCY_NOISE = 0.5
+
+#: Endpoints whose latency is measured, by the name of their view.
+ENDPOINTS = (('v3/', 'get_topology', ''),
+             ('v3/switches', 'get_switches', ''),
+             ('v3/interfaces', 'get_interfaces', ''),
+             ('v3/links', 'get_links', ''),
+             ('v3/links?limit=100', 'get_links', 'limit=100'))
+
+
+class _Memory:
+    """Peak memory allocated by Python while measuring, if traced."""
+
+    def __init__(self, trace):
+        self.trace = trace
+
+    def __enter__(self):
+        if self.trace and hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.peak = tracemalloc.get_traced_memory()[1] if self.trace \
+            else None
+
+
+#: Objects shared by every instance, left out of :func:`deep_size`.
+_SHARED = (type, types.ModuleType, types.FunctionType,
+           types.BuiltinFunctionType)
+
+
+def deep_size(*roots):
+    """Return the bytes taken by objects and every object they reference.
+
+    Objects referenced more than once are counted once. Classes, modules
+    and functions are not counted.
+    """
+    seen = set()
+    pending = list(roots)
+    size = 0
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, _SHARED):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        pending.extend(gc.get_referents(obj))
+    return size
+
+
+def calibrate(rounds=5):
+    """Return the seconds this machine takes to run a reference workload.
+
+    The workload encodes, decodes and sorts dicts, as the NApp does, and
+    the fastest round is kept. Results recorded on different machines are
+    compared through the ratio of their calibrations.
+    """
+    data = [{'id': f'{number:016x}', 'port': number,
+             'active': bool(number % 2), 'metadata': {'weight': number}}
+            for number in range(2000)]
+    best = None
+    for _ in range(rounds):
+        start = perf_counter()
+        for _ in range(10):
+            items = json.loads(json.dumps(data))
+            items.sort(key=lambda item: item['id'], reverse=True)
+            {item['id']: item for item in items}
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 6)
+
+
+def _rate(count, seconds, peak):
+    return {'count': count, 'seconds': round(seconds, 6),
+            'per_second': round(count / seconds, 1) if seconds else None,
+            'peak_memory': peak}
+
+
+def percentiles(latencies):
+    """Return the latency percentiles in milliseconds."""
+    latencies = sorted(latencies)
+
+    def percentile(fraction):
+        position = min(int(len(latencies) * fraction), len(latencies) - 1)
+        return round(latencies[position] * 1000, 3)
+
+    return {'p50': percentile(0.5), 'p90': percentile(0.9),
+            'p99': percentile(0.99), 'max': percentile(1)}
+
+
+class Benchmark:
+    """Drive ``Main`` with a synthetic topology and measure it."""
+
+    def __init__(self, topology, napp_class, requests=200,
+                 trace_memory=False, seed=0):
+        self.topology = topology
+        self.napp_class = napp_class
+        self.requests = requests
+        self.trace_memory = trace_memory
+        self.random = random.Random(seed)
+        self.app = Flask(__name__)
+        self.controller = None
+        self.napp = None
+        self.results = {'events': {}, 'requests': {}, 'memory': {}}
+
+    def _events(self, name, handler, events):
+        """Hand events to a handler and flush the pending notifications."""
+        handle = synchronous(self.napp, handler)
+        with _Memory(self.trace_memory) as memory:
+            start = perf_counter()
+            for event in events:
+                handle(event)
+            self.napp._topology_updates.flush()
+            self.napp._metadata_writes.flush()
+            elapsed = perf_counter() - start
+        self.results['events'][name] = _rate(len(events), elapsed,
+                                             memory.peak)
+
+    def run(self):
+        """Run every scenario and return the results."""
+        with _Memory(self.trace_memory) as memory:
+            start = perf_counter()
+            self.controller = StandInController(self.topology.switches)
+            self.napp = self.controller.load_napp(self.napp_class)
+            elapsed = perf_counter() - start
+        self.results['events']['setup'] = _rate(1, elapsed, memory.peak)
+
+        switches = list(self.topology.switches.values())
+        self._events('switch.new', 'handle_new_switch', [
+            KytosEvent(name='kytos/of_core.switch.new',
+                       content={'switch': switch})
+            for switch in switches])
+        self._events('interface.is.nni', 'add_links', [
+            KytosEvent(name='kytos/of_lldp.interface.is.nni',
+                       content={'interface_a': interface_a,
+                                'interface_b': interface_b})
+            for interface_a, interface_b in self.topology.links])
+        self._events('lldp.sweep', 'add_links', [
+            KytosEvent(name='kytos/of_lldp.interface.is.nni',
+                       content={'links': self.topology.links})
+            for _ in range(10)])
+
+        flaps = []
+        for interface, _ in self.random.sample(
+                self.topology.links, min(len(self.topology.links), 1000)):
+            for state in 'down', 'up':
+                flaps.append(KytosEvent(
+                    name=f'kytos/of_core.switch.interface.link_{state}',
+                    content={'interface': interface}))
+        self._events('interface.link_down', 'handle_interface_link_down',
+                     flaps[0::2])
+        self._events('interface.link_up', 'handle_interface_link_up',
+                     flaps[1::2])
+
+        self._notify_topology_update()
+        if self.trace_memory:
+            self._snapshot_memory()
+        self._save_metadata()
+        self._endpoints()
+        self._events('connection.lost', 'handle_connection_lost', [
+            KytosEvent(name='kytos/core.connection.lost',
+                       content={'source': Connection(switch)})
+            for switch in switches])
+        self._warm_start()
+        self.results['max_rss_kb'] = resource.getrusage(
+            resource.RUSAGE_SELF).ru_maxrss
+        return self.results
+
+    def _notify_topology_update(self):
+        """Notify every link as changed, as a burst of updates."""
+        links = list(self.napp.links.values())
+        with _Memory(self.trace_memory) as memory:
+            start = perf_counter()
+            for link in links:
+                self.napp.notify_topology_update(link)
+            self.napp._topology_updates.flush()
+            elapsed = perf_counter() - start
+        self.results['events']['notify_topology_update'] = _rate(
+            len(links), elapsed, memory.peak)
+
+    def _warm_start(self):
+        """Restore the discovered topology from a snapshot into a new NApp.
+
+        Setup only reads the snapshot and is measured on its own as
+        `warm_start.setup`; `warm_start` also waits for the objects to be
+        restored in the background.
+        """
+        switches = list(self.napp._get_switches().values())
+        links = list(self.napp.links.values())
+        count = len(switches) + len(links) + sum(len(switch.interfaces)
+                                                 for switch in switches)
+        with TemporaryDirectory() as directory:
+            settings.WARM_START_FILE = str(Path(directory) / 'warm_start.tsv')
+            write_snapshot(settings.WARM_START_FILE, 0, switches, links)
+            try:
+                with _Memory(self.trace_memory) as memory:
+                    start = perf_counter()
+                    napp = StandInController().load_napp(self.napp_class)
+                    loaded = perf_counter() - start
+                    napp._warm_start_restore.join()
+                    napp._topology_updates.flush()
+                    elapsed = perf_counter() - start
+                napp._warm_start_timer.cancel()
+            finally:
+                settings.WARM_START_FILE = None
+        self.results['events']['warm_start.setup'] = _rate(1, loaded, None)
+        self.results['events']['warm_start'] = _rate(count, elapsed,
+                                                     memory.peak)
+
+    def _snapshot_memory(self):
+        """Compare the size of the topology snapshot and of live objects.
+
+        The live topology is every switch, with its interfaces, and every
+        link, as kept by the controller and the NApp.
+        """
+        self.results['memory'] = {
+            'topology': deep_size(self.napp._get_switches(),
+                                  self.napp.links.snapshot()),
+            'snapshot': deep_size(self.napp.snapshot)}
+
+    def _save_metadata(self):
+        """Add metadata to links through REST, then write it to storehouse.
+
+        Metadata events reach `save_metadata_on_store` through the
+        stand-in controller, and the batched write is flushed at the end.
+        """
+        links = list(self.napp.links.values())[:self.requests]
+        latencies = []
+        with _Memory(self.trace_memory) as memory:
+            start = perf_counter()
+            for number, link in enumerate(links):
+                with self.app.test_request_context(
+                        f'/v3/links/{link.id}/metadata', method='POST',
+                        json={'weight': number}):
+                    began = perf_counter()
+                    self.napp.add_link_metadata(link.id)
+                    latencies.append(perf_counter() - began)
+            self.napp._metadata_writes.flush()
+            elapsed = perf_counter() - start
+        self.results['events']['save_metadata_on_store'] = _rate(
+            len(links), elapsed, memory.peak)
+        if latencies:
+            self.results['requests']['POST v3/links/{id}/metadata'] = {
+                'cold': percentiles(latencies)}
+
+    def _request(self, view, query_string):
+        with self.app.test_request_context(query_string=query_string):
+            began = perf_counter()
+            response = getattr(self.napp, view)()
+            if isinstance(response, tuple):
+                response = response[0]
+            response.get_data()
+            return perf_counter() - began
+
+    def _endpoints(self):
+        """Measure the latency of the list endpoints.
+
+        Cold requests follow a change to a random link, so the response
+        is rebuilt; warm requests are answered from the cache.
+        """
+        links = list(self.napp.links.values())
+        for path, view, query_string in ENDPOINTS:
+            cold = []
+            for _ in range(self.requests):
+                if links:
+                    self.napp.notify_topology_update(
+                        self.random.choice(links))
+                cold.append(self._request(view, query_string))
+            warm = [self._request(view, query_string)
+                    for _ in range(self.requests)]
+            self.results['requests'][path] = {
+                'cold': percentiles(cold), 'warm': percentiles(warm)}
+        self.napp._topology_updates.flush()
+
+
+def run(build, requests=200, trace_memory=False, seed=0):
+    """Return the benchmark results of a synthetic topology.
+
+    Timings come from a pass without memory tracing, which slows Python
+    down. With `trace_memory`, a second pass over a new topology adds the
+    peak memory of each scenario and the sizes of the live topology and of
+    its snapshot.
+
+    Timers started by the NApp are turned off: warm start snapshots, link
+    and host aging. Objects built before a pass, mostly the VLAN tags of
+    every interface, are moved out of reach of the garbage collector, whose
+    full collections would otherwise land at random in the timings.
+
+    Args:
+        build (callable): Returns a new topology, once per pass.
+    """
+    from napps.kytos.topology.main import Main
+
+    settings.WARM_START_FILE = None
+    settings.LINK_AGING_TTL = None
+    settings.HOST_AGING_TTL = None
+    topology = build()
+    gc.collect()
+    gc.freeze()
+    try:
+        results = Benchmark(topology, Main, requests, False, seed).run()
+        if trace_memory:
+            benchmark = Benchmark(build(), Main, requests, True, seed)
+            gc.collect()
+            gc.freeze()
+            tracemalloc.start()
+            try:
+                traced = benchmark.run()
+            finally:
+                tracemalloc.stop()
+    finally:
+        gc.unfreeze()
+    if trace_memory:
+        for name, rate in traced['events'].items():
+            results['events'][name]['peak_memory'] = rate['peak_memory']
+        results['memory'] = traced['memory']
+    results['name'] = topology.name
+    results['topology'] = repr(topology)
+    results['python'] = platform.python_version()
+    results['calibration'] = calibrate()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return the measurements worse than the baseline by over tolerance.
+
+    Rates and latencies of the baseline are first scaled by the ratio of
+    the calibrations of both results, so a baseline recorded on a faster or
+    slower machine still compares. Memory is compared as recorded.
+
+    Returns:
+        list: Descriptions of the regressions.
+    """
+    slowdown = 1
+    if results.get('calibration') and baseline.get('calibration'):
+        slowdown = results['calibration'] / baseline['calibration']
+    regressions = []
+    for name, current in results['events'].items():
+        previous = baseline['events'].get(name)
+        if not current or not previous:
+            continue
+        if current['per_second'] and previous['per_second']:
+            expected = round(previous['per_second'] / slowdown, 1)
+            if current['per_second'] < expected * (1 - tolerance):
+                regressions.append(f"{name}: {current['per_second']} "
+                                   f"events/s, expected {expected}")
+        if current['peak_memory'] and previous['peak_memory'] and \
+                current['peak_memory'] > previous['peak_memory'] * \
+                (1 + tolerance):
+            regressions.append(f"{name}: {current['peak_memory']} bytes "
+                               f"peak, was {previous['peak_memory']}")
+    for name, current in results.get('memory', {}).items():
+        previous = baseline.get('memory', {}).get(name)
+        if previous and current > previous * (1 + tolerance):
+            regressions.append(f"{name} size: {current} bytes, "
+                               f"was {previous}")
+    for path, current in results['requests'].items():
+        for cache, latencies in current.items():
+            previous = baseline['requests'].get(path, {}).get(cache, {})
+            for name in 'p50', 'p90':
+                if name not in previous:
+                    continue
+                expected = round(previous[name] * slowdown, 3)
+                if latencies[name] > expected * (1 + tolerance) and \
+                        latencies[name] - expected > LATENCY_NOISE:
+                    regressions.append(
+                        f"{path} {cache} {name}: {latencies[name]} ms, "
+                        f"expected {expected}")
+    return regressions
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m napps.kytos.topology.benchmarks',
+        description='Benchmark the topology NApp with a synthetic topology.')
+    parser.add_argument('topology', choices=sorted(TOPOLOGIES))
+    parser.add_argument('-n', '--switches', type=int, default=100,
+                        help='switches of ring and random topologies')
+    parser.add_argument('-p', '--ports', type=int, default=8,
+                        help='ports of each switch of ring and random '
+                             'topologies')
+    parser.add_argument('-l', '--links', type=int, default=200,
+                        help='links of random topologies')
+    parser.add_argument('-k', type=int, default=8,
+                        help='ports of each switch of fat trees')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=200,
+                        help='requests measured per endpoint')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='measure the peak memory of each scenario, '
+                             'slowing them down')
+    parser.add_argument('--output', type=Path,
+                        help='file to write the results to')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store the results as the baseline of the '
+                             'topology')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='relative change reported as a regression')
+    return parser.parse_args(argv)
+
+
+def _build_topology(args):
+    if args.topology == 'fat-tree':
+        return TOPOLOGIES['fat-tree'](args.k)
+    if args.topology == 'ring':
+        return TOPOLOGIES['ring'](args.switches, args.ports)
+    return TOPOLOGIES['random'](args.switches, args.ports, args.links,
+                                args.seed)
+
+
+def main(argv=None):
+    """Run the benchmarks and compare them with the stored baseline.
+
+    Returns:
+        int: 1 if a measurement regressed compared to the baseline.
+    """
+    args = _parse_args(argv)
+    # kytos.core reads its own options from the command line whenever an
+    # event is created.
+    sys.argv = sys.argv[:1]
+    logging.getLogger('kytos').setLevel(logging.ERROR)
+    results = run(lambda: _build_topology(args), args.requests,
+                  args.trace_memory, args.seed)
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        args.output.write_text(text)
+
+    baseline_file = BASELINES / f"{results['name']}.json"
+    status = 0
+    if args.save_baseline:
+        BASELINES.mkdir(exist_ok=True)
+        baseline_file.write_text(text)
+    elif baseline_file.exists():
+        regressions = compare(results, json.loads(baseline_file.read_text()),
+                              args.tolerance)
+        for regression in regressions:
+            print(f'Regression: {regression}', file=sys.stderr)
+        status = 1 if regressions else 0
+    return status
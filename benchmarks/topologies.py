@@ -0,0 +1,123 @@
+"""Synthetic topologies made of kytos.core switches and interfaces."""
+import random
+
+from kytos.core.interface import Interface
+from kytos.core.switch import Switch
+
+__all__ = ('TOPOLOGIES', 'SyntheticTopology', 'fat_tree', 'random_topology',
+           'ring')
+
+
+class SyntheticTopology:
+    """Switches and the pairs of interfaces to be discovered as links.
+
+    Links are not created here: benchmarks discover them through the
+    NApp, as LLDP would.
+    """
+
+    def __init__(self, name, switches, links):
+        self.name = name
+        self.switches = switches
+        self.links = links
+
+    @property
+    def interfaces(self):
+        """Return every interface of the topology."""
+        return [interface for switch in self.switches.values()
+                for interface in switch.interfaces.values()]
+
+    def __repr__(self):
+        return (f'<{self.name}: {len(self.switches)} switches, '
+                f'{len(self.interfaces)} interfaces, '
+                f'{len(self.links)} links>')
+
+
+def _dpid(number):
+    digits = f'{number:016x}'
+    return ':'.join(digits[i:i + 2] for i in range(0, 16, 2))
+
+
+def _switch(number, ports):
+    """Return a switch with interfaces numbered from 1 to ports."""
+    switch = Switch(_dpid(number))
+    for port in range(1, ports + 1):
+        interface = Interface(f's{number}-eth{port}', port, switch)
+        switch.update_interface(interface)
+    return switch
+
+
+def _build(name, ports_by_switch, pairs):
+    """Return a topology from the ports of each switch and the linked ports.
+
+    Args:
+        ports_by_switch (list): Number of ports of each switch, numbered
+            from 1.
+        pairs (iterable): ((switch, port), (switch, port)) pairs.
+    """
+    switches = [_switch(number, ports)
+                for number, ports in enumerate(ports_by_switch, 1)]
+    links = [(switches[switch_a - 1].interfaces[port_a],
+              switches[switch_b - 1].interfaces[port_b])
+             for (switch_a, port_a), (switch_b, port_b) in pairs]
+    return SyntheticTopology(name, {switch.id: switch for switch in switches},
+                             links)
+
+
+def ring(switches, ports=4):
+    """Return switches linked in a ring, port 1 of each to port 2 of next."""
+    if switches < 3 or ports < 2:
+        raise ValueError('A ring needs 3 switches with 2 ports or more.')
+    pairs = [((number, 1), (number % switches + 1, 2))
+             for number in range(1, switches + 1)]
+    return _build(f'ring-{switches}x{ports}', [ports] * switches, pairs)
+
+
+def fat_tree(k):
+    """Return a k-ary fat tree with k-port switches.
+
+    It has (k/2)^2 core switches and k pods of k/2 aggregation and k/2
+    edge switches. Half of the ports of edge switches face hosts and are
+    left unlinked.
+    """
+    if k < 2 or k % 2:
+        raise ValueError('A fat tree needs an even k of 2 or more.')
+    half = k // 2
+    cores = half * half
+    # Switches are numbered cores first, then each pod's aggregation and
+    # edge switches.
+    pairs = []
+    for pod in range(k):
+        first = cores + pod * k + 1
+        for agg in range(half):
+            for edge in range(half):
+                pairs.append(((first + half + edge, agg + 1),
+                              (first + agg, edge + 1)))
+            for uplink in range(half):
+                core = agg * half + uplink + 1
+                pairs.append(((first + agg, half + uplink + 1),
+                              (core, pod + 1)))
+    return _build(f'fat-tree-{k}', [k] * (cores + k * k), pairs)
+
+
+def random_topology(switches, ports, links, seed=0):
+    """Return switches with links between random free ports.
+
+    Fewer links are made if the ports run out. Self-loops are not made.
+    """
+    generator = random.Random(seed)
+    free = [(number, port) for number in range(1, switches + 1)
+            for port in range(1, ports + 1)]
+    generator.shuffle(free)
+    pairs = []
+    while len(pairs) < links and len(free) >= 2:
+        port_a = free.pop()
+        for position in range(len(free) - 1, -1, -1):
+            if free[position][0] != port_a[0]:
+                pairs.append((port_a, free.pop(position)))
+                break
+    return _build(f'random-{switches}x{ports}-{links}',
+                  [ports] * switches, pairs)
+
+
+#: Topology generators by the name used on the command line.
+TOPOLOGIES = {'ring': ring, 'fat-tree': fat_tree, 'random': random_topology}
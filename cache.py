@@ -0,0 +1,146 @@
+"""Cache of the JSON encoding of topology entities."""
+import json
+from threading import Lock
+from time import monotonic
+
+from napps.kytos.topology.models import get_dict, get_entity_name
+
+__all__ = ('SerializationCache',)
+
+
+class SerializationCache:
+    """Keep the JSON encoding of each switch, interface and link.
+
+    Every invalidation bumps a generation counter, which is used as the
+    ETag of the REST responses. Entries are encoded once and kept until the
+    object they represent is invalidated, so rebuilding a response body only
+    serializes the objects that changed since the previous one. Whole bodies
+    are also kept for the current generation, up to ``max_bodies`` of them.
+
+    Some fields change without the NApp being told, like whether a switch
+    is still connected, its description or the speed of an interface.
+    When ``ttl`` is set, :meth:`expire` drops everything cached once it is
+    that many seconds old, so those fields are never staler than that.
+    """
+
+    def __init__(self, max_bodies=256, ttl=None):
+        self.generation = 0
+        self.max_bodies = max_bodies
+        self.ttl = ttl
+        self._expires = None if ttl is None else monotonic() + ttl
+        self._lock = Lock()
+        self._entries = {'switches': {}, 'interfaces': {}, 'links': {}}
+        self._touched = {}
+        self._cleared = 0
+        self._bodies = {}
+
+    def invalidate(self, *objs):
+        """Drop the entries of the given objects and of those embedding them.
+
+        A switch serialization embeds its interfaces and a link
+        serialization embeds its endpoints, so changing an interface also
+        invalidates its switch and its link. Changing a switch invalidates
+        its interfaces too, since disabling a switch disables them.
+        """
+        with self._lock:
+            self.generation += 1
+            self._bodies.clear()
+            for obj in objs:
+                entity = get_entity_name(obj)
+                if entity == 'switch':
+                    self._drop('switches', obj.id)
+                    for interface in list(obj.interfaces.values()):
+                        self._drop_interface(interface)
+                elif entity == 'interface':
+                    self._drop_interface(obj)
+                    self._drop('switches', obj.switch.id)
+                else:
+                    self._drop('links', obj.id)
+
+    def _drop_interface(self, interface):
+        self._drop('interfaces', interface.id)
+        if interface.link:
+            self._drop('links', interface.link.id)
+
+    def _drop(self, entities, obj_id):
+        self._entries[entities].pop(obj_id, None)
+        self._touched[(entities, obj_id)] = self.generation
+
+    def expire(self):
+        """Drop every cached entry and body if they are ``ttl`` seconds old."""
+        if self._expires is None or monotonic() < self._expires:
+            return
+        with self._lock:
+            if monotonic() >= self._expires:
+                self._clear()
+
+    def clear(self):
+        """Drop every cached entry and body."""
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self.generation += 1
+        self._bodies.clear()
+        self._touched.clear()
+        self._cleared = self.generation
+        for entries in self._entries.values():
+            entries.clear()
+        if self.ttl is not None:
+            self._expires = monotonic() + self.ttl
+
+    def get_body(self, key, build):
+        """Return the generation and the cached body stored under key.
+
+        The body is built by calling ``build()`` when it is not cached for
+        the current generation. The returned generation is the one seen
+        before building, so it never claims a body newer than it is.
+        """
+        generation = self.generation
+        body = self._bodies.get(key)
+        if body is None:
+            body = build()
+            with self._lock:
+                if generation == self.generation:
+                    if len(self._bodies) >= self.max_bodies:
+                        self._bodies.clear()
+                    self._bodies[key] = body
+        return generation, body
+
+    def encode(self, entities, objects, serialize=None, prune=True):
+        """Return the JSON object mapping the ids of objects to their data.
+
+        Args:
+            entities (str): 'switches', 'interfaces' or 'links'.
+            objects (iterable): Objects to encode, in order.
+            serialize (callable): Function returning the dict of an object.
+                Defaults to the object's ``as_dict``, see `get_dict`.
+            prune (bool): Whether objects holds every known object, so the
+                entries of the others can be dropped.
+
+        Returns:
+            bytes: The encoded JSON object.
+        """
+        entries = self._entries[entities]
+        generation = self.generation
+        parts = []
+        ids = set()
+        for obj in objects:
+            obj_id = obj.id
+            data = entries.get(obj_id)
+            if data is None:
+                value = serialize(obj) if serialize else get_dict(obj)
+                data = json.dumps(value).encode()
+                with self._lock:
+                    touched = self._touched.get((entities, obj_id), 0)
+                    if max(touched, self._cleared) <= generation:
+                        entries[obj_id] = data
+            ids.add(obj_id)
+            parts.append(json.dumps(obj_id).encode() + b': ' + data)
+
+        if prune and len(entries) > len(ids):
+            with self._lock:
+                for obj_id in set(entries) - ids:
+                    entries.pop(obj_id, None)
+
+        return b'{' + b', '.join(parts) + b'}'
@@ -0,0 +1,104 @@
+"""Coalesce bursts of items into a single delayed flush."""
+from threading import Lock, Timer, current_thread
+from time import monotonic
+
+__all__ = ('Coalescer',)
+
+
+class Coalescer:
+    """Collect items and hand them over to a callback in bursts.
+
+    The pending burst is flushed once nothing was added for ``debounce``
+    seconds, but never later than ``max_latency`` seconds after the burst
+    started. When ``max_size`` is set, a burst reaching that many items is
+    flushed right away.
+    """
+
+    def __init__(self, callback, debounce, max_latency, max_size=None):
+        self.callback = callback
+        self.debounce = debounce
+        self.max_latency = max(max_latency, debounce)
+        self.max_size = max_size
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._items = []
+        self._first = None
+        self._last = None
+        self._timer = None
+
+    @property
+    def pending(self):
+        """Return whether there is a burst waiting to be flushed."""
+        return self._first is not None
+
+    def add(self, *items):
+        """Add items to the pending burst and schedule its flush.
+
+        Calling it without items does nothing.
+        """
+        if not items:
+            return
+        with self._lock:
+            now = monotonic()
+            self._items.extend(items)
+            if self._first is None:
+                self._first = now
+            self._last = now
+            flush_now = (self.debounce <= 0 or
+                         (self.max_size and
+                          len(self._items) >= self.max_size))
+            if not flush_now and self._timer is None:
+                self._schedule(self.debounce)
+        if flush_now:
+            self.flush()
+
+    def flush(self):
+        """Hand the pending burst over to the callback right away.
+
+        The callback may return the items it could not handle yet. They are
+        put back ahead of the pending burst once the flush is over, and
+        flushed again within ``max_latency`` seconds.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._first is None:
+                    return
+                items = self._items
+                self._items = []
+                self._first = self._last = None
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            unsent = self.callback(items)
+        if unsent:
+            self._requeue(unsent)
+
+    def _requeue(self, items):
+        """Put items back in the pending burst, without flushing it now."""
+        with self._lock:
+            now = monotonic()
+            self._items[:0] = items
+            if self._first is None:
+                self._first = self._last = now
+            if self._timer is None:
+                self._schedule(self.max_latency)
+
+    def _schedule(self, delay):
+        self._timer = Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            if self._timer is not current_thread():
+                return
+            self._timer = None
+            if self._first is None:
+                return
+            deadline = min(self._last + self.debounce,
+                           self._first + self.max_latency)
+            remaining = deadline - monotonic()
+            if remaining > 0:
+                self._schedule(remaining)
+                return
+        self.flush()
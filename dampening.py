@@ -0,0 +1,134 @@
+"""Flap dampening of links, in the style of BGP route dampening."""
+from math import log2
+from threading import Lock
+from time import monotonic
+
+__all__ = ('METADATA_KEY', 'FlapDampener')
+
+#: Metadata key set on the links held down by dampening.
+METADATA_KEY = 'suppressed'
+
+
+class _FlapState:
+    """Penalty and suppression of one link."""
+
+    __slots__ = ('penalty', 'updated', 'flaps', 'suppressed')
+
+    def __init__(self, now):
+        self.penalty = 0.0
+        self.updated = now
+        self.flaps = 0
+        self.suppressed = False
+
+
+class FlapDampener:
+    """Hold down the links flapping too often.
+
+    Each flap adds ``penalty`` to a link, and the penalty decays
+    exponentially, halving every ``half_life`` seconds. A link is suppressed
+    once its penalty reaches ``suppress`` and stays suppressed until it
+    decays below ``reuse``. The penalty is capped so no link stays
+    suppressed longer than ``max_suppress`` seconds after its last flap.
+
+    Links whose penalty decayed below half of ``reuse`` are forgotten.
+    Dampening is disabled when ``penalty`` is 0 or None.
+    """
+
+    def __init__(self, penalty=1000, suppress=2000, reuse=750,
+                 half_life=60.0, max_suppress=600.0):
+        self.penalty = penalty or 0
+        self.suppress = suppress
+        self.reuse = reuse
+        self.half_life = half_life
+        self.max_penalty = reuse * 2 ** (max_suppress / half_life)
+        self._lock = Lock()
+        self._states = {}
+
+    def _decay(self, link_id, now):
+        """Return the state of a link with its penalty decayed to now."""
+        state = self._states.get(link_id)
+        if state is None:
+            return None
+        elapsed = now - state.updated
+        state.penalty *= 0.5 ** (elapsed / self.half_life)
+        state.updated = now
+        if state.suppressed and state.penalty < self.reuse:
+            state.suppressed = False
+        if not state.suppressed and state.penalty < self.reuse / 2:
+            del self._states[link_id]
+            return None
+        return state
+
+    def flap(self, link_id):
+        """Penalize a flap of a link.
+
+        Returns:
+            bool: Whether the link is suppressed after this flap.
+        """
+        if not self.penalty:
+            return False
+        now = monotonic()
+        with self._lock:
+            state = self._decay(link_id, now)
+            if state is None:
+                state = self._states[link_id] = _FlapState(now)
+            state.penalty = min(state.penalty + self.penalty,
+                                self.max_penalty)
+            state.flaps += 1
+            if state.penalty >= self.suppress:
+                state.suppressed = True
+            return state.suppressed
+
+    def is_suppressed(self, link_id):
+        """Return whether a link is held down."""
+        with self._lock:
+            state = self._decay(link_id, monotonic())
+            return state is not None and state.suppressed
+
+    def reuse_in(self, link_id):
+        """Return the seconds before a suppressed link can be used again.
+
+        Returns 0 if the link is not suppressed.
+        """
+        with self._lock:
+            state = self._decay(link_id, monotonic())
+            return self._reuse_in(state)
+
+    def _reuse_in(self, state):
+        if state is None or not state.suppressed:
+            return 0
+        return self.half_life * log2(state.penalty / self.reuse)
+
+    def release(self, link_id):
+        """Forget the penalty of a link, releasing it if suppressed.
+
+        Returns:
+            bool: Whether the link was suppressed.
+        """
+        with self._lock:
+            state = self._decay(link_id, monotonic())
+            self._states.pop(link_id, None)
+            return state is not None and state.suppressed
+
+    def get_state(self, link_id):
+        """Return the dampening state of a link, or None if not penalized."""
+        with self._lock:
+            state = self._decay(link_id, monotonic())
+            return self._as_dict(state)
+
+    def get_states(self):
+        """Return the dampening state of every penalized link, by id."""
+        now = monotonic()
+        with self._lock:
+            states = {link_id: self._decay(link_id, now)
+                      for link_id in list(self._states)}
+            return {link_id: self._as_dict(state)
+                    for link_id, state in states.items() if state}
+
+    def _as_dict(self, state):
+        if state is None:
+            return None
+        return {'penalty': round(state.penalty, 1),
+                'flaps': state.flaps,
+                'suppressed': state.suppressed,
+                'reuse_in': round(self._reuse_in(state), 1)}
@@ -0,0 +1,52 @@
+"""Content negotiation of the topology responses."""
+import json
+import zlib
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+__all__ = ('encode_body', 'negotiate')
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+
+#: wbits used by zlib for each content coding.
+_WBITS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+
+
+def negotiate(accept_mimetypes, accept_encodings):
+    """Return the mimetype and content coding to answer a request with.
+
+    MessagePack is only offered when the msgpack package is installed.
+    The content coding is None when the body is sent as it is.
+
+    Args:
+        accept_mimetypes: The request's parsed Accept header.
+        accept_encodings: The request's parsed Accept-Encoding header.
+    """
+    mimetypes = [JSON, MSGPACK, 'application/x-msgpack'] if msgpack \
+        else [JSON]
+    mimetype = accept_mimetypes.best_match(mimetypes, default=JSON)
+    if mimetype != JSON:
+        mimetype = MSGPACK
+    encoding = accept_encodings.best_match(list(_WBITS))
+    return mimetype, encoding
+
+
+def encode_body(body, mimetype, encoding, level=6):
+    """Convert a JSON body to a mimetype and compress it.
+
+    Args:
+        body (bytes): The JSON body.
+        mimetype (str): JSON or MessagePack.
+        encoding (str): 'gzip', 'deflate' or None to not compress.
+        level (int): zlib compression level.
+    """
+    if mimetype == MSGPACK:
+        body = msgpack.packb(json.loads(body), use_bin_type=True)
+    if encoding is not None:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS[encoding])
+        body = compressor.compress(body) + compressor.flush()
+    return body
@@ -0,0 +1,151 @@
+"""Feed of topology changes streamed to REST clients."""
+from collections import deque
+from itertools import islice
+from threading import Condition
+from time import monotonic
+
+__all__ = ('ChangeFeed', 'Subscriber')
+
+
+class Subscriber:
+    """Bounded buffer of the changes published to one client.
+
+    A subscriber whose buffer is full when a change is published is
+    evicted: it stops receiving changes and should reconnect, resuming
+    from the sequence number of the last change it handled.
+    """
+
+    def __init__(self, feed, max_pending, sequence):
+        self.feed = feed
+        self.max_pending = max_pending
+        self.sequence = sequence
+        self.pending = deque()
+        self.evicted = False
+
+    def get(self, timeout):
+        """Return the pending changes, waiting up to timeout for one.
+
+        Returns:
+            list: The changes, empty if none arrived before the timeout or
+            if the subscriber was evicted.
+        """
+        deadline = monotonic() + timeout
+        with self.feed.condition:
+            while not self.pending and not self.evicted:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    break
+                self.feed.condition.wait(remaining)
+            changes = list(self.pending)
+            self.pending.clear()
+        return changes
+
+    def close(self):
+        """Stop receiving changes."""
+        self.feed.unsubscribe(self)
+
+
+class ChangeFeed:
+    """Publish changes with sequence numbers to every subscriber.
+
+    The last ``history`` changes are kept so that clients reconnecting can
+    resume from the sequence number they last saw. Each subscriber buffers
+    at most ``max_pending`` changes; slow consumers are evicted instead of
+    holding back publishers.
+    """
+
+    def __init__(self, history=10000, max_pending=1000):
+        self.condition = Condition()
+        self.sequence = 0
+        self.max_pending = max_pending
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+
+    def publish(self, *changes):
+        """Number changes and hand them over to every subscriber.
+
+        Args:
+            changes: Pairs of event name and data.
+        """
+        with self.condition:
+            for name, data in changes:
+                self.sequence += 1
+                change = {'seq': self.sequence, 'event': name, 'data': data}
+                self._history.append(change)
+                for subscriber in list(self._subscribers):
+                    if len(subscriber.pending) >= subscriber.max_pending:
+                        self._evict(subscriber)
+                    else:
+                        subscriber.pending.append(change)
+            self.condition.notify_all()
+
+    def _evict(self, subscriber):
+        subscriber.evicted = True
+        subscriber.pending.clear()
+        self._subscribers.discard(subscriber)
+
+    def subscribe(self, since=None):
+        """Return a new subscriber.
+
+        Args:
+            since (int): Sequence number last seen by the client. Changes
+                after it are buffered right away if they are all still in
+                history and fit the subscriber buffer.
+
+        Returns:
+            tuple: The subscriber and whether it resumed from ``since``.
+            When False, the client missed changes and should fetch the
+            whole topology again, then follow the changes after the
+            subscriber's ``sequence``.
+        """
+        with self.condition:
+            subscriber = Subscriber(self, self.max_pending, self.sequence)
+            resumed = since is None or self._is_complete(since)
+            if since is not None and resumed:
+                missed = self.get_since(since)
+                if len(missed) > subscriber.max_pending:
+                    resumed = False
+                else:
+                    subscriber.sequence = since
+                    subscriber.pending.extend(missed)
+            self._subscribers.add(subscriber)
+        return subscriber, resumed
+
+    def unsubscribe(self, subscriber):
+        """Stop handing changes over to a subscriber."""
+        with self.condition:
+            self._subscribers.discard(subscriber)
+
+    def _is_complete(self, since):
+        """Return whether no change after since fell out of history.
+
+        Sequence numbers ahead of the feed come from a previous run of the
+        controller, so nothing can be resumed from them.
+        """
+        if since >= self.sequence:
+            return since == self.sequence
+        return bool(self._history) and self._history[0]['seq'] <= since + 1
+
+    def get_since(self, since):
+        """Return the changes in history after a sequence number."""
+        with self.condition:
+            if not self._history:
+                return []
+            start = max(since + 1 - self._history[0]['seq'], 0)
+            return list(islice(self._history, start, None))
+
+    def wait_since(self, since, timeout):
+        """Return the changes after a sequence number, waiting for one.
+
+        Returns:
+            tuple: The changes, possibly empty if none arrived before the
+            timeout, and whether no change after ``since`` was lost.
+        """
+        deadline = monotonic() + timeout
+        with self.condition:
+            while since == self.sequence:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            return self.get_since(since), self._is_complete(since)
@@ -0,0 +1,239 @@
+"""Switch adjacency and path queries over the topology."""
+from heapq import heappop, heappush
+from itertools import count
+from threading import Lock
+
+__all__ = ('TopologyGraph',)
+
+
+class TopologyGraph:
+    """Keep the adjacency of the switches and answer path queries.
+
+    Links are added and removed as the topology NApp learns them. Their
+    state is only read when a query needs it: a link is usable when it,
+    its interfaces and their switches are all enabled and active. The cost
+    of a usable link is the number stored under ``weight_key`` in its
+    metadata, or 1 if there is none.
+
+    Every change to the topology must call :meth:`invalidate`, which bumps
+    the graph generation. Query results are memoized for the current
+    generation only, so repeated queries between two changes are answered
+    from the memo. Memoized results are shared, so callers must not
+    modify them.
+    """
+
+    def __init__(self, weight_key='weight', max_memo=10000):
+        self.weight_key = weight_key
+        self.max_memo = max_memo
+        self.generation = 0
+        self._lock = Lock()
+        self._adjacency = {}
+        self._memo = {}
+
+    @staticmethod
+    def _switch_ids(link):
+        return link.endpoint_a.switch.id, link.endpoint_b.switch.id
+
+    def add_link(self, link):
+        """Add a link between the switches of its endpoints."""
+        switch_a, switch_b = self._switch_ids(link)
+        with self._lock:
+            self._adjacency.setdefault(switch_a, {}).setdefault(
+                switch_b, {})[link.id] = link
+            self._adjacency.setdefault(switch_b, {}).setdefault(
+                switch_a, {})[link.id] = link
+            self._invalidate()
+
+    def remove_link(self, link):
+        """Remove a link from the adjacency of its switches."""
+        switch_a, switch_b = self._switch_ids(link)
+        with self._lock:
+            for switch, neighbor in ((switch_a, switch_b),
+                                     (switch_b, switch_a)):
+                links = self._adjacency.get(switch, {}).get(neighbor, {})
+                links.pop(link.id, None)
+                if not links:
+                    self._adjacency.get(switch, {}).pop(neighbor, None)
+                if not self._adjacency.get(switch, True):
+                    del self._adjacency[switch]
+            self._invalidate()
+
+    def invalidate(self):
+        """Start a new generation, dropping every memoized result."""
+        with self._lock:
+            self._invalidate()
+
+    def _invalidate(self):
+        self.generation += 1
+        self._memo.clear()
+
+    @staticmethod
+    def is_usable(link):
+        """Return whether a link can carry traffic."""
+        return all(obj.is_enabled() and obj.is_active()
+                   for obj in (link, link.endpoint_a, link.endpoint_b,
+                               link.endpoint_a.switch,
+                               link.endpoint_b.switch))
+
+    def get_weight(self, link):
+        """Return the cost of a link, read from its metadata."""
+        weight = link.metadata.get(self.weight_key)
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) \
+                or weight < 0:
+            return 1
+        return weight
+
+    def _memoized(self, key, build):
+        """Return the result memoized under key, building it if needed."""
+        with self._lock:
+            generation = self.generation
+            if key in self._memo:
+                return self._memo[key]
+        result = build()
+        with self._lock:
+            if generation == self.generation:
+                if len(self._memo) >= self.max_memo:
+                    self._memo.clear()
+                self._memo[key] = result
+        return result
+
+    def _edges(self):
+        """Return the usable edges of each switch and the cost of links.
+
+        Edges are (neighbor switch id, link id, cost) tuples.
+        """
+        def build():
+            with self._lock:
+                adjacency = {switch: {neighbor: list(links.values())
+                                      for neighbor, links in
+                                      neighbors.items()}
+                             for switch, neighbors in
+                             self._adjacency.items()}
+            edges = {}
+            weights = {}
+            for switch, neighbors in adjacency.items():
+                for neighbor, links in neighbors.items():
+                    for link in links:
+                        if link.id not in weights:
+                            if not self.is_usable(link):
+                                continue
+                            weights[link.id] = self.get_weight(link)
+                        edges.setdefault(switch, []).append(
+                            (neighbor, link.id, weights[link.id]))
+            return edges, weights
+
+        return self._memoized(('edges',), build)
+
+    def get_neighbors(self, switch_id):
+        """Return the neighbors of a switch through usable links.
+
+        Returns:
+            dict: Link ids reaching each neighbor switch id.
+        """
+        def build():
+            edges, _ = self._edges()
+            neighbors = {}
+            for neighbor, link_id, _ in edges.get(switch_id, ()):
+                neighbors.setdefault(neighbor, []).append(link_id)
+            return neighbors
+
+        return self._memoized(('neighbors', switch_id), build)
+
+    def get_reachable(self, switch_id):
+        """Return the ids of the switches reachable from a switch."""
+        def build():
+            edges, _ = self._edges()
+            seen = {switch_id}
+            pending = [switch_id]
+            while pending:
+                for neighbor, _, _ in edges.get(pending.pop(), ()):
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        pending.append(neighbor)
+            seen.discard(switch_id)
+            return sorted(seen)
+
+        return self._memoized(('reachable', switch_id), build)
+
+    def get_shortest_paths(self, source, destination, k=1):
+        """Return up to k loopless paths from source to destination.
+
+        Paths are found with Yen's algorithm and sorted by cost. Parallel
+        links between the same switches make distinct paths.
+
+        Returns:
+            list: Dicts with the 'hops' (switch ids), 'links' (link ids) and
+            'cost' of each path.
+        """
+        def build():
+            edges, weights = self._edges()
+            paths = self._yen(edges, weights, source, destination, k)
+            return [{'hops': list(hops), 'links': list(links),
+                     'cost': cost} for cost, hops, links in paths]
+
+        return self._memoized(('paths', source, destination, k), build)
+
+    @staticmethod
+    def _dijkstra(edges, source, destination, banned_switches=(),
+                  banned_links=()):
+        """Return the cheapest (cost, hops, links) path or None."""
+        tie = count()
+        heap = [(0, next(tie), source)]
+        costs = {source: 0}
+        previous = {}
+        while heap:
+            cost, _, switch = heappop(heap)
+            if switch == destination:
+                hops, links = [switch], []
+                while switch != source:
+                    switch, link_id = previous[switch]
+                    hops.append(switch)
+                    links.append(link_id)
+                return cost, tuple(reversed(hops)), tuple(reversed(links))
+            if cost > costs[switch]:
+                continue
+            for neighbor, link_id, weight in edges.get(switch, ()):
+                if neighbor in banned_switches or link_id in banned_links:
+                    continue
+                new_cost = cost + weight
+                if new_cost < costs.get(neighbor, new_cost + 1):
+                    costs[neighbor] = new_cost
+                    previous[neighbor] = (switch, link_id)
+                    heappush(heap, (new_cost, next(tie), neighbor))
+        return None
+
+    def _yen(self, edges, weights, source, destination, k):
+        """Return the k cheapest loopless paths, as Dijkstra tuples."""
+        if source == destination:
+            return [(0, (source,), ())]
+        first = self._dijkstra(edges, source, destination)
+        if first is None:
+            return []
+
+        paths = [first]
+        seen = {first[2]}
+        tie = count()
+        candidates = []
+        while len(paths) < k:
+            _, hops, links = paths[-1]
+            for index in range(len(links)):
+                root_links = links[:index]
+                banned_links = {path[2][index] for path in paths
+                                if path[2][:index] == root_links}
+                spur = self._dijkstra(edges, hops[index], destination,
+                                      set(hops[:index]), banned_links)
+                if spur is None:
+                    continue
+                path_links = root_links + spur[2]
+                if path_links in seen:
+                    continue
+                seen.add(path_links)
+                cost = sum(weights[link_id] for link_id in root_links) + \
+                    spur[0]
+                heappush(candidates, (cost, next(tie), hops[:index] + spur[1],
+                                      path_links))
+            if not candidates:
+                break
+            cost, _, path_hops, path_links = heappop(candidates)
+            paths.append((cost, path_hops, path_links))
+        return paths
@@ -0,0 +1,111 @@
+"""Table of the hosts learned at the edge of the topology."""
+from threading import Lock
+from time import monotonic
+
+from napps.kytos.topology.models import Host
+
+__all__ = ('HostTable',)
+
+
+class HostTable:
+    """Hosts by MAC address, with the hosts of each interface.
+
+    Hosts are kept in a dict ordered by the last time they were seen:
+    seeing a host again moves it to the end, so stale hosts are found at
+    the start and expired without scanning the whole table. Learning,
+    moving and removing a host are O(1).
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._hosts = {}
+        self._by_interface = {}
+
+    def __len__(self):
+        return len(self._hosts)
+
+    def get(self, mac):
+        """Return the host with a MAC address, or None."""
+        return self._hosts.get(mac.lower())
+
+    def learn(self, mac, interface_id):
+        """Record that a host was seen on an interface.
+
+        Returns:
+            tuple: The host and 'added', 'moved' if it was last seen on
+            another interface, or None if nothing changed.
+        """
+        mac = mac.lower()
+        now = monotonic()
+        with self._lock:
+            host = self._hosts.pop(mac, None)
+            if host is None:
+                host = Host(mac, interface_id, now)
+                action = 'added'
+            elif host.interface != interface_id:
+                self._unindex(host)
+                host.interface = interface_id
+                action = 'moved'
+            else:
+                action = None
+            host.last_seen = now
+            self._hosts[mac] = host
+            if action:
+                self._by_interface.setdefault(interface_id, set()).add(mac)
+        return host, action
+
+    def _unindex(self, host):
+        macs = self._by_interface.get(host.interface)
+        if macs is not None:
+            macs.discard(host.mac)
+            if not macs:
+                del self._by_interface[host.interface]
+
+    def remove(self, mac):
+        """Remove a host, returning it or None if unknown."""
+        with self._lock:
+            host = self._hosts.pop(mac.lower(), None)
+            if host is not None:
+                self._unindex(host)
+        return host
+
+    def remove_interface(self, interface_id):
+        """Remove the hosts seen on an interface and return them."""
+        with self._lock:
+            macs = self._by_interface.pop(interface_id, ())
+            return [self._hosts.pop(mac) for mac in macs]
+
+    def expire(self, ttl):
+        """Remove the hosts not seen for ttl seconds and return them."""
+        deadline = monotonic() - ttl
+        expired = []
+        with self._lock:
+            for mac in self._hosts:
+                if self._hosts[mac].last_seen > deadline:
+                    break
+                expired.append(self._hosts[mac])
+            for host in expired:
+                del self._hosts[host.mac]
+                self._unindex(host)
+        return expired
+
+    def find(self, switch=None, interface=None):
+        """Return the hosts seen on a switch or an interface, or all.
+
+        Filtering by interface only reads the hosts of that interface, and
+        filtering by switch the hosts of its interfaces.
+        """
+        with self._lock:
+            if interface is not None:
+                if switch is not None and \
+                        interface.rpartition(':')[0] != switch:
+                    return []
+                macs = list(self._by_interface.get(interface, ()))
+            elif switch is not None:
+                macs = [mac for interface_id, interface_macs
+                        in self._by_interface.items()
+                        if interface_id.rpartition(':')[0] == switch
+                        for mac in interface_macs]
+            else:
+                return list(self._hosts.values())
+            return [self._hosts[mac] for mac in macs]
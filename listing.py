@@ -0,0 +1,168 @@
+"""Filters, sparse fieldsets and pagination of the list endpoints."""
+import json
+
+from napps.kytos.topology.models import get_dict
+
+__all__ = ('ListQuery',)
+
+_BOOLEANS = {'true': True, '1': True, 'false': False, '0': False}
+
+
+def _switch_ids(obj, entities):
+    if entities == 'switches':
+        return {obj.id}
+    if entities == 'interfaces':
+        return {obj.switch.id}
+    return {obj.endpoint_a.switch.id, obj.endpoint_b.switch.id}
+
+
+def _is_nni(obj, entities):
+    if entities == 'interfaces':
+        return bool(obj.nni)
+    return bool(obj.endpoint_a.nni and obj.endpoint_b.nni)
+
+
+#: Fields read straight from the objects, without calling ``as_dict()``.
+#: Other fields are taken from ``as_dict()``.
+FIELDS = {
+    'switches': {
+        'dpid': lambda obj: obj.dpid,
+        'type': lambda obj: 'switch',
+    },
+    'interfaces': {
+        'name': lambda obj: obj.name,
+        'port_number': lambda obj: obj.port_number,
+        'switch': lambda obj: obj.switch.dpid,
+        'nni': lambda obj: obj.nni,
+        'uni': lambda obj: obj.uni,
+        'mac': lambda obj: obj.address,
+        'link': lambda obj: obj.link.id if obj.link else '',
+        'type': lambda obj: 'interface',
+    },
+    'links': {
+        'endpoint_a': lambda obj: obj.endpoint_a.as_dict(),
+        'endpoint_b': lambda obj: obj.endpoint_b.as_dict(),
+    },
+}
+_COMMON_FIELDS = {
+    'id': lambda obj: obj.id,
+    'active': lambda obj: obj.is_active(),
+    'enabled': lambda obj: obj.is_enabled(),
+    'metadata': lambda obj: obj.metadata,
+}
+
+
+class ListQuery:
+    """Filters, fields and page requested from a list endpoint.
+
+    Objects are filtered and paginated before being serialized, and only
+    the requested fields are built. Pages are sorted by id, and the cursor
+    of a page is the id of its last object.
+    """
+
+    def __init__(self, entities, filters=None, fields=None, limit=None,
+                 cursor=None):
+        self.entities = entities
+        self.filters = filters or {}
+        self.fields = fields
+        self.limit = limit
+        self.cursor = cursor
+
+    @classmethod
+    def from_args(cls, entities, args, paginate=True):
+        """Create a query from the arguments of a request.
+
+        Raises:
+            ValueError: If an argument is not valid.
+        """
+        filters = {}
+        for name in 'active', 'enabled', 'nni':
+            if name in args:
+                if name == 'nni' and entities == 'switches':
+                    raise ValueError("nni does not apply to switches")
+                try:
+                    filters[name] = _BOOLEANS[args[name].lower()]
+                except KeyError:
+                    raise ValueError(f"{name} must be true or false")
+        if 'switch' in args:
+            filters['switch'] = args['switch']
+
+        fields = None
+        if 'fields' in args:
+            fields = [field for field in args['fields'].split(',') if field]
+
+        limit = args.get('limit')
+        cursor = args.get('cursor')
+        if not paginate and (limit is not None or cursor is not None):
+            raise ValueError("Pagination is not supported here")
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                limit = 0
+            if limit < 1:
+                raise ValueError("limit must be a positive integer")
+        return cls(entities, filters, fields, limit, cursor)
+
+    def matches(self, obj):
+        """Return whether an object passes every filter."""
+        for name, value in self.filters.items():
+            if name == 'active':
+                matched = obj.is_active() == value
+            elif name == 'enabled':
+                matched = obj.is_enabled() == value
+            elif name == 'nni':
+                matched = _is_nni(obj, self.entities) == value
+            else:
+                matched = value in _switch_ids(obj, self.entities)
+            if not matched:
+                return False
+        return True
+
+    def apply(self, objects):
+        """Return the requested page of objects and the next cursor.
+
+        Without pagination, every matching object is returned in the
+        original order and the cursor is None.
+        """
+        objects = [obj for obj in objects if self.matches(obj)]
+        if self.limit is None and self.cursor is None:
+            return objects, None
+
+        objects.sort(key=lambda obj: obj.id)
+        if self.cursor is not None:
+            objects = [obj for obj in objects if obj.id > self.cursor]
+        if self.limit is None or len(objects) <= self.limit:
+            return objects, None
+        objects = objects[:self.limit]
+        return objects, objects[-1].id
+
+    def project(self, obj):
+        """Return the requested fields of an object."""
+        getters = FIELDS[self.entities]
+        data = {}
+        full = None
+        for field in self.fields:
+            getter = getters.get(field) or _COMMON_FIELDS.get(field)
+            if getter is not None:
+                data[field] = getter(obj)
+                continue
+            if full is None:
+                full = get_dict(obj)
+            if field in full:
+                data[field] = full[field]
+        return data
+
+    def encode(self, objects, serialization):
+        """Return the JSON object mapping the ids of objects to their data.
+
+        Whole objects are encoded through the serialization cache; sparse
+        fieldsets are encoded directly.
+        """
+        if self.fields is None:
+            complete = not self.filters and self.limit is None and \
+                self.cursor is None
+            return serialization.encode(self.entities, objects,
+                                        prune=complete)
+        return json.dumps({obj.id: self.project(obj)
+                           for obj in objects}).encode()
@@ -2,15 +2,38 @@
 
 Manage the network topology
 """
-from flask import jsonify, request
+import json
+import os
+from threading import Lock, RLock, Thread, Timer
+from time import monotonic, perf_counter
+
+from flask import Response, jsonify, request
 from kytos.core import KytosEvent, KytosNApp, log, rest
 from kytos.core.helpers import listen_to
 from kytos.core.interface import Interface
 from kytos.core.link import Link
 from kytos.core.switch import Switch
 
-# from napps.kytos.topology import settings
-from napps.kytos.topology.models import Topology
+from napps.kytos.topology import settings
+from napps.kytos.topology.cache import SerializationCache
+from napps.kytos.topology.coalescer import Coalescer
+from napps.kytos.topology.dampening import METADATA_KEY, FlapDampener
+from napps.kytos.topology.encoding import (JSON, MSGPACK, encode_body,
+                                           negotiate)
+from napps.kytos.topology.feed import ChangeFeed
+from napps.kytos.topology.graph import TopologyGraph
+from napps.kytos.topology.hosts import HostTable
+from napps.kytos.topology.listing import ListQuery
+from napps.kytos.topology.metadata_index import MetadataIndex, QueryError
+from napps.kytos.topology.models import (ENTITIES, Topology,
+                                         TopologySnapshot, get_change_record,
+                                         get_dict, get_entity_name)
+from napps.kytos.topology.search import SwitchSearchIndex
+from napps.kytos.topology.state import VersionedDict, writer
+from napps.kytos.topology.stats import Stats, timed
+from napps.kytos.topology.tracing import TraceRecorder, recorded
+from napps.kytos.topology.warm_start import (PROVISIONAL_KEY, load_snapshot,
+                                             write_snapshot)
 
 
 class Main(KytosNApp):
@@ -21,83 +44,825 @@ class Main(KytosNApp):
 
     def setup(self):
         """Initialize the NApp's links list."""
-        self.links = {}
+        self._write_lock = RLock()
+        self._stats = Stats() if settings.STATS_ENABLED else None
+        self._recorder = None
+        if settings.TRACE_FILE:
+            self._recorder = TraceRecorder(settings.TRACE_FILE,
+                                           settings.TRACE_MAX_BYTES,
+                                           settings.TRACE_BACKUPS)
+        self.links = VersionedDict()
+        self._links_by_endpoints = {}
+        self._links_by_interface = {}
+        self._links_seen = {}
+        self._interfaces = VersionedDict()
+        #: Interfaces deactivated with their switch's connection, by switch
+        self._interfaces_lost = {}
         self.store_items = {}
-
-        self.verify_storehouse('switches')
-        self.verify_storehouse('interfaces')
-        self.verify_storehouse('links')
+        self.topology_version = 0
+        self.snapshot = None
+        self.graph = TopologyGraph(settings.LINK_WEIGHT_METADATA,
+                                   settings.PATH_CACHE_MAX_ENTRIES)
+        self._switch_search = SwitchSearchIndex(
+            settings.SWITCH_SEARCH_METADATA)
+        self._metadata_index = MetadataIndex(ENTITIES.values())
+        self._feed = ChangeFeed(settings.FEED_HISTORY,
+                                settings.FEED_CLIENT_BUFFER)
+        self._serialization = SerializationCache(
+            ttl=settings.RESPONSE_CACHE_TTL)
+        self._topology_updates = Coalescer(
+            self._send_topology_update,
+            settings.TOPOLOGY_UPDATE_DEBOUNCE,
+            settings.TOPOLOGY_UPDATE_MAX_LATENCY)
+        self._metadata_writes = Coalescer(
+            self._flush_metadata_on_store,
+            settings.STORE_FLUSH_INTERVAL,
+            settings.STORE_FLUSH_INTERVAL,
+            settings.STORE_FLUSH_MAX_PENDING)
+
+        self._dampening = FlapDampener(settings.LINK_FLAP_PENALTY,
+                                       settings.LINK_FLAP_SUPPRESS,
+                                       settings.LINK_FLAP_REUSE,
+                                       settings.LINK_FLAP_HALF_LIFE,
+                                       settings.LINK_FLAP_MAX_SUPPRESS)
+        self._links_down = set()
+        self._links_held_up = set()
+        self._reuse_timers = {}
+
+        for switch in self.controller.switches.values():
+            self._index_interfaces(*switch.interfaces.values())
+        self._switch_search.update(*self.controller.switches.values())
+        self._metadata_index.update('switches',
+                                    *self.controller.switches.values())
+
+        self._store_lock = Lock()
+        self._store_waiting = {entities: {} for entities in ENTITIES.values()}
+        self._store_started = monotonic()
+        self.store_load_times = {}
+        for entities in ENTITIES.values():
+            self.verify_storehouse(entities)
+
+        self.provisional_links = set()
+        self.provisional_interfaces = set()
+        self._warm_start_version = None
+        self._warm_start_timer = None
+        self._warm_start_restore = None
+        if settings.WARM_START_FILE:
+            self._load_warm_start(settings.WARM_START_FILE)
+            self._schedule_warm_start_save()
+
+        self._link_aging_timer = None
+        if settings.LINK_AGING_TTL:
+            self._schedule_link_aging()
+
+        self.hosts = HostTable()
+        self._host_updates = Coalescer(self._send_hosts_update,
+                                       settings.HOST_UPDATE_INTERVAL,
+                                       settings.HOST_UPDATE_INTERVAL)
+        self._host_aging_timer = None
+        if settings.HOST_AGING_TTL:
+            self._schedule_host_aging()
 
     def execute(self):
         """Do nothing."""
         pass
 
     def shutdown(self):
-        """Do nothing."""
+        """Send pending notifications and metadata before shutting down."""
+        self._topology_updates.flush()
+        self._metadata_writes.flush()
+        self._host_updates.flush()
+        if self._link_aging_timer is not None:
+            self._link_aging_timer.cancel()
+        if self._host_aging_timer is not None:
+            self._host_aging_timer.cancel()
+        for timer in list(self._reuse_timers.values()):
+            timer.cancel()
+        if self._recorder is not None:
+            self._recorder.close()
+        if self._warm_start_timer is not None:
+            self._warm_start_timer.cancel()
+            self._save_warm_start()
         log.info('NApp kytos/topology shutting down.')
 
-    def _get_link_or_create(self, endpoint_a, endpoint_b):
-        new_link = Link(endpoint_a, endpoint_b)
+    def _load_warm_start(self, path):
+        """Restore the switches, interfaces and links saved to a snapshot.
+
+        The whole snapshot is read and checked first, so a bad file changes
+        nothing. Building kytos entities is slow, so they are restored by a
+        background thread, one switch or `WARM_START_BATCH` links at a time.
+        """
+        if not os.path.exists(path):
+            return
+        try:
+            snapshot = load_snapshot(path)
+        except (OSError, ValueError) as error:
+            log.error(f'Error loading topology snapshot {path}: {error}')
+            return
+
+        self._warm_start_restore = Thread(target=self._restore_warm_start,
+                                          args=(path, *snapshot),
+                                          name='topology-warm-start',
+                                          daemon=True)
+        self._warm_start_restore.start()
+
+    def _restore_warm_start(self, path, version, switches, interfaces,
+                            links):
+        """Restore the objects of a topology snapshot missing from the NApp.
+
+        Switches, interfaces and links are restored administratively as
+        saved but inactive. Interfaces are kept in `provisional_interfaces`
+        until their switch connects, and links in `provisional_links` until
+        LLDP confirms them; both carry the `provisional` metadata meanwhile.
+        """
+        started = monotonic()
+        for dpid, enabled in switches:
+            self._restore_switch(dpid, enabled, interfaces[dpid])
+        for start in range(0, len(links), settings.WARM_START_BATCH):
+            self._restore_links(links[start:start + settings.WARM_START_BATCH])
+
+        elapsed = monotonic() - started
+        log.info(f'Topology snapshot version {version} restored from {path} '
+                 f'in {elapsed:.3f}s, with {len(self.provisional_links)} '
+                 'provisional links.')
+
+    def _restore_switch(self, dpid, enabled, ports):
+        """Restore a saved switch, or the saved interfaces it misses.
+
+        The switch and its interfaces are built before taking the write
+        lock. If the switch connected meanwhile, the interfaces it misses
+        are built again for it.
+        """
+        switch = None
+        if dpid not in self.controller.switches:
+            switch = Switch(dpid)
+            self._set_enabled(switch, enabled)
+            switch.deactivate()
+            for port in ports:
+                self._restore_interface(switch, *port)
+
+        with self._write_lock:
+            if switch is None or dpid in self.controller.switches:
+                switch = self.controller.switches[dpid]
+                interfaces = [self._restore_interface(switch, *port)
+                              for port in ports
+                              if port[0] not in switch.interfaces]
+                restored = interfaces
+            else:
+                self.controller.add_new_switch(switch)
+                self._switch_search.update(switch)
+                interfaces = list(switch.interfaces.values())
+                restored = [switch] + interfaces
+            self._index_interfaces(*interfaces)
+            self.provisional_interfaces.update(interface.id
+                                               for interface in interfaces)
+            self._metadata_index.update('interfaces', *interfaces)
+            self.notify_topology_update(*restored, action='added')
+
+    def _restore_interface(self, switch, port_number, name, nni, enabled):
+        """Add an inactive, provisional interface to a switch."""
+        interface = Interface(name, port_number, switch)
+        interface.nni = nni
+        self._set_enabled(interface, enabled)
+        interface.deactivate()
+        interface.add_metadata(PROVISIONAL_KEY, True)
+        switch.update_interface(interface)
+        return interface
+
+    def _restore_links(self, saved):
+        """Restore saved links between interfaces without a link.
+
+        Links are built before taking the write lock, and only added if
+        their interfaces still have no link then.
+        """
+        links = {}
+        for endpoint_a_id, endpoint_b_id, enabled in saved:
+            try:
+                endpoint_a = self._get_interface(endpoint_a_id)
+                endpoint_b = self._get_interface(endpoint_b_id)
+            except KeyError:
+                continue
+            key = self._endpoints_key(endpoint_a, endpoint_b)
+            if endpoint_a.link or endpoint_b.link or key in links:
+                continue
+            link = links[key] = Link(endpoint_a, endpoint_b)
+            self._set_enabled(link, enabled)
+            link.deactivate()
+            link.add_metadata(PROVISIONAL_KEY, True)
+
+        with self._write_lock:
+            links = [link for link in links.values()
+                     if not link.endpoint_a.link and not link.endpoint_b.link]
+            for link in links:
+                link.endpoint_a.update_link(link)
+                link.endpoint_b.update_link(link)
+            self._add_link(*links)
+            self.provisional_links.update(link.id for link in links)
+            self._metadata_index.update('links', *links)
+            self.notify_topology_update(*links, action='added')
+
+    def _confirm_provisional(self, *objs):
+        """Clear the provisional state of restored interfaces or links.
+
+        Returns:
+            list: The objects that were provisional.
+        """
+        confirmed = []
+        for obj in objs:
+            entities = ENTITIES[get_entity_name(obj)]
+            provisional = self.provisional_links if entities == 'links' \
+                else self.provisional_interfaces
+            if obj.id in provisional:
+                provisional.discard(obj.id)
+                obj.remove_metadata(PROVISIONAL_KEY)
+                self._metadata_index.update(entities, obj)
+                confirmed.append(obj)
+        return confirmed
+
+    @staticmethod
+    def _set_enabled(obj, enabled):
+        """Administratively enable or disable an object."""
+        if enabled:
+            obj.enable()
+        else:
+            obj.disable()
 
-        for link in self.links.values():
-            if new_link == link:
-                return link
+    def _schedule_warm_start_save(self):
+        """Schedule the next write of the topology snapshot."""
+        self._warm_start_timer = Timer(settings.WARM_START_INTERVAL,
+                                       self._on_warm_start_timer)
+        self._warm_start_timer.daemon = True
+        self._warm_start_timer.start()
 
-        self.links[new_link.id] = new_link
-        return new_link
+    def _on_warm_start_timer(self):
+        try:
+            self._save_warm_start()
+        finally:
+            self._schedule_warm_start_save()
 
-    def _get_switches_dict(self):
-        """Return a dictionary with the known switches."""
-        return {'switches': {s.id: s.as_dict() for s in
-                             self.controller.switches.values()}}
+    def _save_warm_start(self):
+        """Write the topology snapshot if the topology changed.
 
-    def _get_links_dict(self):
-        """Return a dictionary with the known links."""
-        return {'links': {l.id: l.as_dict() for l in
-                          self.links.values()}}
+        Nothing is written while the previous snapshot is being restored.
+        The switches and links are copied under the writer lock, so no
+        handler changes them meanwhile, and written once it is released.
+        """
+        with self._write_lock:
+            version = self.topology_version
+            if version == self._warm_start_version:
+                return
+            if self._warm_start_restore is not None and \
+                    self._warm_start_restore.is_alive():
+                return
+            switches = list(self._get_switches().values())
+            links = list(self.links.values())
+        try:
+            write_snapshot(settings.WARM_START_FILE, version, switches, links)
+        except OSError as error:
+            log.error('Error writing topology snapshot '
+                      f'{settings.WARM_START_FILE}: {error}')
+            return
+        self._warm_start_version = version
+        log.debug(f'Topology snapshot version {version} written.')
+
+    @staticmethod
+    def _endpoints_key(endpoint_a, endpoint_b):
+        """Return an order-independent key for a pair of endpoints."""
+        if endpoint_a.id <= endpoint_b.id:
+            return (endpoint_a.id, endpoint_b.id)
+        return (endpoint_b.id, endpoint_a.id)
+
+    def _get_link(self, endpoint_a, endpoint_b):
+        """Return the link between two endpoints or None if unknown."""
+        key = self._endpoints_key(endpoint_a, endpoint_b)
+        return self._links_by_endpoints.get(key)
 
-    def _get_topology_dict(self):
-        """Return a dictionary with the known topology."""
-        return {'topology': {**self._get_switches_dict(),
-                             **self._get_links_dict()}}
+    def _get_link_or_create(self, endpoint_a, endpoint_b):
+        """Return the link between two endpoints, creating it if needed."""
+        link = self._get_link(endpoint_a, endpoint_b)
+        if link is None:
+            link = Link(endpoint_a, endpoint_b)
+            self._add_link(link)
+        return link
+
+    def _get_interface_links(self, interface):
+        """Return the links having an interface as one of their endpoints."""
+        return list(self._links_by_interface.get(interface.id, {}).values())
+
+    def _add_link(self, *links):
+        """Add links to the topology and to the endpoint indexes."""
+        self.links.update({link.id: link for link in links})
+        now = monotonic()
+        for link in links:
+            key = self._endpoints_key(link.endpoint_a, link.endpoint_b)
+            self._links_by_endpoints[key] = link
+            for endpoint in link.endpoint_a, link.endpoint_b:
+                self._links_by_interface.setdefault(endpoint.id, {})[
+                    link.id] = link
+            self._links_seen[link.id] = now
+            self.graph.add_link(link)
+
+    def _remove_link(self, *links):
+        """Remove links from the topology and from the endpoint indexes."""
+        self.links.remove(*(link.id for link in links))
+        for link in links:
+            key = self._endpoints_key(link.endpoint_a, link.endpoint_b)
+            if self._links_by_endpoints.get(key) is link:
+                del self._links_by_endpoints[key]
+            for endpoint in link.endpoint_a, link.endpoint_b:
+                endpoint_links = self._links_by_interface.get(endpoint.id,
+                                                              {})
+                if endpoint_links.get(link.id) is link:
+                    del endpoint_links[link.id]
+                    if not endpoint_links:
+                        del self._links_by_interface[endpoint.id]
+            self._links_seen.pop(link.id, None)
+            self.graph.remove_link(link)
+
+    def _confirm_link(self, link):
+        """Record that a link was just seen, restarting its aging."""
+        if link and link.id in self.links:
+            self._links_seen[link.id] = monotonic()
+
+    def _get_link_expirations(self):
+        """Return the seconds left before each link expires, soonest first."""
+        now = monotonic()
+        expirations = [(seen + settings.LINK_AGING_TTL - now, link_id)
+                       for link_id, seen in list(self._links_seen.items())]
+        return sorted(expirations)
+
+    def _schedule_link_aging(self):
+        """Schedule the next sweep of expired links."""
+        self._link_aging_timer = Timer(settings.LINK_AGING_INTERVAL,
+                                       self._on_link_aging_timer)
+        self._link_aging_timer.daemon = True
+        self._link_aging_timer.start()
+
+    def _on_link_aging_timer(self):
+        try:
+            self.expire_links()
+        finally:
+            self._schedule_link_aging()
+
+    @writer
+    def expire_links(self):
+        """Remove the links not confirmed for `LINK_AGING_TTL` seconds.
+
+        Links are confirmed by LLDP and by link up events. An expired link
+        is removed from the topology, its interfaces no longer reference
+        it, and a `kytos/topology.link.removed` event is sent.
+
+        Returns:
+            list: The expired links, none when link aging is disabled.
+        """
+        expired = []
+        if not settings.LINK_AGING_TTL:
+            return expired
+        for expires_in, link_id in self._get_link_expirations():
+            if expires_in > 0:
+                break
+            link = self.links.get(link_id)
+            if link is None:
+                continue
+            for endpoint in link.endpoint_a, link.endpoint_b:
+                if endpoint.link is link:
+                    endpoint.link = None
+            self.provisional_links.discard(link.id)
+            self._forget_dampening(link.id)
+            self._metadata_index.remove('links', link.id)
+            expired.append(link)
+
+        if expired:
+            self._remove_link(*expired)
+            self.notify_topology_update(*expired, action='removed')
+            self.notify_topology_update(*(endpoint for link in expired
+                                          for endpoint in (link.endpoint_a,
+                                                           link.endpoint_b)))
+            for link in expired:
+                event = KytosEvent(name='kytos/topology.link.removed',
+                                   content={'link': link})
+                self._send_event(event)
+            log.info(f'{len(expired)} links expired.')
+        return expired
 
     def _get_topology(self):
         """Return an object representing the topology."""
-        return Topology(self.controller.switches, self.links)
+        return Topology(self._get_switches(), self.links.snapshot())
+
+    def _get_switches(self):
+        """Return a copy of the controller's switches, by id.
+
+        The controller changes its dict of switches in place, so readers
+        iterate a copy of it.
+        """
+        return dict(self.controller.switches)
+
+    def _get_interfaces(self):
+        """Return every interface of the controller's switches, by id.
+
+        Ports can be added to a switch without an event reaching this NApp,
+        as when OpenFlow 1.3 port descriptions follow the new switch, so
+        interfaces are listed from the switches. The interface index only
+        serves lookups by id.
+        """
+        return {interface.id: interface
+                for switch in self._get_switches().values()
+                for interface in list(switch.interfaces.values())}
+
+    def _index_interfaces(self, *interfaces):
+        """Add interfaces to the interface index."""
+        new = {interface.id: interface for interface in interfaces
+               if self._interfaces.get(interface.id) is not interface}
+        if new:
+            self._interfaces.update(new)
+
+    def _get_interface(self, interface_id):
+        """Return the interface with the given id.
+
+        Interfaces are looked up in the interface index. Ids missing from it
+        are resolved through their switch and indexed if found.
+
+        Raises:
+            KeyError: With the "Switch not found" or "Interface not found"
+                message if the interface does not exist.
+        """
+        interface = self._interfaces.get(interface_id)
+        if interface is not None:
+            return interface
+
+        switch_id, _, port = interface_id.rpartition(':')
+        try:
+            switch = self.controller.switches[switch_id]
+        except KeyError:
+            raise KeyError("Switch not found")
+
+        try:
+            interface = switch.interfaces[int(port)]
+        except (KeyError, ValueError):
+            raise KeyError("Interface not found")
+
+        self._index_interfaces(interface)
+        return interface
+
+    def _cached_response(self, key, build):
+        """Return a response with a cached body and an ETag.
+
+        The body is built as JSON by ``build()``. It is sent as JSON or
+        MessagePack and compressed with gzip or deflate as negotiated by
+        the Accept and Accept-Encoding headers. Each variant is encoded once
+        per topology generation. Answers with 304 when the request's
+        If-None-Match header matches the current generation and variant.
+        Cached bodies are rebuilt at least every `RESPONSE_CACHE_TTL`
+        seconds.
+        """
+        self._serialization.expire()
+        mimetype, encoding = negotiate(request.accept_mimetypes,
+                                       request.accept_encodings)
+        if self._stats is not None:
+            build = self._measured_build(key[0], build)
+        variant = ''.join(f'-{name}' for name in
+                          ('msgpack' if mimetype == MSGPACK else None,
+                           encoding) if name)
+        etag = f'{self._serialization.generation}{variant}'
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        elif not variant:
+            generation, body = self._serialization.get_body(key, build)
+            etag = str(generation)
+            response = Response(body, mimetype=JSON)
+        else:
+            def encode():
+                body = self._serialization.get_body(key, build)[1]
+                coding = encoding
+                if len(body) < settings.RESPONSE_COMPRESSION_MIN_SIZE:
+                    coding = None
+                return encode_body(body, mimetype, coding,
+                                   settings.RESPONSE_COMPRESSION_LEVEL), coding
+
+            if self._stats is not None:
+                encode = self._measured_build(f'{key[0]}{variant}', encode)
+            generation, (body, coding) = self._serialization.get_body(
+                (key, mimetype, encoding), encode)
+            etag = f'{generation}{variant}'
+            response = Response(body, mimetype=mimetype)
+            if coding:
+                response.content_encoding = coding
+        response.vary.update(('Accept', 'Accept-Encoding'))
+        response.set_etag(etag)
+        return response
+
+    def _measured_build(self, name, build):
+        """Return ``build`` adding its time and body size to the stats."""
+        def measured():
+            start = perf_counter()
+            body = build()
+            size = len(body[0] if isinstance(body, tuple) else body)
+            self._stats.serialized(name, perf_counter() - start, size)
+            return body
+        return measured
+
+    def _list_response(self, entities, objects):
+        """Return a cached response listing switches, interfaces or links.
+
+        The ``active``, ``enabled``, ``nni`` and ``switch`` query arguments
+        filter the objects, ``fields`` selects the attributes returned and
+        ``limit``/``cursor`` paginate them. The response of a page that is
+        not the last one has the ``next_cursor`` to request next.
+
+        Args:
+            entities (str): 'switches', 'interfaces' or 'links'.
+            objects (callable): Returns the objects to list.
+        """
+        try:
+            query = ListQuery.from_args(entities, request.args)
+        except ValueError as error:
+            return jsonify(error.args[0]), 400
+
+        def build():
+            page, cursor = query.apply(objects())
+            body = (b'{"' + entities.encode() + b'": ' +
+                    query.encode(page, self._serialization))
+            if cursor is not None:
+                body += b', "next_cursor": ' + json.dumps(cursor).encode()
+            return body + b'}'
+
+        return self._cached_response((entities, request.query_string), build)
 
     @rest('v3/')
+    @timed('endpoints')
     def get_topology(self):
         """Return the latest known topology.
 
-        This topology is updated when there are network events.
+        This topology is updated when there are network events. Switches
+        and links can be filtered and projected with the same query
+        arguments as `v3/switches` and `v3/links`, but not paginated.
+        """
+        args = request.args.to_dict()
+        try:
+            links = ListQuery.from_args('links', args, paginate=False)
+            args.pop('nni', None)
+            switches = ListQuery.from_args('switches', args, paginate=False)
+        except ValueError as error:
+            return jsonify(error.args[0]), 400
+
+        def build():
+            return (b'{"topology": {"switches": ' +
+                    switches.encode(
+                        switches.apply(self._get_switches().values())[0],
+                        self._serialization) +
+                    b', "links": ' +
+                    links.encode(links.apply(self.links.values())[0],
+                                 self._serialization) +
+                    b'}}')
+
+        return self._cached_response(('topology', request.query_string),
+                                     build)
+
+    # Change feed methods
+    @staticmethod
+    def _encode_sse(name, data, seq=None):
+        """Return a Server-Sent Events message."""
+        message = f'event: {name}\ndata: {json.dumps(data)}\n\n'
+        if seq is not None:
+            message = f'id: {seq}\n' + message
+        return message
+
+    @rest('v3/events')
+    @timed('endpoints')
+    def stream_events(self):
+        """Stream topology and metadata changes as Server-Sent Events.
+
+        Clients resume after reconnecting through the ``since`` query
+        argument or the Last-Event-ID header. A ``reset`` event tells them
+        that changes were lost and the whole topology must be fetched again.
+        Clients too slow to keep up get an ``evicted`` event and are
+        disconnected.
+        """
+        since = request.args.get('since', type=int)
+        if since is None:
+            since = request.headers.get('Last-Event-ID', type=int)
+        subscriber, resumed = self._feed.subscribe(since)
+
+        def stream():
+            try:
+                name = 'ready' if resumed else 'reset'
+                yield self._encode_sse(name, {'seq': subscriber.sequence},
+                                       subscriber.sequence)
+                while True:
+                    changes = subscriber.get(settings.FEED_KEEPALIVE)
+                    if subscriber.evicted:
+                        yield self._encode_sse('evicted', {})
+                        return
+                    if not changes:
+                        yield ': keepalive\n\n'
+                    for change in changes:
+                        yield self._encode_sse(change['event'],
+                                               change['data'], change['seq'])
+            finally:
+                subscriber.close()
+
+        return Response(stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache',
+                                 'X-Accel-Buffering': 'no'})
+
+    @rest('v3/events/poll')
+    @timed('endpoints')
+    def poll_events(self):
+        """Return the changes after a sequence number, waiting for one.
+
+        Waits up to ``timeout`` seconds (capped by `FEED_POLL_MAX_TIMEOUT`)
+        for changes after ``since``. Without ``since``, the current sequence
+        number is returned right away. ``reset`` is true when changes were
+        lost and the whole topology must be fetched again.
+        """
+        since = request.args.get('since', type=int)
+        if since is None:
+            return jsonify({'events': [], 'seq': self._feed.sequence,
+                            'reset': False}), 200
+
+        timeout = request.args.get('timeout', settings.FEED_POLL_MAX_TIMEOUT,
+                                   type=float)
+        timeout = min(max(timeout, 0), settings.FEED_POLL_MAX_TIMEOUT)
+        changes, complete = self._feed.wait_since(since, timeout)
+        if not complete:
+            return jsonify({'events': [], 'seq': self._feed.sequence,
+                            'reset': True}), 200
+
+        changes = changes[:settings.FEED_CLIENT_BUFFER]
+        seq = changes[-1]['seq'] if changes else since
+        return jsonify({'events': changes, 'seq': seq, 'reset': False}), 200
+
+    # Host related methods
+    def _get_host_dict(self, host, now):
+        """Return a host with its idle time and the links to it."""
+        data = host.as_dict()
+        data['idle'] = round(now - host.last_seen, 3)
+        links = [[host.interface, host.mac]]
+        if settings.DISPLAY_FULL_DUPLEX_LINKS:
+            links.append([host.mac, host.interface])
+        data['links'] = links
+        return data
+
+    @rest('v3/hosts')
+    @timed('endpoints')
+    def get_hosts(self):
+        """Return the hosts learned at the edge of the topology.
+
+        The ``switch`` and ``interface`` query arguments filter the hosts,
+        and ``limit``/``cursor`` paginate them by MAC address.
+        """
+        pages = {name: request.args[name] for name in ('limit', 'cursor')
+                 if name in request.args}
+        try:
+            query = ListQuery.from_args('hosts', pages)
+        except ValueError as error:
+            return jsonify(error.args[0]), 400
+        if query.cursor is not None:
+            query.cursor = query.cursor.lower()
+
+        hosts, next_cursor = query.apply(self.hosts.find(
+            request.args.get('switch'), request.args.get('interface')))
+        now = monotonic()
+        data = {"hosts": {host.mac: self._get_host_dict(host, now)
+                          for host in hosts}}
+        if next_cursor is not None:
+            data["next_cursor"] = next_cursor
+        return jsonify(data), 200
+
+    @rest('v3/hosts/<mac>')
+    @timed('endpoints')
+    def get_host(self, mac):
+        """Return a host by MAC address."""
+        host = self.hosts.get(mac)
+        if host is None:
+            return jsonify("Host not found"), 404
+        return jsonify(self._get_host_dict(host, monotonic())), 200
+
+    # Stats methods
+    @rest('v3/stats')
+    def get_stats(self):
+        """Return the counters and latency histograms of the NApp.
+
+        Latencies are in seconds, by handler, endpoint, serialized response
+        and storehouse request. Events sent are counted by name, and the
+        seconds each storehouse box took to load since startup are listed
+        by box.
+        """
+        if self._stats is None:
+            return jsonify("Stats are disabled"), 404
+        return jsonify(self._stats.as_dict()), 200
+
+    @rest('v3/stats/prometheus')
+    def get_stats_prometheus(self):
+        """Return the counters and histograms in Prometheus text format."""
+        if self._stats is None:
+            return jsonify("Stats are disabled"), 404
+        return Response(self._stats.prometheus(),
+                        mimetype='text/plain; version=0.0.4')
+
+    @rest('v3/stats/profile/<name>')
+    def get_stats_profile(self, name):
+        """Return the profile collected for a handler or endpoint."""
+        profile = None if self._stats is None else \
+            self._stats.get_profile(name)
+        if profile is None:
+            return jsonify("Not being profiled"), 404
+        return Response(profile, mimetype='text/plain')
+
+    @rest('v3/stats/profile/<name>', methods=['POST'])
+    def start_stats_profile(self, name):
+        """Profile a sample of the calls to a handler or endpoint.
+
+        The ``rate`` query argument is the fraction of calls profiled,
+        `STATS_PROFILE_RATE` by default.
         """
-        return jsonify(self._get_topology_dict())
+        if self._stats is None:
+            return jsonify("Stats are disabled"), 404
+        rate = request.args.get('rate', settings.STATS_PROFILE_RATE,
+                                type=float)
+        if not 0 < rate <= 1:
+            return jsonify("rate must be in (0, 1]"), 400
+        self._stats.start_profile(name, rate)
+        return jsonify("Operation successful"), 201
+
+    @rest('v3/stats/profile/<name>', methods=['DELETE'])
+    def stop_stats_profile(self, name):
+        """Stop profiling a handler or endpoint and drop its profile."""
+        if self._stats is not None:
+            self._stats.stop_profile(name)
+        return jsonify("Operation successful"), 200
 
     # Switch related methods
     @rest('v3/switches')
+    @timed('endpoints')
     def get_switches(self):
-        """Return a json with all the switches in the topology."""
-        return jsonify(self._get_switches_dict())
+        """Return a json with the switches in the topology.
+
+        See `_list_response` for the filtering and pagination arguments.
+        """
+        return self._list_response(
+            'switches', lambda: self._get_switches().values())
+
+    @rest('v3/switches/search')
+    @timed('endpoints')
+    def search_switches(self):
+        """Return summaries of the switches matching a search.
+
+        The ``q`` query argument is matched against the prefixes of the
+        words of the switch id, dpid, connection address and
+        `SWITCH_SEARCH_METADATA` metadata.
+        At most ``limit`` switches are returned.
+        """
+        query = request.args.get('q', '')
+        limit = request.args.get('limit', settings.SWITCH_SEARCH_LIMIT,
+                                 type=int)
+        if limit < 1:
+            return jsonify("limit must be a positive integer"), 400
+
+        limit = min(limit, settings.SWITCH_SEARCH_MAX_LIMIT)
+        switches = self._switch_search.search(query, limit)
+        return jsonify({"switches": [self._switch_search.summarize(switch)
+                                     for switch in switches]}), 200
+
+    @rest('v3/switches/<dpid>')
+    @timed('endpoints')
+    def get_switch(self, dpid):
+        """Return a json with a single switch of the topology."""
+        try:
+            return jsonify(get_dict(self.controller.switches[dpid])), 200
+        except KeyError:
+            return jsonify("Switch not found"), 404
 
     @rest('v3/switches/<dpid>/enable', methods=['POST'])
+    @timed('endpoints')
+    @writer
     def enable_switch(self, dpid):
         """Administratively enable a switch in the topology."""
         try:
-            self.controller.switches[dpid].enable()
-            return jsonify("Operation successful"), 201
+            switch = self.controller.switches[dpid]
         except KeyError:
             return jsonify("Switch not found"), 404
 
+        switch.enable()
+        self.notify_topology_update(switch, action='enabled')
+        return jsonify("Operation successful"), 201
+
     @rest('v3/switches/<dpid>/disable', methods=['POST'])
+    @timed('endpoints')
+    @writer
     def disable_switch(self, dpid):
         """Administratively disable a switch in the topology."""
         try:
-            self.controller.switches[dpid].disable()
-            return jsonify("Operation successful"), 201
+            switch = self.controller.switches[dpid]
         except KeyError:
             return jsonify("Switch not found"), 404
 
+        switch.disable()
+        self.notify_topology_update(switch, action='disabled')
+        return jsonify("Operation successful"), 201
+
     @rest('v3/switches/<dpid>/metadata')
+    @timed('endpoints')
     def get_switch_metadata(self, dpid):
         """Get metadata from a switch."""
         try:
@@ -107,6 +872,8 @@ class Main(KytosNApp):
             return jsonify("Switch not found"), 404
 
     @rest('v3/switches/<dpid>/metadata', methods=['POST'])
+    @timed('endpoints')
+    @writer
     def add_switch_metadata(self, dpid):
         """Add metadata to a switch."""
         metadata = request.get_json()
@@ -116,10 +883,13 @@ class Main(KytosNApp):
             return jsonify("Switch not found"), 404
 
         switch.extend_metadata(metadata)
+        self._switch_search.update(switch)
         self.notify_metadata_changes(switch, 'added')
         return jsonify("Operation successful"), 201
 
     @rest('v3/switches/<dpid>/metadata/<key>', methods=['DELETE'])
+    @timed('endpoints')
+    @writer
     def delete_switch_metadata(self, dpid, key):
         """Delete metadata from a switch."""
         try:
@@ -128,110 +898,295 @@ class Main(KytosNApp):
             return jsonify("Switch not found"), 404
 
         switch.remove_metadata(key)
+        self._switch_search.update(switch)
         self.notify_metadata_changes(switch, 'removed')
         return jsonify("Operation successful"), 200
 
+    @rest('v3/switches/<dpid>/neighbors')
+    @timed('endpoints')
+    def get_switch_neighbors(self, dpid):
+        """Return the neighbors of a switch through usable links."""
+        if dpid not in self.controller.switches:
+            return jsonify("Switch not found"), 404
+        return jsonify({"neighbors": self.graph.get_neighbors(dpid)}), 200
+
+    @rest('v3/switches/<dpid>/reachable')
+    @timed('endpoints')
+    def get_reachable_switches(self, dpid):
+        """Return the switches reachable from a switch."""
+        if dpid not in self.controller.switches:
+            return jsonify("Switch not found"), 404
+        return jsonify({"switches": self.graph.get_reachable(dpid)}), 200
+
+    # Path related methods
+    @rest('v3/paths/<source>/<destination>')
+    @timed('endpoints')
+    def get_shortest_paths(self, source, destination):
+        """Return the k shortest paths between two switches.
+
+        The number of paths is given by the optional ``k`` query argument,
+        up to `MAX_SHORTEST_PATHS`.
+        """
+        for dpid in source, destination:
+            if dpid not in self.controller.switches:
+                return jsonify("Switch not found"), 404
+        k = request.args.get('k', 1, type=int)
+        if k < 1:
+            return jsonify("k must be a positive integer"), 400
+        if k > settings.MAX_SHORTEST_PATHS:
+            return jsonify("k must not be greater than "
+                           f"{settings.MAX_SHORTEST_PATHS}"), 400
+
+        paths = self.graph.get_shortest_paths(source, destination, k)
+        return jsonify({"paths": paths}), 200
+
+    # Bulk methods
+    def _get_entity(self, entities, obj_id):
+        """Return the switch, interface or link with the given id.
+
+        Raises:
+            KeyError: With a not found message if it does not exist.
+        """
+        if entities == 'interfaces':
+            return self._get_interface(obj_id)
+        if entities == 'switches':
+            objs, message = self.controller.switches, "Switch not found"
+        else:
+            objs, message = self.links, "Link not found"
+        try:
+            return objs[obj_id]
+        except KeyError:
+            raise KeyError(message)
+
+    def _bulk_apply(self, entities, items, operation):
+        """Apply an operation to many entities, collecting per-item status.
+
+        Args:
+            entities (str): 'switches', 'interfaces' or 'links'.
+            items (iterable): Pairs of entity id and operation argument.
+            operation (callable): Called with each object and argument. It
+                returns an error message or None on success, and raises
+                KeyError with a message if something is not found.
+
+        Returns:
+            tuple: The objects changed and a dict mapping each id to its
+            status code and message.
+        """
+        changed = []
+        results = {}
+        for obj_id, argument in items:
+            try:
+                obj = self._get_entity(entities, obj_id)
+                error = operation(obj, argument)
+            except KeyError as not_found:
+                results[obj_id] = {'code': 404,
+                                   'message': not_found.args[0]}
+                continue
+
+            if error:
+                results[obj_id] = {'code': 400, 'message': error}
+            else:
+                changed.append(obj)
+                results[obj_id] = {'code': 200,
+                                   'message': "Operation successful"}
+        return changed, results
+
+    @rest('v3/<entities>/enable', methods=['POST'])
+    @timed('endpoints')
+    @writer
+    def bulk_enable(self, entities):
+        """Administratively enable many switches, interfaces or links.
+
+        The request body is a list of ids.
+        """
+        return self._bulk_set_enabled(entities, True)
+
+    @rest('v3/<entities>/disable', methods=['POST'])
+    @timed('endpoints')
+    @writer
+    def bulk_disable(self, entities):
+        """Administratively disable many switches, interfaces or links.
+
+        The request body is a list of ids.
+        """
+        return self._bulk_set_enabled(entities, False)
+
+    def _bulk_set_enabled(self, entities, enabled):
+        """Enable or disable every entity listed in the request body."""
+        if entities not in ENTITIES.values():
+            return jsonify("Entities not found"), 404
+        ids = request.get_json()
+        if not isinstance(ids, list):
+            return jsonify("Expected a list of ids"), 400
+
+        def set_enabled(obj, _):
+            if enabled:
+                obj.enable()
+            else:
+                obj.disable()
+
+        changed, results = self._bulk_apply(entities,
+                                            ((i, None) for i in ids),
+                                            set_enabled)
+        if changed:
+            action = 'enabled' if enabled else 'disabled'
+            self.notify_topology_update(*changed, action=action)
+        return jsonify(results), 200
+
+    @rest('v3/<entities>/metadata', methods=['POST'])
+    @timed('endpoints')
+    @writer
+    def bulk_add_metadata(self, entities):
+        """Add metadata to many switches, interfaces or links.
+
+        The request body maps each id to the metadata to add to it. A single
+        `kytos/topology.{entities}.metadata.bulk_added` event and storehouse
+        write is issued for the whole batch.
+        """
+        if entities not in ENTITIES.values():
+            return jsonify("Entities not found"), 404
+        metadata = request.get_json()
+        if not isinstance(metadata, dict):
+            return jsonify("Expected a map of id to metadata"), 400
+
+        def extend_metadata(obj, items):
+            if not isinstance(items, dict):
+                return "Expected a metadata object"
+            obj.extend_metadata(items)
+            return None
+
+        changed, results = self._bulk_apply(entities, metadata.items(),
+                                            extend_metadata)
+        if changed:
+            if entities == 'switches':
+                self._switch_search.update(*changed)
+            self.notify_bulk_metadata_changes(entities, changed, 'added')
+        return jsonify(results), 200
+
+    @rest('v3/<entities>/metadata', methods=['DELETE'])
+    @timed('endpoints')
+    @writer
+    def bulk_delete_metadata(self, entities):
+        """Delete metadata from many switches, interfaces or links.
+
+        The request body maps each id to the list of keys to delete from it.
+        A single `kytos/topology.{entities}.metadata.bulk_removed` event and
+        storehouse write is issued for the whole batch.
+        """
+        if entities not in ENTITIES.values():
+            return jsonify("Entities not found"), 404
+        keys = request.get_json()
+        if not isinstance(keys, dict):
+            return jsonify("Expected a map of id to metadata keys"), 400
+
+        def remove_metadata(obj, obj_keys):
+            if not isinstance(obj_keys, list):
+                return "Expected a list of metadata keys"
+            removed = [key for key in obj_keys if key in obj.metadata and
+                       obj.remove_metadata(key) is not False]
+            if not removed:
+                raise KeyError("Metadata not found")
+            return None
+
+        changed, results = self._bulk_apply(entities, keys.items(),
+                                            remove_metadata)
+        if changed:
+            if entities == 'switches':
+                self._switch_search.update(*changed)
+            self.notify_bulk_metadata_changes(entities, changed, 'removed')
+        return jsonify(results), 200
+
+    @rest('v3/<entities>/query', methods=['POST'])
+    @timed('endpoints')
+    def query_metadata(self, entities):
+        """Return the ids of switches, interfaces or links by metadata.
+
+        The request body maps metadata keys to a value or to an object with
+        ``eq``, ``in``, ``gt``, ``gte``, ``lt`` and ``lte`` operators. Only
+        entities matching every condition are returned.
+        """
+        if entities not in ENTITIES.values():
+            return jsonify("Entities not found"), 404
+        try:
+            ids = self._metadata_index.query(entities, request.get_json())
+        except QueryError as error:
+            return jsonify(error.args[0]), 400
+        return jsonify({entities: ids}), 200
+
     # Interface related methods
     @rest('v3/interfaces')
+    @timed('endpoints')
     def get_interfaces(self):
-        """Return a json with all the interfaces in the topology."""
-        interfaces = {}
-        switches = self._get_switches_dict()
-        for switch in switches['switches'].values():
-            for interface_id, interface in switch['interfaces'].items():
-                interfaces[interface_id] = interface
+        """Return a json with the interfaces in the topology.
 
-        return jsonify({'interfaces': interfaces})
+        See `_list_response` for the filtering and pagination arguments.
+        """
+        return self._list_response(
+            'interfaces', lambda: self._get_interfaces().values())
 
     @rest('v3/interfaces/<interface_id>/enable', methods=['POST'])
+    @timed('endpoints')
+    @writer
     def enable_interface(self, interface_id):
         """Administratively enable an interface in the topology."""
-        switch_id = ":".join(interface_id.split(":")[:-1])
-        interface_number = int(interface_id.split(":")[-1])
-
-        try:
-            switch = self.controller.switches[switch_id]
-        except KeyError:
-            return jsonify("Switch not found"), 404
-
         try:
-            switch.interfaces[interface_number].enable()
-        except KeyError:
-            return jsonify("Interface not found"), 404
+            interface = self._get_interface(interface_id)
+        except KeyError as error:
+            return jsonify(error.args[0]), 404
 
+        interface.enable()
+        self.notify_topology_update(interface, action='enabled')
         return jsonify("Operation successful"), 201
 
     @rest('v3/interfaces/<interface_id>/disable', methods=['POST'])
+    @timed('endpoints')
+    @writer
     def disable_interface(self, interface_id):
         """Administratively disable an interface in the topology."""
-        switch_id = ":".join(interface_id.split(":")[:-1])
-        interface_number = int(interface_id.split(":")[-1])
-
-        try:
-            switch = self.controller.switches[switch_id]
-        except KeyError:
-            return jsonify("Switch not found"), 404
-
         try:
-            switch.interfaces[interface_number].disable()
-        except KeyError:
-            return jsonify("Interface not found"), 404
+            interface = self._get_interface(interface_id)
+        except KeyError as error:
+            return jsonify(error.args[0]), 404
 
+        interface.disable()
+        self.notify_topology_update(interface, action='disabled')
         return jsonify("Operation successful"), 201
 
     @rest('v3/interfaces/<interface_id>/metadata')
+    @timed('endpoints')
     def get_interface_metadata(self, interface_id):
         """Get metadata from an interface."""
-        switch_id = ":".join(interface_id.split(":")[:-1])
-        interface_number = int(interface_id.split(":")[-1])
         try:
-            switch = self.controller.switches[switch_id]
-        except KeyError:
-            return jsonify("Switch not found"), 404
-
-        try:
-            interface = switch.interfaces[interface_number]
-        except KeyError:
-            return jsonify("Interface not found"), 404
+            interface = self._get_interface(interface_id)
+        except KeyError as error:
+            return jsonify(error.args[0]), 404
 
         return jsonify({"metadata": interface.metadata}), 200
 
     @rest('v3/interfaces/<interface_id>/metadata', methods=['POST'])
+    @timed('endpoints')
+    @writer
     def add_interface_metadata(self, interface_id):
         """Add metadata to an interface."""
         metadata = request.get_json()
-
-        switch_id = ":".join(interface_id.split(":")[:-1])
-        interface_number = int(interface_id.split(":")[-1])
-        try:
-            switch = self.controller.switches[switch_id]
-        except KeyError:
-            return jsonify("Switch not found"), 404
-
         try:
-            interface = switch.interfaces[interface_number]
-        except KeyError:
-            return jsonify("Interface not found"), 404
+            interface = self._get_interface(interface_id)
+        except KeyError as error:
+            return jsonify(error.args[0]), 404
 
         interface.extend_metadata(metadata)
         self.notify_metadata_changes(interface, 'added')
         return jsonify("Operation successful"), 201
 
     @rest('v3/interfaces/<interface_id>/metadata/<key>', methods=['DELETE'])
+    @timed('endpoints')
+    @writer
     def delete_interface_metadata(self, interface_id, key):
         """Delete metadata from an interface."""
-        switch_id = ":".join(interface_id.split(":")[:-1])
-        interface_number = int(interface_id.split(":")[-1])
-
         try:
-            switch = self.controller.switches[switch_id]
-        except KeyError:
-            return jsonify("Switch not found"), 404
-
-        try:
-            interface = switch.interfaces[interface_number]
-        except KeyError:
-            return jsonify("Interface not found"), 404
+            interface = self._get_interface(interface_id)
+        except KeyError as error:
+            return jsonify(error.args[0]), 404
 
         if interface.remove_metadata(key) is False:
             return jsonify("Metadata not found"), 404
@@ -241,34 +1196,96 @@ class Main(KytosNApp):
 
     # Link related methods
     @rest('v3/links')
+    @timed('endpoints')
     def get_links(self):
         """Return a json with all the links in the topology.
 
-        Links are connections between interfaces.
+        Links are connections between interfaces. See `_list_response` for
+        the filtering and pagination arguments.
         """
-        return jsonify(self._get_links_dict()), 200
+        return self._list_response('links', self.links.values)
+
+    @rest('v3/links/expirations')
+    @timed('endpoints')
+    def get_link_expirations(self):
+        """Return the links waiting to expire and the seconds left.
+
+        Only links expiring within ``within`` seconds are listed when that
+        query argument is given.
+        """
+        if not settings.LINK_AGING_TTL:
+            return jsonify({"expirations": []}), 200
+        within = request.args.get('within', type=float)
+        expirations = [{"id": link_id, "expires_in": max(expires_in, 0)}
+                       for expires_in, link_id in
+                       self._get_link_expirations()
+                       if within is None or expires_in <= within]
+        return jsonify({"expirations": expirations}), 200
+
+    @rest('v3/links/dampening')
+    @timed('endpoints')
+    def get_links_dampening(self):
+        """Return the flap dampening state of the penalized links."""
+        return jsonify({"links": self._dampening.get_states()}), 200
+
+    @rest('v3/links/<link_id>/dampening')
+    @timed('endpoints')
+    def get_link_dampening(self, link_id):
+        """Return the flap dampening state of a link."""
+        if link_id not in self.links:
+            return jsonify("Link not found"), 404
+        state = self._dampening.get_state(link_id) or \
+            {'penalty': 0, 'flaps': 0, 'suppressed': False, 'reuse_in': 0}
+        return jsonify(state), 200
+
+    @rest('v3/links/<link_id>/dampening/release', methods=['POST'])
+    @timed('endpoints')
+    @writer
+    def release_link_dampening(self, link_id):
+        """Release a link held down by flap dampening, forgetting its penalty.
+
+        Links not suppressed are left as they are.
+        """
+        try:
+            link = self.links[link_id]
+        except KeyError:
+            return jsonify("Link not found"), 404
+
+        if not self._dampening.release(link_id):
+            return jsonify("Link is not suppressed"), 409
+        self._reuse_link(link)
+        return jsonify("Operation successful"), 201
 
     @rest('v3/links/<link_id>/enable', methods=['POST'])
+    @timed('endpoints')
+    @writer
     def enable_link(self, link_id):
         """Administratively enable a link in the topology."""
         try:
-            self.links[link_id].enable()
+            link = self.links[link_id]
         except KeyError:
             return jsonify("Link not found"), 404
 
+        link.enable()
+        self.notify_topology_update(link, action='enabled')
         return jsonify("Operation successful"), 201
 
     @rest('v3/links/<link_id>/disable', methods=['POST'])
+    @timed('endpoints')
+    @writer
     def disable_link(self, link_id):
         """Administratively disable a link in the topology."""
         try:
-            self.links[link_id].disable()
+            link = self.links[link_id]
         except KeyError:
             return jsonify("Link not found"), 404
 
+        link.disable()
+        self.notify_topology_update(link, action='disabled')
         return jsonify("Operation successful"), 201
 
     @rest('v3/links/<link_id>/metadata')
+    @timed('endpoints')
     def get_link_metadata(self, link_id):
         """Get metadata from a link."""
         try:
@@ -277,6 +1294,8 @@ class Main(KytosNApp):
             return jsonify("Link not found"), 404
 
     @rest('v3/links/<link_id>/metadata', methods=['POST'])
+    @timed('endpoints')
+    @writer
     def add_link_metadata(self, link_id):
         """Add metadata to a link."""
         metadata = request.get_json()
@@ -290,6 +1309,8 @@ class Main(KytosNApp):
         return jsonify("Operation successful"), 201
 
     @rest('v3/links/<link_id>/metadata/<key>', methods=['DELETE'])
+    @timed('endpoints')
+    @writer
     def delete_link_metadata(self, link_id, key):
         """Delete metadata from a link."""
         try:
@@ -304,171 +1325,592 @@ class Main(KytosNApp):
         return jsonify("Operation successful"), 200
 
     @listen_to('.*.switch.(new|reconnected)')
+    @timed('handlers')
+    @writer
+    @recorded
     def handle_new_switch(self, event):
         """Create a new Device on the Topology.
 
         Handle the event of a new created switch and update the topology with
-        this new device.
+        this new device. The interfaces deactivated when a reconnected
+        switch lost its connection are activated again, and are notified
+        with the links coming back up with them.
         """
         switch = event.content['switch']
         switch.activate()
+        restored = self._confirm_provisional(*switch.interfaces.values())
+        reconnected = self._pop_lost_interfaces(switch)
+        for interface in restored + reconnected:
+            interface.activate()
+        self._activate_provisional_links(*switch.interfaces.values())
         log.debug('Switch %s added to the Topology.', switch.id)
-        self.notify_topology_update()
+        self._index_interfaces(*switch.interfaces.values())
+        self._switch_search.update(switch)
+        action = 'added' if event.name.endswith('.new') else 'activated'
+        self.notify_topology_update(switch, action=action)
+        links = {link.id: link for interface in reconnected
+                 for link in self._get_interface_links(interface)}
+        self.notify_topology_update(*restored, *reconnected,
+                                    *(link for link in links.values()
+                                      if link.is_active()),
+                                    action='activated')
         self.update_instance_metadata(switch)
 
     @listen_to('.*.connection.lost')
+    @timed('handlers')
+    @writer
+    @recorded
     def handle_connection_lost(self, event):
         """Remove a Device from the topology.
 
-        Remove the disconnected Device and every link that has one of its
-        interfaces.
+        The disconnected Device and its interfaces are deactivated in one
+        pass. The links of those interfaces go down with their endpoints and
+        are notified together with them.
         """
         switch = event.content['source'].switch
         if switch:
-            switch.deactivate()
+            changed = self._deactivate_switch(switch)
+            self._switch_search.update(switch)
             log.debug('Switch %s removed from the Topology.', switch.id)
-            self.notify_topology_update()
+            self.notify_topology_update(*changed, action='deactivated')
+
+    def _deactivate_switch(self, switch):
+        """Deactivate a switch and its interfaces.
+
+        Links are left enabled: they are inactive while an endpoint is, so
+        they come back up with the interfaces when the switch reconnects.
+        The interfaces deactivated are recorded for `_pop_lost_interfaces`.
+
+        Returns:
+            list: The switch, and the interfaces and links that were active.
+        """
+        interfaces = list(switch.interfaces.values())
+        links = {link.id: link for interface in interfaces
+                 for link in self._get_interface_links(interface)}
+        # Links are checked first since their state follows the state of
+        # their endpoints.
+        links = [link for link in links.values() if link.is_active()]
+        interfaces = [interface for interface in interfaces
+                      if interface.is_active()]
+
+        switch.deactivate()
+        for interface in interfaces:
+            interface.deactivate()
+        self._interfaces_lost.setdefault(switch.id, {}).update(
+            (interface.id, interface) for interface in interfaces)
+        return [switch] + interfaces + links
+
+    def _pop_lost_interfaces(self, switch):
+        """Return the interfaces to reactivate with a reconnected switch.
+
+        These are the interfaces `_deactivate_switch` deactivated when the
+        connection was lost, if the switch still has them.
+        """
+        lost = self._interfaces_lost.pop(switch.id, {})
+        return [interface for interface in lost.values()
+                if switch.interfaces.get(interface.port_number) is interface
+                and not interface.is_active()]
 
     @listen_to('.*.switch.interface.up')
+    @timed('handlers')
+    @writer
+    @recorded
     def handle_interface_up(self, event):
         """Update the topology based on a Port Modify event.
 
         The event notifies that an interface was changed to 'up'.
         """
-        interface = event.content['interface']
-        interface.activate()
-        self.notify_topology_update()
-        self.update_instance_metadata(interface)
+        self._interface_up(event.content['interface'], 'activated')
 
     @listen_to('.*.switch.interface.created')
+    @timed('handlers')
+    @writer
+    @recorded
     def handle_interface_created(self, event):
         """Update the topology based on a Port Create event."""
-        self.handle_interface_up(event)
+        self._interface_up(event.content['interface'], 'added')
+
+    def _interface_up(self, interface, action):
+        """Activate an interface and the provisional links it completes."""
+        interface.activate()
+        self._confirm_provisional(interface)
+        self._index_interfaces(interface)
+        self._activate_provisional_links(interface)
+        self.notify_topology_update(interface, action=action)
+        self.update_instance_metadata(interface)
 
     @listen_to('.*.switch.interface.down')
+    @timed('handlers')
+    @writer
+    @recorded
     def handle_interface_down(self, event):
         """Update the topology based on a Port Modify event.
 
         The event notifies that an interface was changed to 'down'.
         """
-        interface = event.content['interface']
-        interface.deactivate()
-        self.handle_interface_link_down(event)
-        self.notify_topology_update()
+        self._interface_down(event.content['interface'], 'deactivated')
 
     @listen_to('.*.switch.interface.deleted')
+    @timed('handlers')
+    @writer
+    @recorded
     def handle_interface_deleted(self, event):
         """Update the topology based on a Port Delete event."""
-        self.handle_interface_down(event)
+        interface = event.content['interface']
+        self._interface_down(interface, 'removed')
+        if self._interfaces.get(interface.id) is interface:
+            del self._interfaces[interface.id]
+            self._metadata_index.remove('interfaces', interface.id)
+        self.provisional_interfaces.discard(interface.id)
+        self._remove_hosts(interface)
+
+    def _interface_down(self, interface, action):
+        """Deactivate an interface, taking its link down with it."""
+        interface.deactivate()
+        self._interface_link_down(interface)
+        self.notify_topology_update(interface, action=action)
 
     @listen_to('.*.switch.interface.link_up')
+    @timed('handlers')
+    @writer
+    @recorded
     def handle_interface_link_up(self, event):
         """Update the topology based on a Port Modify event.
 
         The event notifies that an interface's link was changed to 'up'.
         """
         interface = event.content['interface']
-        if interface.link:
-            interface.link.activate()
-        self.notify_topology_update()
-        self.update_instance_metadata(interface.link)
+        link = interface.link
+        if link:
+            self._confirm_link(link)
+            self._links_down.discard(link.id)
+            if self._dampening.is_suppressed(link.id):
+                self._links_held_up.add(link.id)
+                log.debug(f'Link {link.id} is up but held down.')
+                return
+            link.activate()
+        self.notify_topology_update(link, action='activated')
+        self.update_instance_metadata(link)
 
     @listen_to('.*.switch.interface.link_down')
+    @timed('handlers')
+    @writer
+    @recorded
     def handle_interface_link_down(self, event):
         """Update the topology based on a Port Modify event.
 
         The event notifies that an interface's link was changed to 'down'.
         """
-        interface = event.content['interface']
-        if interface.link:
-            interface.link.deactivate()
-        self.notify_topology_update()
+        self._interface_link_down(event.content['interface'])
+
+    def _interface_link_down(self, interface):
+        """Take the link of an interface down.
+
+        Each time a link goes down counts as a flap, and links flapping too
+        often are held down. See the `LINK_FLAP_*` settings.
+        """
+        link = interface.link
+        if link:
+            self._links_held_up.discard(link.id)
+            if link.id in self._links_down:
+                return
+            self._links_down.add(link.id)
+            held_down = self._dampening.is_suppressed(link.id)
+            if self._dampening.flap(link.id) and not held_down:
+                self._suppress_link(link)
+            link.deactivate()
+            if held_down:
+                self._schedule_link_reuse(link.id)
+                return
+        self.notify_topology_update(link, action='deactivated')
+
+    def _suppress_link(self, link):
+        """Mark a link as held down by dampening until it can be reused."""
+        log.info(f'Link {link.id} is flapping and was suppressed.')
+        link.add_metadata(METADATA_KEY, True)
+        self.notify_metadata_changes(link, 'added')
+        self._schedule_link_reuse(link.id)
+
+    def _schedule_link_reuse(self, link_id):
+        """Schedule the release of a suppressed link once it decays."""
+        timer = self._reuse_timers.pop(link_id, None)
+        if timer is not None:
+            timer.cancel()
+        timer = Timer(self._dampening.reuse_in(link_id),
+                      self._on_link_reuse_timer, args=(link_id,))
+        timer.daemon = True
+        self._reuse_timers[link_id] = timer
+        timer.start()
+
+    @writer
+    def _on_link_reuse_timer(self, link_id):
+        link = self.links.get(link_id)
+        if link is None:
+            self._forget_dampening(link_id)
+        elif self._dampening.is_suppressed(link_id):
+            self._schedule_link_reuse(link_id)
+        else:
+            self._reuse_link(link)
+
+    def _reuse_link(self, link):
+        """Release a suppressed link, activating it if it is up."""
+        timer = self._reuse_timers.pop(link.id, None)
+        if timer is not None:
+            timer.cancel()
+        log.info(f'Link {link.id} is no longer suppressed.')
+        if link.remove_metadata(METADATA_KEY) is not False:
+            self.notify_metadata_changes(link, 'removed')
+        if link.id in self._links_held_up:
+            self._links_held_up.discard(link.id)
+            link.activate()
+            self.notify_topology_update(link, action='activated')
+
+    def _forget_dampening(self, link_id):
+        """Drop the dampening state of a link removed from the topology."""
+        self._dampening.release(link_id)
+        timer = self._reuse_timers.pop(link_id, None)
+        if timer is not None:
+            timer.cancel()
+        self._links_down.discard(link_id)
+        self._links_held_up.discard(link_id)
 
     @listen_to('.*.interface.is.nni')
+    @timed('handlers')
+    @writer
+    @recorded
     def add_links(self, event):
-        """Update the topology with links related to the NNI interfaces."""
-        interface_a = event.content['interface_a']
-        interface_b = event.content['interface_b']
+        """Update the topology with links related to the NNI interfaces.
+
+        The event carries either one link, as ``interface_a`` and
+        ``interface_b``, or the links found by a whole LLDP sweep as a
+        ``links`` list of interface pairs.
+        """
+        pairs = event.content.get('links')
+        if pairs is None:
+            pairs = [(event.content['interface_a'],
+                      event.content['interface_b'])]
+        self._add_nni_links(pairs)
+
+    def _add_nni_links(self, pairs):
+        """Add or confirm the links between pairs of NNI interfaces.
+
+        Known links whose interfaces already reference them are only
+        confirmed, so a steady-state LLDP sweep changes nothing else. New
+        links are added to the topology at once, and only the links and
+        interfaces that changed are notified.
+        """
+        created = {}
+        modified = {}
+        interfaces = {}
+        now = monotonic()
+        for interface_a, interface_b in pairs:
+            key = self._endpoints_key(interface_a, interface_b)
+            link = self._get_link(interface_a, interface_b) or \
+                created.get(key)
+            if link is None:
+                link = created[key] = Link(interface_a, interface_b)
+            elif link.id in self._links_seen:
+                self._links_seen[link.id] = now
+            if self._confirm_provisional(link):
+                link.activate()
+                modified[link.id] = link
+
+            if interface_a.link is link and interface_b.link is link and \
+                    interface_a.nni and interface_b.nni:
+                continue
+            if key not in created:
+                modified[link.id] = link
+            interface_a.update_link(link)
+            interface_b.update_link(link)
+            for interface in interface_a, interface_b:
+                interface.nni = True
+                interfaces[interface.id] = interface
+
+        if created:
+            self._add_link(*created.values())
+            self.notify_topology_update(*created.values(), action='added')
+        if modified:
+            self.notify_topology_update(*modified.values())
+        if interfaces:
+            self.notify_topology_update(*interfaces.values())
+            self._remove_hosts(*interfaces.values())
+
+    def _activate_provisional_links(self, *interfaces):
+        """Activate the provisional links whose endpoints are back up.
+
+        Links loaded from the topology snapshot come back as soon as both
+        their interfaces and switches are active, without waiting for LLDP.
+        """
+        for interface in interfaces:
+            link = interface.link
+            if not link or link.id not in self.provisional_links or \
+                    link.is_active():
+                continue
+            endpoints = (link.endpoint_a, link.endpoint_b)
+            if all(endpoint.is_active() and endpoint.switch.is_active()
+                   for endpoint in endpoints):
+                link.activate()
+                self.notify_topology_update(link, action='activated')
+
+    @listen_to('.*.reachable.mac')
+    @timed('handlers')
+    @recorded
+    def handle_reachable_mac(self, event):
+        """Learn the host with a MAC address reachable from an interface.
+
+        MAC addresses seen on NNI interfaces are ignored, since they were
+        forwarded by another switch. Host changes are notified at most
+        every `HOST_UPDATE_INTERVAL` seconds.
+        """
+        interface = event.content.get('port')
+        if not isinstance(interface, Interface):
+            switch = event.content['switch']
+            interface_id = f"{getattr(switch, 'dpid', switch)}:{interface}"
+            try:
+                interface = self._get_interface(interface_id)
+            except KeyError:
+                return
+        if interface.nni or interface.link:
+            return
+
+        host, action = self.hosts.learn(event.content['reachable_mac'],
+                                        interface.id)
+        if action:
+            self._host_updates.add(self._get_host_record(host, action))
+
+    def _remove_hosts(self, *interfaces):
+        """Forget the hosts seen on interfaces."""
+        removed = [host for interface in interfaces
+                   for host in self.hosts.remove_interface(interface.id)]
+        self._host_updates.add(*(self._get_host_record(host, 'removed')
+                                 for host in removed))
+
+    @staticmethod
+    def _get_host_record(host, action):
+        """Return a record describing a change of a host."""
+        return {'entity': 'host', 'id': host.mac, 'action': action,
+                'interface': host.interface, 'switch': host.switch}
+
+    def _send_hosts_update(self, records):
+        """Send the host changes of a burst in one event.
+
+        Only the last change of each host is sent, and a host added and
+        removed in the same burst is left out.
+        """
+        changes = {}
+        for record in records:
+            previous = changes.pop(record['id'], None)
+            if previous is not None and previous['action'] == 'added':
+                if record['action'] == 'removed':
+                    continue
+                record = dict(record, action='added')
+            changes[record['id']] = record
+        if not changes:
+            return
+
+        records = list(changes.values())
+        self._feed.publish(*((f"host.{record['action']}", record)
+                             for record in records))
+        event = KytosEvent(name='kytos/topology.hosts.changed',
+                           content={'changes': records})
+        self._send_event(event)
+
+    def _schedule_host_aging(self):
+        """Schedule the next sweep of idle hosts."""
+        self._host_aging_timer = Timer(settings.HOST_AGING_INTERVAL,
+                                       self._on_host_aging_timer)
+        self._host_aging_timer.daemon = True
+        self._host_aging_timer.start()
+
+    def _on_host_aging_timer(self):
+        try:
+            self.expire_hosts()
+        finally:
+            self._schedule_host_aging()
 
-        link = self._get_link_or_create(interface_a, interface_b)
-        interface_a.update_link(link)
-        interface_b.update_link(link)
+    def expire_hosts(self):
+        """Forget the hosts not seen for `HOST_AGING_TTL` seconds.
 
-        interface_a.nni = True
-        interface_b.nni = True
+        Returns:
+            list: The expired hosts.
+        """
+        expired = self.hosts.expire(settings.HOST_AGING_TTL)
+        self._host_updates.add(*(self._get_host_record(host, 'removed')
+                                 for host in expired))
+        if expired:
+            log.debug(f'{len(expired)} hosts expired.')
+        return expired
 
-        self.notify_topology_update()
+    def _send_event(self, event):
+        """Put an event in the app buffer, counting it in the stats.
 
-    # def add_host(self, event):
-    #    """Update the topology with a new Host."""
+        Storehouse requests are timed until their callback is called.
+        """
+        if self._stats is not None:
+            self._stats.sent(event)
+            if event.name.startswith('kytos.storehouse.'):
+                self._stats.request_sent(event)
+        self.controller.buffers.app.put(event)
 
-    #    interface = event.content['port']
-    #    mac = event.content['reachable_mac']
+    def _request_answered(self, event):
+        """Add the round-trip time of a storehouse request to the stats."""
+        if self._stats is not None:
+            self._stats.request_answered(event)
 
-    #    host = Host(mac)
-    #    link = self.topology.get_link(interface.id)
-    #    if link is not None:
-    #        return
+    def notify_topology_update(self, *changed, action='modified'):
+        """Schedule events to notify about updates on the topology.
 
-    #    self.topology.add_link(interface.id, host.id)
-    #    self.topology.add_device(host)
+        Updates are coalesced: a burst of calls results in a single
+        `kytos/topology.updated` event listing every changed switch,
+        interface and link, followed by a `kytos/topology.delta` event with
+        one record per change. See the `TOPOLOGY_UPDATE_*` settings.
 
-    #    if settings.DISPLAY_FULL_DUPLEX_LINKS:
-    #        self.topology.add_link(host.id, interface.id)
+        Args:
+            changed: Switch, Interface or Link objects that changed.
+            action (str): What happened to them: 'added', 'removed',
+                'activated', 'deactivated', 'enabled', 'disabled' or
+                'modified'.
+        """
+        changed = [obj for obj in changed if obj]
+        if not changed:
+            return
+        self._serialization.invalidate(*changed)
+        self.graph.invalidate()
+        records = [get_change_record(action, obj) for obj in changed]
+        self._feed.publish(*((f"{record['entity']}.{action}", record)
+                             for record in records))
+        self._topology_updates.add(*records)
+
+    def _send_topology_update(self, records):
+        """Send the full topology and the delta of a burst of changes."""
+        self.topology_version += 1
+        changes = {'switches': [], 'interfaces': [], 'links': []}
+        seen = set()
+        for record in records:
+            entities = ENTITIES[record['entity']]
+            if (entities, record['id']) not in seen:
+                seen.add((entities, record['id']))
+                changes[entities].append(record['id'])
+
+        self.snapshot = TopologySnapshot.build(
+            self.topology_version, self._get_switches(),
+            self._get_interfaces(), self.links.snapshot(),
+            self.snapshot, changes)
 
-    def notify_topology_update(self):
-        """Send an event to notify about updates on the topology."""
         name = 'kytos/topology.updated'
         event = KytosEvent(name=name, content={'topology':
-                                               self._get_topology()})
-        self.controller.buffers.app.put(event)
+                                               self._get_topology(),
+                                               'snapshot': self.snapshot,
+                                               'changes': changes,
+                                               'version':
+                                               self.topology_version})
+        self._send_event(event)
+
+        name = 'kytos/topology.delta'
+        event = KytosEvent(name=name, content={'version':
+                                               self.topology_version,
+                                               'changes': records})
+        self._send_event(event)
 
     def notify_metadata_changes(self, obj, action):
         """Send an event to notify about metadata changes."""
-        if isinstance(obj, Switch):
-            entity = 'switch'
-            entities = 'switches'
-        elif isinstance(obj, Interface):
-            entity = 'interface'
-            entities = 'interfaces'
-        elif isinstance(obj, Link):
-            entity = 'link'
-            entities = 'links'
+        entity = get_entity_name(obj)
+        entities = ENTITIES[entity]
 
         name = f'kytos/topology.{entities}.metadata.{action}'
+        self._serialization.invalidate(obj)
+        self.graph.invalidate()
+        self._metadata_index.update(entities, obj)
+        self._feed.publish((f'{entity}.metadata.{action}',
+                            {'id': obj.id, 'metadata': dict(obj.metadata)}))
         event = KytosEvent(name=name, content={entity: obj,
                                                'metadata': obj.metadata})
-        self.controller.buffers.app.put(event)
+        self._send_event(event)
         log.debug(f'Metadata from {obj.id} was {action}.')
 
+    def notify_bulk_metadata_changes(self, entities, objs, action):
+        """Send a single event to notify about many metadata changes.
+
+        The event is named `kytos/topology.{entities}.metadata.bulk_{action}`
+        so that subscribers of the single-object events, which read the
+        object under its entity name, do not get lists.
+        """
+        name = f'kytos/topology.{entities}.metadata.bulk_{action}'
+        self._serialization.invalidate(*objs)
+        self.graph.invalidate()
+        self._metadata_index.update(entities, *objs)
+        entity = get_entity_name(objs[0])
+        self._feed.publish(*((f'{entity}.metadata.{action}',
+                              {'id': obj.id, 'metadata': dict(obj.metadata)})
+                             for obj in objs))
+        event = KytosEvent(name=name, content={
+            entities: objs,
+            'metadata': {obj.id: obj.metadata for obj in objs}})
+        self._send_event(event)
+        log.debug(f'Metadata from {len(objs)} {entities} was {action}.')
+
     @listen_to('kytos/topology.*.metadata.*')
+    @timed('handlers')
+    @recorded
     def save_metadata_on_store(self, event):
-        """Send to storehouse the data updated."""
-        name = 'kytos.storehouse.update'
-        if 'switch' in event.content:
-            store = self.store_items.get('switches')
-            obj = event.content.get('switch')
-            namespace = 'kytos.topology.switches.metadata'
-        elif 'interface' in event.content:
-            store = self.store_items.get('interfaces')
-            obj = event.content.get('interface')
-            namespace = 'kytos.topology.iterfaces.metadata'
-        elif 'link' in event.content:
-            store = self.store_items.get('links')
-            obj = event.content.get('link')
-            namespace = 'kytos.topology.links.metadata'
-
-        store.data[obj.id] = obj.metadata
-        content = {'namespace': namespace,
-                   'box_id': store.box_id,
-                   'data': store.data,
-                   'callback': self.update_instance}
+        """Schedule the updated metadata to be sent to storehouse.
 
-        event = KytosEvent(name=name, content=content)
-        self.controller.buffers.app.put(event)
+        Writes are batched: changed objects are collected and flushed every
+        `STORE_FLUSH_INTERVAL` seconds, or once `STORE_FLUSH_MAX_PENDING`
+        changes are waiting.
+        """
+        for entity, entities in ENTITIES.items():
+            if entity in event.content:
+                objs = [event.content[entity]]
+                break
+            if entities in event.content:
+                objs = event.content[entities]
+                break
+        else:
+            return
+
+        self._metadata_writes.add(*((entities, obj) for obj in objs))
+
+    def _flush_metadata_on_store(self, changes):
+        """Send to storehouse the metadata of the objects changed.
+
+        One update is sent per namespace. Only the changed entries are sent
+        unless `STORE_PARTIAL_UPDATES` is off, in which case the whole box
+        is.
+
+        Returns:
+            list: The changes to namespaces whose box is not loaded yet, to
+            be sent by a later flush.
+        """
+        unsent = []
+        dirty = {}
+        for entities, obj in changes:
+            dirty.setdefault(entities, {})[obj.id] = obj
+
+        name = 'kytos.storehouse.update'
+        for entities, objs in dirty.items():
+            store = self.store_items.get(entities)
+            if store is None:
+                log.debug(f'Storehouse box for {entities} not loaded yet.')
+                unsent.extend((entities, obj) for obj in objs.values())
+                continue
+
+            data = {obj_id: obj.metadata for obj_id, obj in objs.items()}
+            store.data.update(data)
+            if not settings.STORE_PARTIAL_UPDATES:
+                data = store.data
+            content = {'namespace': f'kytos.topology.{entities}.metadata',
+                       'box_id': store.box_id,
+                       'data': data,
+                       'callback': self.update_instance}
+
+            event = KytosEvent(name=name, content=content)
+            self._send_event(event)
+        return unsent
 
     def update_instance(self, event, data, error):
         """Display in Kytos console if the data was updated."""
+        self._request_answered(event)
         entities = event.content.get('namespace', '').split('.')[-2]
         if error:
             log.error(f'Error trying to update storehouse {entities}.')
@@ -481,11 +1923,16 @@ class Main(KytosNApp):
         content = {'namespace': f'kytos.topology.{entities}.metadata',
                    'callback': self.request_retrieve_entities}
         event = KytosEvent(name=name, content=content)
-        self.controller.buffers.app.put(event)
+        self._send_event(event)
         log.info(f'verify data in storehouse for {entities}.')
 
     def request_retrieve_entities(self, event, data, error):
         """Create a box or retrieve an existent box from storehouse."""
+        self._request_answered(event)
+        if error:
+            self._retry_verify_storehouse(event)
+            return
+
         msg = ''
         content = {'namespace': event.content.get('namespace'),
                    'callback': self.load_from_store,
@@ -500,34 +1947,77 @@ class Main(KytosNApp):
             msg = 'Retrieve data from storeohouse.'
 
         event = KytosEvent(name=name, content=content)
-        self.controller.buffers.app.put(event)
+        self._send_event(event)
         log.debug(msg)
 
     def load_from_store(self, event, box, error):
-        """Save the data retrived from storehouse."""
+        """Save the data retrived from storehouse.
+
+        Objects whose metadata was requested while the box was loading get
+        it now, and metadata writes waiting for the box are flushed.
+        """
+        self._request_answered(event)
         entities = event.content.get('namespace', '').split('.')[-2]
         if error:
             log.error('Error while get a box from storehouse.')
-        else:
+            self._retry_verify_storehouse(event)
+            return
+
+        with self._store_lock:
             self.store_items[entities] = box
-            log.debug('Data updated')
+            waiting = self._store_waiting.pop(entities, {})
+        self.store_load_times[entities] = monotonic() - self._store_started
+        if self._stats is not None:
+            self._stats.loaded(entities, self.store_load_times[entities])
+        log.debug('Data updated')
+
+        for obj in waiting.values():
+            self.update_instance_metadata(obj)
+        if waiting:
+            log.info(f'Metadata of {len(waiting)} {entities} seen while '
+                     'loading storehouse was restored.')
+        if len(self.store_load_times) == len(ENTITIES):
+            elapsed = max(self.store_load_times.values())
+            log.info(f'Storehouse metadata loaded in {elapsed:.3f}s.')
+        self._metadata_writes.flush()
+
+    def _retry_verify_storehouse(self, event):
+        """Schedule a new attempt to load a box from storehouse."""
+        entities = event.content.get('namespace', '').split('.')[-2]
+        timer = Timer(settings.STORE_RETRY_INTERVAL, self.verify_storehouse,
+                      [entities])
+        timer.daemon = True
+        timer.start()
 
+    @writer
     def update_instance_metadata(self, obj):
-        """Update object instance with saved metadata."""
-        metadata = None
-        if isinstance(obj, Interface):
-            all_metadata = self.store_items.get('interfaces', None)
-            if all_metadata:
-                metadata = all_metadata.data.get(obj.id)
-        elif isinstance(obj, Switch):
-            all_metadata = self.store_items.get('switches', None)
-            if all_metadata:
-                metadata = all_metadata.data.get(obj.id)
-        elif isinstance(obj, Link):
-            all_metadata = self.store_items.get('links', None)
-            if all_metadata:
-                metadata = all_metadata.data.get(obj.id)
+        """Update object instance with saved metadata.
+
+        If the storehouse box of the object is still loading, the object is
+        queued and updated as soon as the box is loaded.
+        """
+        if obj is None:
+            return
+
+        entities = ENTITIES[get_entity_name(obj)]
+        with self._store_lock:
+            store = self.store_items.get(entities)
+            if store is None:
+                self._store_waiting[entities][obj.id] = obj
+                return
 
+        metadata = store.data.get(obj.id)
         if metadata:
             obj.extend_metadata(metadata)
+            if entities == 'links' and \
+                    not self._dampening.is_suppressed(obj.id):
+                obj.metadata.pop(METADATA_KEY, None)
+            if obj.id not in self.provisional_links and \
+                    obj.id not in self.provisional_interfaces:
+                obj.metadata.pop(PROVISIONAL_KEY, None)
+            self._serialization.invalidate(obj)
+            self.graph.invalidate()
+            self._metadata_index.update(entities, obj)
+            if entities == 'switches':
+                self._switch_search.update(obj)
             log.debug(f'Metadata to {obj.id} was updated')
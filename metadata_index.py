@@ -0,0 +1,154 @@
+"""Inverted index of the metadata of switches, interfaces and links."""
+import re
+from bisect import bisect_left, bisect_right
+from threading import Lock
+
+__all__ = ('MetadataIndex', 'QueryError')
+
+_NUMBER = re.compile(r'^\s*([-+]?\d+(?:\.\d*)?|[-+]?\.\d+)\s*([kKMGTP]?)\s*$')
+_MULTIPLIERS = {'': 1, 'k': 1e3, 'K': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12,
+                'P': 1e15}
+_SCALARS = (str, int, float, bool)
+
+
+class QueryError(ValueError):
+    """A metadata query is not valid."""
+
+
+def to_number(value):
+    """Return the number a metadata value stands for, or None.
+
+    Numbers are kept as they are and strings like "100G" or "1.5k" are
+    read with their SI suffix. Booleans are not numbers.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        match = _NUMBER.match(value)
+        if match:
+            return float(match.group(1)) * _MULTIPLIERS[match.group(2)]
+    return None
+
+
+def _pair(key, value):
+    """Return the hashable form of a (key, value) pair.
+
+    Booleans are told apart from the numbers they compare equal to.
+    """
+    return key, isinstance(value, bool), value
+
+
+class MetadataIndex:
+    """Map metadata (key, value) pairs to the ids of the entities having them.
+
+    Scalar values are indexed for equality. Values that are numbers, or
+    strings with a number and an SI suffix, are also kept sorted by key for
+    range queries, as a sorted list of numbers with a parallel list of ids.
+    Objects are re-indexed with :meth:`update` whenever their metadata
+    changes.
+    """
+
+    def __init__(self, entities):
+        self._lock = Lock()
+        self._values = {name: {} for name in entities}
+        self._numbers = {name: {} for name in entities}
+        self._indexed = {name: {} for name in entities}
+
+    def update(self, entities, *objs):
+        """Index the current metadata of objects."""
+        with self._lock:
+            for obj in objs:
+                self._remove(entities, obj.id)
+                pairs = {key: value for key, value in obj.metadata.items()
+                         if isinstance(value, _SCALARS)}
+                for key, value in pairs.items():
+                    self._values[entities].setdefault(
+                        _pair(key, value), set()).add(obj.id)
+                    number = to_number(value)
+                    if number is not None:
+                        numbers, ids = self._numbers[entities].setdefault(
+                            key, ([], []))
+                        position = bisect_right(numbers, number)
+                        numbers.insert(position, number)
+                        ids.insert(position, obj.id)
+                self._indexed[entities][obj.id] = pairs
+
+    def remove(self, entities, obj_id):
+        """Drop an object from the index."""
+        with self._lock:
+            self._remove(entities, obj_id)
+
+    def _remove(self, entities, obj_id):
+        pairs = self._indexed[entities].pop(obj_id, {})
+        for key, value in pairs.items():
+            ids = self._values[entities][_pair(key, value)]
+            ids.discard(obj_id)
+            if not ids:
+                del self._values[entities][_pair(key, value)]
+            number = to_number(value)
+            if number is not None:
+                numbers, ids = self._numbers[entities][key]
+                position = bisect_left(numbers, number)
+                position = ids.index(obj_id, position)
+                del numbers[position]
+                del ids[position]
+                if not numbers:
+                    del self._numbers[entities][key]
+
+    def query(self, entities, filters):
+        """Return the sorted ids of the entities matching every filter.
+
+        Filters map metadata keys to a condition. A condition is either a
+        value, matched for equality, or an object with one or more
+        operators: ``eq`` (a value), ``in`` (a list of values) and ``gt``,
+        ``gte``, ``lt``, ``lte`` (numbers, SI suffixes allowed).
+
+        Raises:
+            QueryError: If a filter is not valid.
+        """
+        if not isinstance(filters, dict) or not filters:
+            raise QueryError("Expected a map of metadata key to condition")
+
+        with self._lock:
+            matches = None
+            for key, condition in filters.items():
+                if not isinstance(condition, dict):
+                    condition = {'eq': condition}
+                if not condition:
+                    raise QueryError(f"Empty condition for {key}")
+                for operator, operand in condition.items():
+                    ids = self._match(entities, key, operator, operand)
+                    matches = ids if matches is None else matches & ids
+                    if not matches:
+                        return []
+        return sorted(matches)
+
+    def _match(self, entities, key, operator, operand):
+        values = self._values[entities]
+        if operator in ('eq', 'in'):
+            operands = [operand] if operator == 'eq' else operand
+            if not isinstance(operands, list) or \
+                    not all(isinstance(value, _SCALARS) for value in operands):
+                raise QueryError(f"Expected scalar values for {key}")
+            ids = set()
+            for value in operands:
+                ids.update(values.get(_pair(key, value), ()))
+            return ids
+
+        bound = to_number(operand)
+        if operator not in ('gt', 'gte', 'lt', 'lte'):
+            raise QueryError(f"Unknown operator {operator}")
+        if bound is None:
+            raise QueryError(f"Expected a number for {key} {operator}")
+        numbers, ids = self._numbers[entities].get(key, ([], []))
+        if operator == 'gt':
+            found = ids[bisect_right(numbers, bound):]
+        elif operator == 'gte':
+            found = ids[bisect_left(numbers, bound):]
+        elif operator == 'lt':
+            found = ids[:bisect_left(numbers, bound)]
+        else:
+            found = ids[:bisect_right(numbers, bound)]
+        return set(found)
@@ -1,7 +1,66 @@
 """Most relevant classes to be used on the topology."""
+from array import array
+from copy import copy
+from threading import Lock
 
+from kytos.core.interface import Interface
+from kytos.core.link import Link
+from kytos.core.switch import Switch
 
-__all__ = ('Host', 'Topology')
+__all__ = ('ENTITIES', 'Host', 'IdTable', 'InterfaceRecord', 'LinkRecord',
+           'SwitchRecord', 'Topology', 'TopologySnapshot',
+           'get_change_record', 'get_dict', 'get_entity_name')
+
+#: Plural form of each entity name, as used in events and endpoints.
+ENTITIES = {'switch': 'switches',
+            'interface': 'interfaces',
+            'link': 'links'}
+
+
+def get_entity_name(obj):
+    """Return the entity name of a Switch, Interface or Link object."""
+    if isinstance(obj, Switch):
+        return 'switch'
+    if isinstance(obj, Interface):
+        return 'interface'
+    if isinstance(obj, Link):
+        return 'link'
+    raise TypeError(f'{type(obj).__name__} is not a topology entity.')
+
+
+def get_dict(obj):
+    """Return the ``as_dict()`` of a Switch, Interface or Link object.
+
+    The controller adds and removes the interfaces of a switch in place,
+    while ``Switch.as_dict()`` iterates them. A switch is therefore
+    serialized through a shallow copy holding a copy of its interfaces.
+    """
+    if isinstance(obj, Switch):
+        obj = copy(obj)
+        obj.interfaces = dict(obj.interfaces)
+    return obj.as_dict()
+
+
+def get_change_record(action, obj):
+    """Return a record describing a change in the topology.
+
+    Records are plain dicts carried by `kytos/topology.delta` events. Every
+    record has the entity name, its id, the action and the resulting state;
+    interfaces also carry their switch and links their endpoints.
+    """
+    entity = get_entity_name(obj)
+    record = {'entity': entity,
+              'id': obj.id,
+              'action': action,
+              'active': obj.is_active(),
+              'enabled': obj.is_enabled()}
+    if entity == 'interface':
+        record['switch'] = obj.switch.id
+        record['nni'] = obj.nni
+    elif entity == 'link':
+        record['endpoint_a'] = obj.endpoint_a.id
+        record['endpoint_b'] = obj.endpoint_b.id
+    return record
 
 
 class Topology:
@@ -11,14 +70,293 @@ class Topology:
         self.links = links
 
 
+class IdTable:
+    """Append-only table interning string ids as integers.
+
+    Indexes are never reused, so a snapshot built when the table had ``n``
+    ids can keep sharing it with newer snapshots: it just ignores indexes
+    greater than or equal to ``n``.
+    """
+
+    __slots__ = ('ids', 'indexes', '_lock')
+
+    def __init__(self):
+        self.ids = []
+        self.indexes = {}
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def intern(self, obj_id):
+        """Return the index of an id, adding it to the table if needed."""
+        index = self.indexes.get(obj_id)
+        if index is None:
+            with self._lock:
+                index = self.indexes.get(obj_id)
+                if index is None:
+                    index = len(self.ids)
+                    self.ids.append(obj_id)
+                    self.indexes[obj_id] = index
+        return index
+
+
+class _Record:
+    """Base of the immutable, slotted records of a TopologySnapshot."""
+
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable.')
+
+    def __eq__(self, other):
+        return (type(self) is type(other) and
+                all(getattr(self, name) == getattr(other, name)
+                    for name in self.__slots__))
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={getattr(self, name)!r}'
+                           for name in self.__slots__)
+        return f'{type(self).__name__}({values})'
+
+
+class SwitchRecord(_Record):
+    """State of a switch in a TopologySnapshot."""
+
+    __slots__ = ('index', 'active', 'enabled')
+
+    @classmethod
+    def from_switch(cls, switch, table):
+        """Create the record of a kytos Switch."""
+        return cls(table.intern(switch.id), switch.is_active(),
+                   switch.is_enabled())
+
+
+class InterfaceRecord(_Record):
+    """State of an interface in a TopologySnapshot."""
+
+    __slots__ = ('index', 'switch', 'port_number', 'active', 'enabled',
+                 'nni')
+
+    @classmethod
+    def from_interface(cls, interface, table):
+        """Create the record of a kytos Interface."""
+        return cls(table.intern(interface.id),
+                   table.intern(interface.switch.id), interface.port_number,
+                   interface.is_active(), interface.is_enabled(),
+                   bool(interface.nni))
+
+
+class LinkRecord(_Record):
+    """State of a link in a TopologySnapshot.
+
+    Endpoints are stored as interface indexes along with the indexes of
+    their switches.
+    """
+
+    __slots__ = ('index', 'endpoint_a', 'endpoint_b', 'switch_a',
+                 'switch_b', 'active', 'enabled')
+
+    @classmethod
+    def from_link(cls, link, table):
+        """Create the record of a kytos Link."""
+        return cls(table.intern(link.id),
+                   table.intern(link.endpoint_a.id),
+                   table.intern(link.endpoint_b.id),
+                   table.intern(link.endpoint_a.switch.id),
+                   table.intern(link.endpoint_b.switch.id),
+                   link.is_active(), link.is_enabled())
+
+
+class TopologySnapshot:
+    """Immutable and compact view of the topology at a given version.
+
+    Switches, interfaces and links are kept as slotted records keyed by
+    the integer index of their ids in an IdTable. Switch adjacency is kept
+    in compressed sparse row form: the neighbors of the switch with index
+    ``i`` are ``neighbors[offsets[i]:offsets[i + 1]]``, reached through the
+    links at the same positions of ``neighbor_links``. Adjacency includes
+    every link; use the records to filter on state.
+
+    Snapshots never change after being built, so they can be shared between
+    threads without copying. Use :meth:`build` to create them.
+    """
+
+    __slots__ = ('version', 'table', 'size', 'switches', 'interfaces',
+                 'links', 'offsets', 'neighbors', 'neighbor_links')
+
+    def __init__(self, version, table, switches, interfaces, links,
+                 adjacency=None):
+        values = {'version': version, 'table': table, 'size': len(table),
+                  'switches': switches, 'interfaces': interfaces,
+                  'links': links}
+        if adjacency is None:
+            adjacency = self._build_adjacency(values['size'], links)
+        values['offsets'], values['neighbors'], values['neighbor_links'] = \
+            adjacency
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('TopologySnapshot is immutable.')
+
+    @staticmethod
+    def _build_adjacency(size, links):
+        """Return the offsets, neighbors and links arrays of the switches."""
+        degrees = [0] * (size + 1)
+        for link in links.values():
+            degrees[link.switch_a + 1] += 1
+            degrees[link.switch_b + 1] += 1
+        for index in range(size):
+            degrees[index + 1] += degrees[index]
+
+        offsets = array('L', degrees)
+        neighbors = array('L', bytes(offsets.itemsize * offsets[-1]))
+        neighbor_links = array('L', neighbors)
+        position = degrees[:-1]
+        for link in links.values():
+            for switch, neighbor in ((link.switch_a, link.switch_b),
+                                     (link.switch_b, link.switch_a)):
+                neighbors[position[switch]] = neighbor
+                neighbor_links[position[switch]] = link.index
+                position[switch] += 1
+        return offsets, neighbors, neighbor_links
+
+    @classmethod
+    def build(cls, version, switches, interfaces, links, previous=None,
+              changes=None):
+        """Build a snapshot of the live topology.
+
+        When a previous snapshot and the ids changed since it are given,
+        only the records of those ids are rebuilt, plus the interfaces of
+        changed switches and the links of changed interfaces, whose state
+        depends on them. The adjacency arrays are reused unless links were
+        added or removed.
+
+        Args:
+            version (int): Topology version of the snapshot.
+            switches (dict): Live switches by id.
+            interfaces (dict): Live interfaces by id.
+            links (dict): Live links by id.
+            previous (TopologySnapshot): Snapshot to build upon.
+            changes (dict): Ids changed since ``previous``, by entities
+                name ('switches', 'interfaces' and 'links').
+        """
+        if previous is None or changes is None:
+            table = previous.table if previous else IdTable()
+            return cls(
+                version, table,
+                {r.index: r for r in (SwitchRecord.from_switch(s, table)
+                                      for s in switches.values())},
+                {r.index: r for r in (InterfaceRecord.from_interface(i, table)
+                                      for i in interfaces.values())},
+                {r.index: r for r in (LinkRecord.from_link(link, table)
+                                      for link in links.values())})
+
+        table = previous.table
+        records = {'switches': dict(previous.switches),
+                   'interfaces': dict(previous.interfaces),
+                   'links': dict(previous.links)}
+        live = {'switches': switches, 'interfaces': interfaces,
+                'links': links}
+        factories = {'switches': SwitchRecord.from_switch,
+                     'interfaces': InterfaceRecord.from_interface,
+                     'links': LinkRecord.from_link}
+
+        interface_ids = set(changes.get('interfaces', ()))
+        # Ports can be added to or removed from a switch without an event,
+        # so interfaces that appeared or disappeared are rebuilt as well.
+        interface_ids.update(
+            interface_id for interface_id in interfaces
+            if table.indexes.get(interface_id) not in previous.interfaces)
+        interface_ids.update(
+            table.ids[index] for index in previous.interfaces
+            if table.ids[index] not in interfaces)
+        for switch_id in changes.get('switches', ()):
+            switch = switches.get(switch_id)
+            if switch is not None:
+                interface_ids.update(
+                    i.id for i in list(switch.interfaces.values()))
+        link_ids = set(changes.get('links', ()))
+        for interface_id in interface_ids:
+            interface = interfaces.get(interface_id)
+            if interface is not None and interface.link:
+                link_ids.add(interface.link.id)
+        ids = dict(changes, interfaces=interface_ids, links=link_ids)
+
+        for entities, entity_ids in ids.items():
+            for obj_id in entity_ids:
+                obj = live[entities].get(obj_id)
+                index = table.intern(obj_id)
+                if obj is None:
+                    records[entities].pop(index, None)
+                else:
+                    records[entities][index] = factories[entities](obj, table)
+
+        adjacency = None
+        if len(table) == previous.size and \
+                records['links'].keys() == previous.links.keys():
+            adjacency = (previous.offsets, previous.neighbors,
+                         previous.neighbor_links)
+        return cls(version, table, records['switches'],
+                   records['interfaces'], records['links'], adjacency)
+
+    def index_of(self, obj_id):
+        """Return the index of an id or None if unknown to this snapshot."""
+        index = self.table.indexes.get(obj_id)
+        if index is None or index >= self.size:
+            return None
+        return index
+
+    def id_of(self, index):
+        """Return the id interned with the given index."""
+        return self.table.ids[index]
+
+    def get_neighbors(self, switch_id):
+        """Return (neighbor switch id, link id) pairs of a switch."""
+        index = self.index_of(switch_id)
+        if index is None or index not in self.switches:
+            return []
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return [(self.id_of(self.neighbors[position]),
+                 self.id_of(self.neighbor_links[position]))
+                for position in range(start, end)]
+
+
 class Host:
-    def __init__(self, mac):
+    """Host seen at an interface, identified by its MAC address.
+
+    Hosts have slots so that large numbers of them stay small: the
+    interface is kept by id and ``last_seen`` is a monotonic time.
+    """
+
+    __slots__ = ('mac', 'interface', 'last_seen')
+
+    def __init__(self, mac, interface=None, last_seen=None):
         self.mac = mac
+        self.interface = interface
+        self.last_seen = last_seen
 
     @property
     def id(self):
         return self.mac
 
+    @property
+    def switch(self):
+        """Return the id of the switch the host was seen at, or None."""
+        if self.interface is None:
+            return None
+        return self.interface.rpartition(':')[0]
+
     def as_dict(self):
         return {'mac': self.mac,
-                'type': 'host'}
+                'type': 'host',
+                'interface': self.interface,
+                'switch': self.switch}
@@ -0,0 +1,138 @@
+"""Token index used to search switches."""
+import re
+from bisect import bisect_left, insort
+from threading import Lock
+
+__all__ = ('SwitchSearchIndex',)
+
+_SEPARATORS = re.compile(r'[\W_]+')
+
+
+def tokenize(value):
+    """Return the lowercase tokens of a value.
+
+    Besides its words, the whole value is a token too, so prefixes
+    spanning separators (like part of a dpid) still match.
+    """
+    value = str(value).lower().strip()
+    if not value:
+        return set()
+    tokens = {token for token in _SEPARATORS.split(value) if token}
+    tokens.add(value)
+    return tokens
+
+
+def get_connection(switch):
+    """Return the address and port of a switch connection, or ''."""
+    connection = switch.connection
+    if connection is None:
+        return ''
+    return f'{connection.address}:{connection.port}'
+
+
+class SwitchSearchIndex:
+    """Prefix index over the id, dpid, connection and metadata of switches.
+
+    Tokens are kept in a sorted list, so every indexed token starting with
+    a prefix is found with a binary search. Switches are re-indexed one at
+    a time with :meth:`update` when they or their metadata change.
+    """
+
+    def __init__(self, metadata_fields=()):
+        self.metadata_fields = tuple(metadata_fields)
+        self._lock = Lock()
+        self._tokens = []
+        self._ids_by_token = {}
+        self._tokens_by_id = {}
+        self._switches = {}
+
+    def _switch_tokens(self, switch):
+        values = [switch.id, switch.dpid, get_connection(switch)]
+        values.extend(switch.metadata.get(field)
+                      for field in self.metadata_fields)
+        tokens = set()
+        for value in values:
+            if value is not None:
+                tokens.update(tokenize(value))
+        return tokens
+
+    def update(self, *switches):
+        """Index switches, replacing their previous tokens."""
+        for switch in switches:
+            tokens = self._switch_tokens(switch)
+            with self._lock:
+                self._switches[switch.id] = switch
+                old = self._tokens_by_id.get(switch.id, set())
+                for token in old - tokens:
+                    self._discard(token, switch.id)
+                for token in tokens - old:
+                    ids = self._ids_by_token.get(token)
+                    if ids is None:
+                        ids = self._ids_by_token[token] = set()
+                        insort(self._tokens, token)
+                    ids.add(switch.id)
+                self._tokens_by_id[switch.id] = tokens
+
+    def remove(self, switch_id):
+        """Remove a switch from the index."""
+        with self._lock:
+            self._switches.pop(switch_id, None)
+            for token in self._tokens_by_id.pop(switch_id, ()):
+                self._discard(token, switch_id)
+
+    def _discard(self, token, switch_id):
+        ids = self._ids_by_token[token]
+        ids.discard(switch_id)
+        if not ids:
+            del self._ids_by_token[token]
+            del self._tokens[bisect_left(self._tokens, token)]
+
+    def _prefixed(self, prefix):
+        """Return the ids of switches with a token starting with prefix."""
+        ids = set()
+        position = bisect_left(self._tokens, prefix)
+        while position < len(self._tokens) and \
+                self._tokens[position].startswith(prefix):
+            ids.update(self._ids_by_token[self._tokens[position]])
+            position += 1
+        return ids
+
+    def search(self, query, limit=None):
+        """Return the switches matching a query, sorted by id.
+
+        A switch matches when the whole query is a prefix of one of its
+        tokens, or when each word of the query is. An empty query matches
+        every switch.
+        """
+        words = tokenize(query)
+        whole = str(query).lower().strip()
+        words.discard(whole)
+        with self._lock:
+            ids = self._prefixed(whole)
+            if words:
+                matches = None
+                for word in words:
+                    found = self._prefixed(word)
+                    matches = found if matches is None else matches & found
+                ids |= matches
+            switches = [self._switches[switch_id]
+                        for switch_id in sorted(ids)[:limit]]
+        return switches
+
+    def summarize(self, switch):
+        """Return the trimmed record of a switch shown in search results.
+
+        It is read from the switch attributes, since ``as_dict()`` would
+        serialize every interface.
+        """
+        summary = {'id': switch.id,
+                   'name': switch.id,
+                   'dpid': switch.dpid,
+                   'connection': get_connection(switch),
+                   'active': switch.is_active(),
+                   'enabled': switch.is_enabled()}
+        summary['metadata'] = {field: switch.metadata[field]
+                               for field in self.metadata_fields
+                               if field in switch.metadata}
+        summary['interfaces'] = len(switch.interfaces)
+        return summary
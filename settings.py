@@ -1,4 +1,130 @@
 """Settings for the Topology NApp."""
 
-# Set this option to true if you need the topology with bi-directional links
-# DISPLAY_FULL_DUPLEX_LINKS = True
+# Set this option to true if you need the topology with bi-directional links.
+# Hosts returned by v3/hosts then have a link in each direction.
+DISPLAY_FULL_DUPLEX_LINKS = False
+
+# Seconds without topology changes before a coalesced kytos/topology.updated
+# event is sent.
+TOPOLOGY_UPDATE_DEBOUNCE = 0.2
+
+# Maximum seconds a topology change may wait for its kytos/topology.updated
+# event, even if changes keep arriving.
+TOPOLOGY_UPDATE_MAX_LATENCY = 1.0
+
+# Seconds metadata changes are collected before being sent to storehouse.
+STORE_FLUSH_INTERVAL = 2.0
+
+# Number of pending metadata changes that forces an early storehouse write.
+STORE_FLUSH_MAX_PENDING = 1000
+
+# Send only the changed entries to storehouse, which merges them into the
+# stored box. Set it to False to always send the whole box instead.
+STORE_PARTIAL_UPDATES = True
+
+# Seconds to wait before retrying to load a storehouse box after an error.
+STORE_RETRY_INTERVAL = 5.0
+
+# Link metadata key holding the cost of a link in path queries. Links without
+# a non-negative number under it cost 1.
+LINK_WEIGHT_METADATA = 'weight'
+
+# Maximum number of path query results memoized between topology changes.
+PATH_CACHE_MAX_ENTRIES = 10000
+
+# Maximum number of paths, k, a v3/paths request can ask for.
+MAX_SHORTEST_PATHS = 10
+
+# Switch metadata keys indexed by v3/switches/search, besides id, dpid and
+# connection address.
+SWITCH_SEARCH_METADATA = ('name', 'description', 'city', 'network')
+
+# Default and maximum number of switches returned by v3/switches/search.
+SWITCH_SEARCH_LIMIT = 20
+SWITCH_SEARCH_MAX_LIMIT = 200
+
+# Number of recent changes kept so v3/events clients can resume after
+# reconnecting.
+FEED_HISTORY = 10000
+
+# Changes buffered for each v3/events client. Clients falling this far behind
+# are disconnected.
+FEED_CLIENT_BUFFER = 1000
+
+# Seconds between keepalive comments on idle v3/events streams.
+FEED_KEEPALIVE = 15.0
+
+# Maximum seconds a v3/events/poll request waits for changes.
+FEED_POLL_MAX_TIMEOUT = 30.0
+
+# zlib level used to compress gzip and deflate responses of the topology
+# endpoints, and the size in bytes below which bodies are sent uncompressed.
+RESPONSE_COMPRESSION_LEVEL = 6
+RESPONSE_COMPRESSION_MIN_SIZE = 1024
+
+# Seconds the cached bodies and ETags of the topology endpoints are reused at
+# most. Whether a switch is connected, its description and the speed of its
+# interfaces change without topology events, so they may be this stale. Set it
+# to None to only rebuild bodies on topology events.
+RESPONSE_CACHE_TTL = 5.0
+
+# File where a snapshot of the discovered links, interface NNI flags and admin
+# state is written, and loaded from on start. Warm start is disabled by
+# default; set it to a path writable by the controller to enable it, such as
+# '/var/lib/kytos/topology/warm_start.tsv'.
+WARM_START_FILE = None
+
+# Seconds between writes of the topology snapshot. It is only written when
+# the topology changed.
+WARM_START_INTERVAL = 60.0
+
+# Links restored from the topology snapshot at a time. The snapshot is restored
+# in the background, taking the topology lock once per switch and once per
+# batch of links.
+WARM_START_BATCH = 500
+
+# Seconds a link is kept without being confirmed by LLDP or by a link up event
+# before it is removed from the topology. Link aging is disabled by default,
+# keeping links forever; set it to a number of seconds, such as 3600.0, to
+# enable it. LLDP must then confirm links more often than that.
+LINK_AGING_TTL = None
+
+# Seconds between sweeps for expired links.
+LINK_AGING_INTERVAL = 60.0
+
+# Flap dampening of links, as in BGP route dampening. Each time a link goes
+# down adds LINK_FLAP_PENALTY to it, and the penalty halves every
+# LINK_FLAP_HALF_LIFE seconds. Links are held down once their penalty reaches
+# LINK_FLAP_SUPPRESS, until it decays below LINK_FLAP_REUSE, and for at most
+# LINK_FLAP_MAX_SUPPRESS seconds after their last flap. Dampening is disabled
+# by default; set LINK_FLAP_PENALTY to a positive penalty, such as 1000, to
+# enable it.
+LINK_FLAP_PENALTY = 0
+LINK_FLAP_SUPPRESS = 2000
+LINK_FLAP_REUSE = 750
+LINK_FLAP_HALF_LIFE = 60.0
+LINK_FLAP_MAX_SUPPRESS = 600.0
+
+# File where every event handled by this NApp is recorded, to be replayed
+# offline with `python3 -m napps.kytos.topology.benchmarks.replay`. It is
+# rotated once it reaches TRACE_MAX_BYTES, keeping TRACE_BACKUPS old files.
+# Set it to None to not record events.
+TRACE_FILE = None
+TRACE_MAX_BYTES = 64 * 2 ** 20
+TRACE_BACKUPS = 5
+
+# Count and time handlers, endpoints, response serialization and storehouse
+# requests, served by v3/stats. Profiling a handler or endpoint through
+# v3/stats/profile/<name> samples STATS_PROFILE_RATE of its calls by default.
+STATS_ENABLED = True
+STATS_PROFILE_RATE = 0.01
+
+# Seconds a host is kept without its MAC address being seen again, and
+# seconds between sweeps for idle hosts. Set HOST_AGING_TTL to None to keep
+# hosts until their interface is deleted.
+HOST_AGING_TTL = 300.0
+HOST_AGING_INTERVAL = 30.0
+
+# Host changes are sent in a single kytos/topology.hosts.changed event at most
+# every HOST_UPDATE_INTERVAL seconds.
+HOST_UPDATE_INTERVAL = 1.0
@@ -0,0 +1,113 @@
+"""Topology state shared by the event handlers and the REST endpoints.
+
+Event handlers run on the controller's thread pool and REST endpoints on
+the web server threads. Readers iterate versioned dicts, which hand out
+snapshots that never change, so whatever they got stays consistent while
+writers go on. Writers are serialized by the :func:`writer` decorator.
+"""
+from collections.abc import Mapping
+from functools import wraps
+from threading import Lock
+
+__all__ = ('VersionedDict', 'writer')
+
+
+class VersionedDict(Mapping):
+    """Dict whose iteration works on a snapshot that never changes.
+
+    Changes are made in place and in O(1), bumping a version. Lookups read
+    the live dict, since a single lookup is atomic. ``keys()``, ``values()``,
+    ``items()``, iteration and :meth:`snapshot` read the snapshot of the
+    current version, copied the first time it is needed after a change: a
+    burst of changes costs a single copy, paid by the next full read,
+    which is O(n) anyway.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._data = dict(*args, **kwargs)
+        self._snapshot = dict(self._data)
+        self._lock = Lock()
+        self.version = 0
+
+    def snapshot(self):
+        """Return the contents as of now. The dict must not be changed."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None:
+                    snapshot = self._snapshot = dict(self._data)
+        return snapshot
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def keys(self):
+        return self.snapshot().keys()
+
+    def values(self):
+        return self.snapshot().values()
+
+    def items(self):
+        return self.snapshot().items()
+
+    def _changed(self):
+        self.version += 1
+        self._snapshot = None
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._changed()
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._data[key]
+            self._changed()
+
+    def pop(self, key, *default):
+        """Remove a key and return its value, like ``dict.pop``."""
+        with self._lock:
+            value = self._data.pop(key, *default)
+            self._changed()
+        return value
+
+    def update(self, items):
+        """Add or replace many items."""
+        with self._lock:
+            self._data.update(items)
+            self._changed()
+
+    def remove(self, *keys):
+        """Remove many keys, ignoring the missing ones."""
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+            self._changed()
+
+
+def writer(method):
+    """Serialize the calls to a method changing the NApp's state.
+
+    The NApp must have a ``_write_lock``, re-entrant since writers such as
+    ``update_instance_metadata`` are called by other writers. Event handlers
+    must not call each other, since ``listen_to`` runs every call on a new
+    thread: they share private helpers called under the same lock instead.
+    """
+    @wraps(method)
+    def serialized(self, *args, **kwargs):
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+    return serialized
@@ -0,0 +1,223 @@
+"""Counters and latency histograms of the NApp's hot paths."""
+import cProfile
+import io
+import pstats
+import random
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from functools import wraps
+from threading import Lock
+from time import monotonic, perf_counter
+
+__all__ = ('Histogram', 'Stats', 'timed')
+
+#: Upper bounds in seconds of the latency histogram buckets.
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+#: Storehouse requests waiting for an answer, at most.
+_MAX_PENDING_REQUESTS = 10000
+
+
+class Histogram:
+    """Count of observations by bucket, with their sum.
+
+    Buckets are cumulative only when exported, so observing is a bisect
+    and an increment.
+    """
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Add an observation."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self):
+        """Return the count, sum and cumulative count of each bucket."""
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {'count': self.count, 'sum': round(self.sum, 6),
+                'buckets': buckets}
+
+
+class Stats:
+    """Instrumentation of handlers, endpoints, events and storehouse.
+
+    Latencies are kept by kind ('handlers', 'endpoints', 'serialization'
+    and 'storehouse') and name. Calls can also be profiled: a sample of
+    the calls of a name are run under cProfile and their stats merged.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._latencies = {}
+        self._sizes = Counter()
+        self._events = Counter()
+        self._requests = OrderedDict()
+        self._profiles = {}
+        self._load_times = {}
+
+    def observe(self, kind, name, seconds):
+        """Add the latency of a call."""
+        with self._lock:
+            histogram = self._latencies.setdefault(kind, {}).get(name)
+            if histogram is None:
+                histogram = self._latencies[kind][name] = Histogram()
+            histogram.observe(seconds)
+
+    def serialized(self, name, seconds, size):
+        """Add the time taken to build a response body and its size."""
+        self.observe('serialization', name, seconds)
+        with self._lock:
+            self._sizes[name] += size
+
+    def sent(self, event):
+        """Count an event sent by the NApp."""
+        with self._lock:
+            self._events[event.name] += 1
+
+    def request_sent(self, event):
+        """Start timing a storehouse request, answered by its callback."""
+        with self._lock:
+            self._requests[id(event)] = monotonic()
+            if len(self._requests) > _MAX_PENDING_REQUESTS:
+                self._requests.popitem(last=False)
+
+    def request_answered(self, event):
+        """Add the round-trip time of a storehouse request."""
+        with self._lock:
+            started = self._requests.pop(id(event), None)
+        if started is not None:
+            self.observe('storehouse', event.name.rsplit('.', 1)[-1],
+                         monotonic() - started)
+
+    def loaded(self, box, seconds):
+        """Record the time a storehouse box took to load since startup."""
+        with self._lock:
+            self._load_times[box] = round(seconds, 6)
+
+    def call(self, kind, name, method, *args, **kwargs):
+        """Call a method, timing it and profiling a sample of the calls."""
+        profile = self._profiles.get(name)
+        start = perf_counter()
+        try:
+            if profile is not None and random.random() < profile[0]:
+                return self._profile(name, method, *args, **kwargs)
+            return method(*args, **kwargs)
+        finally:
+            self.observe(kind, name, perf_counter() - start)
+
+    def _profile(self, name, method, *args, **kwargs):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is running in this thread.
+            return method(*args, **kwargs)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            profiler.disable()
+            with self._lock:
+                rate, collected = self._profiles.get(name, (None, None))
+                if rate is not None:
+                    if collected is None:
+                        collected = pstats.Stats(profiler)
+                    else:
+                        collected.add(profiler)
+                    self._profiles[name] = (rate, collected)
+
+    def start_profile(self, name, rate):
+        """Profile a fraction of the calls of a handler or endpoint."""
+        with self._lock:
+            self._profiles[name] = (rate, None)
+
+    def stop_profile(self, name):
+        """Stop profiling a handler or endpoint, dropping its profile."""
+        with self._lock:
+            self._profiles.pop(name, None)
+
+    def get_profile(self, name, limit=50):
+        """Return the profile collected for a name as text, or None.
+
+        Functions are sorted by cumulative time.
+        """
+        with self._lock:
+            if name not in self._profiles:
+                return None
+            collected = self._profiles[name][1]
+            if collected is None:
+                return ''
+            output = io.StringIO()
+            collected.stream = output
+            collected.sort_stats('cumulative').print_stats(limit)
+        return output.getvalue()
+
+    def as_dict(self):
+        """Return every counter and histogram."""
+        with self._lock:
+            data = {kind: {name: histogram.as_dict()
+                           for name, histogram in histograms.items()}
+                    for kind, histograms in self._latencies.items()}
+            data['payload_bytes'] = dict(self._sizes)
+            data['events_sent'] = dict(self._events)
+            data['profiling'] = {name: rate for name, (rate, _)
+                                 in self._profiles.items()}
+            data['storehouse_load_seconds'] = dict(self._load_times)
+        return data
+
+    def prometheus(self):
+        """Return every counter and histogram in Prometheus text format."""
+        data = self.as_dict()
+        lines = []
+        for kind in 'handlers', 'endpoints', 'serialization', 'storehouse':
+            metric = f'kytos_topology_{kind}_seconds'
+            lines.append(f'# TYPE {metric} histogram')
+            for name, histogram in sorted(data.get(kind, {}).items()):
+                for bound, count in histogram['buckets'].items():
+                    lines.append(f'{metric}_bucket{{name="{name}",'
+                                 f'le="{bound}"}} {count}')
+                lines.append(f'{metric}_sum{{name="{name}"}} '
+                             f'{histogram["sum"]}')
+                lines.append(f'{metric}_count{{name="{name}"}} '
+                             f'{histogram["count"]}')
+        lines.append('# TYPE kytos_topology_payload_bytes_total counter')
+        for name, size in sorted(data['payload_bytes'].items()):
+            lines.append(f'kytos_topology_payload_bytes_total'
+                         f'{{name="{name}"}} {size}')
+        lines.append('# TYPE kytos_topology_events_sent_total counter')
+        for name, count in sorted(data['events_sent'].items()):
+            lines.append(f'kytos_topology_events_sent_total'
+                         f'{{event="{name}"}} {count}')
+        lines.append('# TYPE kytos_topology_storehouse_load_seconds gauge')
+        for box, seconds in sorted(data['storehouse_load_seconds'].items()):
+            lines.append(f'kytos_topology_storehouse_load_seconds'
+                         f'{{box="{box}"}} {seconds}')
+        return '\n'.join(lines) + '\n'
+
+
+def timed(kind):
+    """Time the calls to a handler or endpoint under its name.
+
+    The NApp must have a ``_stats``, None when not instrumented.
+    """
+    def decorator(method):
+        @wraps(method)
+        def measured(self, *args, **kwargs):
+            if self._stats is None:
+                return method(self, *args, **kwargs)
+            return self._stats.call(kind, method.__name__, method, self,
+                                    *args, **kwargs)
+        return measured
+    return decorator
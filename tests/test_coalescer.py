@@ -0,0 +1,70 @@
+"""Tests of the Coalescer."""
+from threading import Thread
+from unittest import TestCase
+
+from napps.kytos.topology.coalescer import Coalescer
+
+
+class TestCoalescer(TestCase):
+    """Test the flushing of bursts."""
+
+    def test_flush(self):
+        """Pending items are handed over to the callback once."""
+        flushed = []
+        coalescer = Coalescer(flushed.append, 60, 60)
+        coalescer.add(1, 2)
+        coalescer.add(3)
+        coalescer.flush()
+        coalescer.flush()
+        self.assertEqual(flushed, [[1, 2, 3]])
+        self.assertFalse(coalescer.pending)
+
+    def test_add_nothing(self):
+        """Adding no items does not start a burst."""
+        coalescer = Coalescer(self.fail, 0, 0)
+        coalescer.add()
+        self.assertFalse(coalescer.pending)
+
+    def test_max_size(self):
+        """A burst reaching max_size is flushed right away."""
+        flushed = []
+        coalescer = Coalescer(flushed.append, 60, 60, max_size=2)
+        coalescer.add(1)
+        self.assertEqual(flushed, [])
+        coalescer.add(2)
+        self.assertEqual(flushed, [[1, 2]])
+
+    def test_unsent_items_are_kept(self):
+        """Items returned by the callback are flushed again later."""
+        ready = False
+        flushed = []
+
+        def callback(items):
+            if not ready:
+                return items
+            flushed.append(items)
+            return None
+
+        coalescer = Coalescer(callback, 60, 60)
+        coalescer.add(1)
+        coalescer.flush()
+        coalescer.add(2)
+        self.assertEqual(flushed, [])
+        ready = True
+        coalescer.flush()
+        self.assertEqual(flushed, [[1, 2]])
+
+    def test_unsent_items_over_max_size(self):
+        """Unsent items reaching max_size do not deadlock later adds."""
+        coalescer = Coalescer(lambda items: items, 60, 60, max_size=5)
+
+        def add():
+            for item in range(6):
+                coalescer.add(item)
+            coalescer.flush()
+
+        thread = Thread(target=add, daemon=True)
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(coalescer.pending)
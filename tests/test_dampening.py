@@ -0,0 +1,93 @@
+"""Tests of the flap dampening of links."""
+from unittest import TestCase
+from unittest.mock import patch
+
+from napps.kytos.topology.dampening import FlapDampener
+
+
+class TestFlapDampener(TestCase):
+    """Test penalties of 1000 suppressed at 2000, reused below 750.
+
+    Penalties halve every 60 seconds, and no link is suppressed longer
+    than 600 seconds after its last flap.
+    """
+
+    def setUp(self):
+        """Create a dampener with a clock stopped at second 0."""
+        self.dampener = FlapDampener(1000, 2000, 750, 60.0, 600.0)
+        clock = patch('napps.kytos.topology.dampening.monotonic',
+                      return_value=0.0)
+        self.clock = clock.start()
+        self.addCleanup(clock.stop)
+
+    def flap(self, times=1):
+        """Flap link 'a', returning whether it is suppressed."""
+        for _ in range(times):
+            suppressed = self.dampener.flap('a')
+        return suppressed
+
+    def wait(self, seconds):
+        """Move the clock forward."""
+        self.clock.return_value += seconds
+
+    def test_suppress(self):
+        """Links are suppressed once their penalty reaches suppress."""
+        self.assertFalse(self.flap())
+        self.assertFalse(self.dampener.is_suppressed('a'))
+        self.assertTrue(self.flap())
+        self.assertTrue(self.dampener.is_suppressed('a'))
+        self.assertEqual(self.dampener.get_state('a'), {
+            'penalty': 2000, 'flaps': 2, 'suppressed': True,
+            'reuse_in': 84.9})
+
+    def test_decay(self):
+        """Penalties halve every half life."""
+        self.flap()
+        self.wait(60)
+        self.assertEqual(self.dampener.get_state('a')['penalty'], 500)
+        self.assertFalse(self.flap())
+        self.assertEqual(self.dampener.get_state('a')['penalty'], 1500)
+
+    def test_reuse(self):
+        """Suppressed links are reused once decayed below reuse."""
+        self.flap(2)
+        reuse_in = self.dampener.reuse_in('a')
+        self.wait(reuse_in - 0.01)
+        self.assertTrue(self.dampener.is_suppressed('a'))
+        self.wait(0.02)
+        self.assertFalse(self.dampener.is_suppressed('a'))
+        self.assertEqual(self.dampener.reuse_in('a'), 0)
+
+    def test_forget(self):
+        """Links decayed below half of reuse are forgotten."""
+        self.flap()
+        self.wait(60 * 1.4)
+        self.assertIsNotNone(self.dampener.get_state('a'))
+        self.wait(60 * 0.02)
+        self.assertIsNone(self.dampener.get_state('a'))
+        self.assertEqual(self.dampener.get_states(), {})
+
+    def test_max_suppress(self):
+        """No link is suppressed longer than max_suppress seconds."""
+        self.flap(1000)
+        self.assertAlmostEqual(self.dampener.reuse_in('a'), 600)
+        self.wait(600.01)
+        self.assertFalse(self.dampener.is_suppressed('a'))
+
+    def test_release(self):
+        """Released links are forgotten, suppressed or not."""
+        self.flap(2)
+        self.dampener.flap('b')
+        self.assertEqual(set(self.dampener.get_states()), {'a', 'b'})
+        self.assertTrue(self.dampener.release('a'))
+        self.assertFalse(self.dampener.release('b'))
+        self.assertFalse(self.dampener.release('c'))
+        self.assertEqual(self.dampener.get_states(), {})
+
+    def test_disabled(self):
+        """Nothing is penalized when the penalty is 0 or None."""
+        for penalty in 0, None:
+            dampener = FlapDampener(penalty)
+            for _ in range(10):
+                self.assertFalse(dampener.flap('a'))
+            self.assertIsNone(dampener.get_state('a'))
@@ -0,0 +1,69 @@
+"""Tests of the content negotiation of the topology responses."""
+import json
+import zlib
+from unittest import TestCase, skipUnless
+
+from werkzeug.datastructures import Accept, MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from napps.kytos.topology import encoding
+from napps.kytos.topology.encoding import JSON, MSGPACK, encode_body, negotiate
+
+
+def accept(mimetypes='', encodings=''):
+    """Return the parsed Accept and Accept-Encoding headers."""
+    return (parse_accept_header(mimetypes, MIMEAccept),
+            parse_accept_header(encodings, Accept))
+
+
+class TestNegotiate(TestCase):
+    """Test choosing the mimetype and content coding of a response."""
+
+    def test_defaults(self):
+        """Without headers, JSON is sent uncompressed."""
+        self.assertEqual(negotiate(*accept()), (JSON, None))
+        self.assertEqual(negotiate(*accept('*/*', 'identity')), (JSON, None))
+
+    def test_encodings(self):
+        """The preferred content coding is chosen."""
+        self.assertEqual(negotiate(*accept(encodings='gzip')), (JSON, 'gzip'))
+        self.assertEqual(negotiate(*accept(encodings='gzip;q=0.5, deflate')),
+                         (JSON, 'deflate'))
+        self.assertEqual(negotiate(*accept(encodings='br')), (JSON, None))
+
+    @skipUnless(encoding.msgpack, 'msgpack is not installed')
+    def test_msgpack(self):
+        """MessagePack is sent to clients preferring it."""
+        for mimetype in MSGPACK, 'application/x-msgpack':
+            self.assertEqual(negotiate(*accept(f'{mimetype}, {JSON};q=0.5')),
+                             (MSGPACK, None))
+
+    @skipUnless(encoding.msgpack is None, 'msgpack is installed')
+    def test_no_msgpack(self):
+        """JSON is sent when msgpack is not installed."""
+        self.assertEqual(negotiate(*accept(MSGPACK)), (JSON, None))
+
+
+class TestEncodeBody(TestCase):
+    """Test converting and compressing JSON bodies."""
+
+    body = json.dumps({'switches': {'a': {'active': True}}}).encode()
+
+    def test_identity(self):
+        """JSON bodies are sent as they are."""
+        self.assertIs(encode_body(self.body, JSON, None), self.body)
+
+    def test_compressed(self):
+        """Bodies are compressed with the requested content coding."""
+        for coding, wbits in (('gzip', 16 + zlib.MAX_WBITS),
+                              ('deflate', zlib.MAX_WBITS)):
+            compressed = encode_body(self.body, JSON, coding, level=1)
+            self.assertEqual(zlib.decompress(compressed, wbits), self.body)
+
+    @skipUnless(encoding.msgpack, 'msgpack is not installed')
+    def test_msgpack(self):
+        """Bodies are converted to MessagePack before compressing."""
+        packed = encode_body(self.body, MSGPACK, 'gzip')
+        self.assertEqual(
+            encoding.msgpack.unpackb(zlib.decompress(packed, 31), raw=False),
+            json.loads(self.body))
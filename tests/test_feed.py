@@ -0,0 +1,93 @@
+"""Tests of the feed of topology changes."""
+from unittest import TestCase
+
+from napps.kytos.topology.feed import ChangeFeed
+
+
+class TestChangeFeed(TestCase):
+    """Test publishing, resuming and evicting subscribers."""
+
+    def setUp(self):
+        """Create a feed keeping three changes, two per subscriber."""
+        self.feed = ChangeFeed(history=3, max_pending=2)
+
+    def publish(self, count):
+        """Publish changes numbered from the current sequence."""
+        self.feed.publish(*(('changed', self.feed.sequence + number)
+                            for number in range(1, count + 1)))
+
+    @staticmethod
+    def sequences(changes):
+        """Return the sequence numbers of changes."""
+        return [change['seq'] for change in changes]
+
+    def test_publish(self):
+        """Changes are numbered and handed over to subscribers."""
+        subscriber, resumed = self.feed.subscribe()
+        self.assertTrue(resumed)
+        self.feed.publish(('a', 1), ('b', 2))
+        self.assertEqual(subscriber.get(0), [
+            {'seq': 1, 'event': 'a', 'data': 1},
+            {'seq': 2, 'event': 'b', 'data': 2}])
+        self.assertEqual(subscriber.get(0), [])
+
+    def test_resume(self):
+        """Subscribers resume from any change still in history."""
+        self.publish(5)
+        for since, missed in ((5, []), (4, [5]), (3, [4, 5])):
+            subscriber, resumed = self.feed.subscribe(since)
+            self.assertTrue(resumed, since)
+            self.assertEqual(subscriber.sequence, since)
+            self.assertEqual(self.sequences(subscriber.get(0)), missed)
+
+    def test_history_lost(self):
+        """Changes fallen out of history cannot be resumed."""
+        self.publish(5)
+        self.assertEqual(self.sequences(self.feed.get_since(1)), [3, 4, 5])
+        subscriber, resumed = self.feed.subscribe(1)
+        self.assertFalse(resumed)
+        self.assertEqual(subscriber.sequence, 5)
+        self.assertEqual(subscriber.get(0), [])
+
+    def test_too_many_missed(self):
+        """Missing more changes than a subscriber buffers is not resumed."""
+        self.publish(5)
+        subscriber, resumed = self.feed.subscribe(2)
+        self.assertFalse(resumed)
+        self.assertEqual(subscriber.get(0), [])
+
+    def test_ahead(self):
+        """Sequence numbers from a previous run cannot be resumed."""
+        self.publish(1)
+        self.assertFalse(self.feed.subscribe(2)[1])
+        self.assertTrue(ChangeFeed().subscribe(0)[1])
+        self.assertFalse(ChangeFeed().subscribe(1)[1])
+
+    def test_evict(self):
+        """Subscribers with a full buffer are evicted."""
+        subscriber, _ = self.feed.subscribe()
+        self.publish(2)
+        self.assertFalse(subscriber.evicted)
+        self.publish(1)
+        self.assertTrue(subscriber.evicted)
+        self.assertEqual(subscriber.get(1), [])
+        self.publish(1)
+        self.assertEqual(subscriber.get(0), [])
+
+    def test_close(self):
+        """Closed subscribers stop receiving changes."""
+        subscriber, _ = self.feed.subscribe()
+        subscriber.close()
+        self.publish(1)
+        self.assertEqual(subscriber.get(0), [])
+
+    def test_wait_since(self):
+        """Waiting returns the changes after a sequence number."""
+        self.assertEqual(self.feed.wait_since(0, 0), ([], True))
+        self.publish(4)
+        self.assertEqual(self.feed.wait_since(4, 0), ([], True))
+        changes, complete = self.feed.wait_since(2, 0)
+        self.assertEqual((self.sequences(changes), complete), ([3, 4], True))
+        changes, complete = self.feed.wait_since(0, 0)
+        self.assertEqual((self.sequences(changes), complete),
+                         ([2, 3, 4], False))
@@ -0,0 +1,147 @@
+"""Tests of the switch adjacency and path queries."""
+import sys
+from unittest import TestCase
+
+from kytos.core.interface import Interface
+from kytos.core.link import Link
+from kytos.core.switch import Switch
+
+from napps.kytos.topology.graph import TopologyGraph
+
+# kytos.core reads its own options from the command line whenever an entity
+# is created.
+sys.argv = sys.argv[:1]
+
+
+class TestTopologyGraph(TestCase):
+    """Test the queries over a diamond of switches a, b, c and d.
+
+    a-b and b-d cost 1, a-c costs 1 and c-d costs 2. A second a-b link
+    costs 5.
+    """
+
+    def setUp(self):
+        """Build the diamond."""
+        self.graph = TopologyGraph(max_memo=4)
+        self.switches = {}
+        self.links = {}
+        for name, switch_a, switch_b, weight in (('ab', 'a', 'b', 1),
+                                                 ('bd', 'b', 'd', 1),
+                                                 ('ac', 'a', 'c', 1),
+                                                 ('cd', 'c', 'd', 2),
+                                                 ('ab2', 'a', 'b', 5)):
+            self.links[name] = self.add_link(switch_a, switch_b, weight)
+
+    def get_switch(self, name):
+        """Return an enabled switch, creating it if needed."""
+        if name not in self.switches:
+            self.switches[name] = Switch(name)
+            self.switches[name].enable()
+        return self.switches[name]
+
+    def add_interface(self, name):
+        """Return a new enabled interface of a switch."""
+        switch = self.get_switch(name)
+        interface = Interface(f'{name}-eth{len(switch.interfaces) + 1}',
+                              len(switch.interfaces) + 1, switch)
+        interface.enable()
+        switch.update_interface(interface)
+        return interface
+
+    def add_link(self, switch_a, switch_b, weight):
+        """Add an enabled link between two switches to the graph."""
+        link = Link(self.add_interface(switch_a),
+                    self.add_interface(switch_b))
+        link.enable()
+        link.metadata['weight'] = weight
+        self.graph.add_link(link)
+        return link
+
+    def ids(self, *names):
+        """Return the ids of links by name."""
+        return [self.links[name].id for name in names]
+
+    def test_neighbors(self):
+        """Neighbors are listed with every link reaching them."""
+        self.assertEqual(self.graph.get_neighbors('a'),
+                         {'b': self.ids('ab', 'ab2'), 'c': self.ids('ac')})
+
+    def test_unusable_link(self):
+        """Disabled links and links of disabled switches are not used."""
+        self.links['ab'].disable()
+        self.switches['c'].disable()
+        self.graph.invalidate()
+        self.assertEqual(self.graph.get_neighbors('a'),
+                         {'b': self.ids('ab2')})
+        self.assertEqual(self.graph.get_reachable('a'), ['b', 'd'])
+
+    def test_reachable(self):
+        """Every switch connected through usable links is reachable."""
+        self.assertEqual(self.graph.get_reachable('a'), ['b', 'c', 'd'])
+        self.assertEqual(self.graph.get_reachable('z'), [])
+
+    def test_shortest_path(self):
+        """The cheapest path is found first."""
+        paths = self.graph.get_shortest_paths('a', 'd')
+        self.assertEqual(paths, [{'hops': ['a', 'b', 'd'],
+                                  'links': self.ids('ab', 'bd'),
+                                  'cost': 2}])
+
+    def test_k_shortest_paths(self):
+        """Loopless paths are sorted by cost, parallel links included."""
+        paths = self.graph.get_shortest_paths('a', 'd', 3)
+        self.assertEqual([(path['cost'], path['hops']) for path in paths],
+                         [(2, ['a', 'b', 'd']), (3, ['a', 'c', 'd']),
+                          (6, ['a', 'b', 'd'])])
+        self.assertEqual(paths[2]['links'], self.ids('ab2', 'bd'))
+
+    def test_fewer_paths_than_k(self):
+        """Only the existing paths are returned when k is larger."""
+        self.assertEqual(len(self.graph.get_shortest_paths('a', 'd', 10)),
+                         3)
+
+    def test_same_switch(self):
+        """The path from a switch to itself has no links."""
+        self.assertEqual(self.graph.get_shortest_paths('a', 'a', 3),
+                         [{'hops': ['a'], 'links': [], 'cost': 0}])
+
+    def test_unreachable(self):
+        """No path is found to a switch without usable links."""
+        self.get_switch('e')
+        self.assertEqual(self.graph.get_shortest_paths('a', 'e', 2), [])
+
+    def test_invalid_weights(self):
+        """Links whose weight is not a non-negative number cost 1."""
+        for weight in -1, True, 'heavy', None:
+            self.links['ab2'].metadata['weight'] = weight
+            self.assertEqual(self.graph.get_weight(self.links['ab2']), 1)
+        self.links['ab2'].metadata['weight'] = 0
+        self.assertEqual(self.graph.get_weight(self.links['ab2']), 0)
+
+    def test_memo(self):
+        """Results are memoized until the graph is invalidated."""
+        paths = self.graph.get_shortest_paths('a', 'd', 2)
+        self.assertIs(self.graph.get_shortest_paths('a', 'd', 2), paths)
+
+        self.links['ab'].metadata['weight'] = 10
+        self.assertIs(self.graph.get_shortest_paths('a', 'd', 2), paths)
+        self.graph.invalidate()
+        self.assertEqual(self.graph.get_shortest_paths('a', 'd')[0]['hops'],
+                         ['a', 'c', 'd'])
+
+    def test_memo_limit(self):
+        """The memo is emptied when it reaches max_memo entries."""
+        paths = self.graph.get_shortest_paths('a', 'd')
+        for switch in 'a', 'b', 'c', 'd':
+            self.graph.get_reachable(switch)
+        self.assertLessEqual(len(self.graph._memo), 4)
+        self.assertIsNot(self.graph.get_shortest_paths('a', 'd'), paths)
+
+    def test_remove_link(self):
+        """Removed links are no longer used, and emptied switches dropped."""
+        self.graph.remove_link(self.links['ab'])
+        self.assertEqual(self.graph.get_shortest_paths('a', 'd')[0]['links'],
+                         self.ids('ac', 'cd'))
+        for name in 'ab2', 'bd':
+            self.graph.remove_link(self.links[name])
+        self.assertNotIn('b', self.graph._adjacency)
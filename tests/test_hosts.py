@@ -0,0 +1,92 @@
+"""Tests of the table of hosts learned at the edge of the topology."""
+from unittest import TestCase
+from unittest.mock import patch
+
+from napps.kytos.topology.hosts import HostTable
+
+SWITCH_A = '00:00:00:00:00:00:00:01'
+SWITCH_B = '00:00:00:00:00:00:00:02'
+
+
+class TestHostTable(TestCase):
+    """Test learning, moving, finding and expiring hosts."""
+
+    def setUp(self):
+        """Create an empty table with a clock stopped at second 0."""
+        self.hosts = HostTable()
+        clock = patch('napps.kytos.topology.hosts.monotonic',
+                      return_value=0.0)
+        self.clock = clock.start()
+        self.addCleanup(clock.stop)
+
+    def learn(self, mac, interface_id, at=None):
+        """Learn a host, at a time if given, returning the action."""
+        if at is not None:
+            self.clock.return_value = at
+        return self.hosts.learn(mac, interface_id)[1]
+
+    @staticmethod
+    def macs(hosts):
+        """Return the MAC addresses of hosts, sorted."""
+        return sorted(host.mac for host in hosts)
+
+    def test_learn(self):
+        """Hosts are added, moved, or left as they are."""
+        self.assertEqual(self.learn('AA:00:00:00:00:01', f'{SWITCH_A}:1'),
+                         'added')
+        self.assertIsNone(self.learn('aa:00:00:00:00:01', f'{SWITCH_A}:1'))
+        self.assertEqual(self.learn('aa:00:00:00:00:01', f'{SWITCH_B}:1'),
+                         'moved')
+        host = self.hosts.get('AA:00:00:00:00:01')
+        self.assertEqual((host.mac, host.interface),
+                         ('aa:00:00:00:00:01', f'{SWITCH_B}:1'))
+        self.assertEqual(len(self.hosts), 1)
+        self.assertEqual(self.hosts.find(interface=f'{SWITCH_A}:1'), [])
+
+    def test_find(self):
+        """Hosts are found by switch, by interface or all."""
+        self.learn('aa:00:00:00:00:01', f'{SWITCH_A}:1')
+        self.learn('aa:00:00:00:00:02', f'{SWITCH_A}:2')
+        self.learn('aa:00:00:00:00:03', f'{SWITCH_B}:1')
+        self.assertEqual(self.macs(self.hosts.find()),
+                         ['aa:00:00:00:00:01', 'aa:00:00:00:00:02',
+                          'aa:00:00:00:00:03'])
+        self.assertEqual(self.macs(self.hosts.find(SWITCH_A)),
+                         ['aa:00:00:00:00:01', 'aa:00:00:00:00:02'])
+        self.assertEqual(self.macs(self.hosts.find(
+            interface=f'{SWITCH_B}:1')), ['aa:00:00:00:00:03'])
+        self.assertEqual(self.hosts.find(SWITCH_A, f'{SWITCH_B}:1'), [])
+        self.assertEqual(self.hosts.find('unknown'), [])
+
+    def test_remove(self):
+        """Hosts are removed alone or with their interface."""
+        self.learn('aa:00:00:00:00:01', f'{SWITCH_A}:1')
+        self.learn('aa:00:00:00:00:02', f'{SWITCH_A}:1')
+        self.learn('aa:00:00:00:00:03', f'{SWITCH_A}:2')
+        self.assertEqual(self.hosts.remove('AA:00:00:00:00:03').mac,
+                         'aa:00:00:00:00:03')
+        self.assertIsNone(self.hosts.remove('aa:00:00:00:00:03'))
+        self.assertEqual(self.macs(self.hosts.remove_interface(
+            f'{SWITCH_A}:1')), ['aa:00:00:00:00:01', 'aa:00:00:00:00:02'])
+        self.assertEqual(self.hosts.remove_interface(f'{SWITCH_A}:1'), [])
+        self.assertEqual(len(self.hosts), 0)
+        self.assertEqual(self.hosts.find(SWITCH_A), [])
+
+    def test_expire(self):
+        """Hosts not seen for ttl seconds expire, at the boundary too."""
+        self.learn('aa:00:00:00:00:01', f'{SWITCH_A}:1', at=0)
+        self.learn('aa:00:00:00:00:02', f'{SWITCH_A}:1', at=5)
+        self.learn('aa:00:00:00:00:03', f'{SWITCH_A}:2', at=6)
+        self.learn('aa:00:00:00:00:01', f'{SWITCH_A}:1', at=7)
+
+        self.clock.return_value = 14.99
+        self.assertEqual(self.hosts.expire(10), [])
+        self.clock.return_value = 16
+        self.assertEqual(self.macs(self.hosts.expire(10)),
+                         ['aa:00:00:00:00:02', 'aa:00:00:00:00:03'])
+        self.assertEqual(self.macs(self.hosts.find()), ['aa:00:00:00:00:01'])
+        self.assertEqual(self.hosts.find(interface=f'{SWITCH_A}:2'), [])
+        self.clock.return_value = 17
+        self.assertEqual(self.macs(self.hosts.expire(10)),
+                         ['aa:00:00:00:00:01'])
+        self.assertEqual(self.hosts.expire(10), [])
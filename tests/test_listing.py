@@ -0,0 +1,143 @@
+"""Tests of the filters, fields and pages of the list endpoints."""
+import json
+import sys
+from unittest import TestCase
+
+from kytos.core.interface import Interface
+from kytos.core.link import Link
+from kytos.core.switch import Switch
+
+from napps.kytos.topology.listing import ListQuery
+
+# kytos.core reads its own options from the command line whenever an entity
+# is created.
+sys.argv = sys.argv[:1]
+
+
+class TestFromArgs(TestCase):
+    """Test reading queries from request arguments."""
+
+    def test_arguments(self):
+        """Filters, fields and pages are read from the arguments."""
+        query = ListQuery.from_args('links', {
+            'active': 'True', 'enabled': '0', 'nni': 'false', 'switch': 'a',
+            'fields': 'id,,metadata', 'limit': '2', 'cursor': 'b'})
+        self.assertEqual(query.filters, {'active': True, 'enabled': False,
+                                         'nni': False, 'switch': 'a'})
+        self.assertEqual(query.fields, ['id', 'metadata'])
+        self.assertEqual((query.limit, query.cursor), (2, 'b'))
+
+    def test_no_arguments(self):
+        """Without arguments, everything is listed."""
+        query = ListQuery.from_args('switches', {})
+        self.assertEqual((query.filters, query.fields, query.limit,
+                          query.cursor), ({}, None, None, None))
+
+    def test_invalid(self):
+        """Invalid arguments raise ValueError."""
+        for entities, args in (('switches', {'nni': 'true'}),
+                               ('links', {'active': 'yes'}),
+                               ('links', {'limit': '0'}),
+                               ('links', {'limit': '-1'}),
+                               ('links', {'limit': 'many'})):
+            with self.assertRaises(ValueError, msg=args):
+                ListQuery.from_args(entities, args)
+
+    def test_no_pagination(self):
+        """Pages are refused where pagination is not supported."""
+        for args in {'limit': '1'}, {'cursor': 'a'}:
+            with self.assertRaises(ValueError):
+                ListQuery.from_args('links', args, paginate=False)
+
+
+class TestListQuery(TestCase):
+    """Test queries over the links of a line of switches a, b and c."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Link a to b and b to c, and enable the link a-b only."""
+        cls.switches = {name: Switch(name) for name in 'abc'}
+        cls.links = []
+        for name_a, name_b in ('a', 'b'), ('b', 'c'):
+            endpoints = []
+            for name in name_a, name_b:
+                switch = cls.switches[name]
+                port = len(switch.interfaces) + 1
+                interface = Interface(f'{name}-eth{port}', port, switch)
+                switch.update_interface(interface)
+                endpoints.append(interface)
+            cls.links.append(Link(*endpoints))
+        for obj in (cls.links[0], cls.links[0].endpoint_a,
+                    cls.links[0].endpoint_b):
+            obj.enable()
+        cls.link_ab, cls.link_bc = cls.links
+
+    def query(self, entities='links', **args):
+        """Return the query of request arguments."""
+        return ListQuery.from_args(entities, args)
+
+    def test_filters(self):
+        """Objects must pass every filter."""
+        self.assertEqual(self.query(enabled='true').apply(self.links),
+                         ([self.link_ab], None))
+        self.assertEqual(self.query(switch='c').apply(self.links),
+                         ([self.link_bc], None))
+        self.assertEqual(self.query(switch='b', enabled='false')
+                         .apply(self.links), ([self.link_bc], None))
+        self.assertEqual(self.query(switch='d').apply(self.links), ([], None))
+
+    def test_interface_filters(self):
+        """Interfaces are filtered by switch."""
+        interfaces = list(self.switches['b'].interfaces.values())
+        self.assertEqual(self.query('interfaces', switch='b')
+                         .apply(interfaces)[0], interfaces)
+        self.assertEqual(self.query('interfaces', switch='a')
+                         .apply(interfaces)[0], [])
+
+    def test_original_order(self):
+        """Without pagination, objects keep their order."""
+        links = self.links[::-1]
+        self.assertEqual(self.query().apply(links), (links, None))
+
+    def test_pages(self):
+        """Pages are sorted by id and follow the cursor."""
+        ordered = sorted(self.links, key=lambda link: link.id)
+        first, cursor = self.query(limit='1').apply(self.links)
+        self.assertEqual((first, cursor), (ordered[:1], ordered[0].id))
+        second, cursor = self.query(limit='1', cursor=cursor) \
+            .apply(self.links)
+        self.assertEqual((second, cursor), (ordered[1:], None))
+
+    def test_page_boundaries(self):
+        """A page holding the last object has no cursor."""
+        ordered = sorted(self.links, key=lambda link: link.id)
+        self.assertEqual(self.query(limit='2').apply(self.links),
+                         (ordered, None))
+        self.assertEqual(self.query(cursor=ordered[0].id).apply(self.links),
+                         (ordered[1:], None))
+        self.assertEqual(self.query(cursor=ordered[1].id).apply(self.links),
+                         ([], None))
+        self.assertEqual(self.query(cursor='').apply(self.links),
+                         (ordered, None))
+
+    def test_project(self):
+        """Only the requested fields are returned."""
+        query = self.query(fields='id,enabled,endpoint_a,unknown')
+        self.assertEqual(query.project(self.link_ab), {
+            'id': self.link_ab.id, 'enabled': True,
+            'endpoint_a': self.link_ab.endpoint_a.as_dict()})
+
+    def test_project_serialized(self):
+        """Fields not read from attributes are serialized."""
+        switch = self.switches['a']
+        query = self.query('switches', fields='dpid,name,interfaces')
+        self.assertEqual(query.project(switch), {
+            'dpid': switch.dpid, 'name': switch.as_dict()['name'],
+            'interfaces': switch.as_dict()['interfaces']})
+
+    def test_encode_fields(self):
+        """Sparse fieldsets are encoded as JSON keyed by id."""
+        query = self.query(fields='enabled')
+        self.assertEqual(json.loads(query.encode(self.links, None)),
+                         {self.link_ab.id: {'enabled': True},
+                          self.link_bc.id: {'enabled': False}})
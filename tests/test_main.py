@@ -0,0 +1,693 @@
+"""Tests of the topology NApp driven through a stand-in controller."""
+import os
+import sys
+from tempfile import TemporaryDirectory
+from threading import Event, Thread
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import patch
+
+from flask import Flask
+from kytos.core import KytosEvent
+from kytos.core.interface import Interface
+from kytos.core.switch import Switch
+
+from napps.kytos.topology import settings
+from napps.kytos.topology.benchmarks.controller import (StandInController,
+                                                        synchronous)
+from napps.kytos.topology.benchmarks.topologies import ring
+from napps.kytos.topology.warm_start import PROVISIONAL_KEY, write_snapshot
+
+#: Rounds of each thread of the concurrency tests
+ROUNDS = 200
+
+# kytos.core reads its own options from the command line whenever an entity
+# or an event is created.
+sys.argv = sys.argv[:1]
+
+
+class NAppTestCase(TestCase):
+    """Run the NApp with a ring topology, without timers."""
+
+    def setUp(self):
+        """Load the NApp into a stand-in controller."""
+        patcher = patch.multiple(settings, WARM_START_FILE=None,
+                                 LINK_AGING_TTL=None, HOST_AGING_TTL=None,
+                                 STORE_FLUSH_MAX_PENDING=5)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.topology = ring(4, 4)
+        self.controller = StandInController(self.topology.switches)
+        self.napp = self.load_napp(self.controller)
+        self.app = Flask(__name__)
+        self.events = []
+        put = self.controller.buffers.app.put
+
+        def record(event):
+            self.events.append(event)
+            put(event)
+
+        self.controller.buffers.app.put = record
+
+    def sent(self, name):
+        """Return the contents of the events sent with a name."""
+        return [event.content for event in self.events if event.name == name]
+
+    @staticmethod
+    def load_napp(controller):
+        """Return a new NApp loaded into a controller."""
+        from napps.kytos.topology.main import Main
+
+        return controller.load_napp(Main)
+
+    @staticmethod
+    def handle(napp, handler, name, **content):
+        """Hand an event to a handler of a NApp, in this thread."""
+        synchronous(napp, handler)(KytosEvent(name=name, content=content))
+
+    def discover_links(self):
+        """Connect every switch and discover the links of the topology."""
+        for switch in self.topology.switches.values():
+            self.handle(self.napp, 'handle_new_switch',
+                        'kytos/of_core.switch.new', switch=switch)
+        self.handle(self.napp, 'add_links', 'kytos/of_lldp.interface.is.nni',
+                    links=self.topology.links)
+
+    def request(self, view, *args, **kwargs):
+        """Call a REST endpoint of the NApp in a request context."""
+        with self.app.test_request_context(**kwargs):
+            return getattr(self.napp, view)(*args)
+
+
+class TestTopologyUpdates(NAppTestCase):
+    """Test the topology updated and delta events."""
+
+    def setUp(self):
+        """Discover the topology and forget the events it sent."""
+        super().setUp()
+        self.discover_links()
+        self.napp._topology_updates.flush()
+        self.events.clear()
+
+    def test_delta(self):
+        """A burst of changes is sent once, with a record per change."""
+        version = self.napp.topology_version
+        link = next(iter(self.napp.links.values()))
+        switch = link.endpoint_a.switch
+        self.napp.notify_topology_update(link, action='deactivated')
+        self.napp.notify_topology_update(switch, action='modified')
+        self.napp._topology_updates.flush()
+
+        deltas = self.sent('kytos/topology.delta')
+        self.assertEqual(len(deltas), 1)
+        self.assertEqual(deltas[0]['version'], version + 1)
+        self.assertEqual(
+            [(record['entity'], record['id'], record['action'])
+             for record in deltas[0]['changes']],
+            [('link', link.id, 'deactivated'),
+             ('switch', switch.id, 'modified')])
+        self.assertEqual(deltas[0]['changes'][0]['endpoint_a'],
+                         link.endpoint_a.id)
+
+        updates = self.sent('kytos/topology.updated')
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(updates[0]['version'], version + 1)
+        self.assertEqual(updates[0]['changes'],
+                         {'switches': [switch.id], 'interfaces': [],
+                          'links': [link.id]})
+
+    def test_versions(self):
+        """Every burst gets the next version, each id listed once."""
+        version = self.napp.topology_version
+        link = next(iter(self.napp.links.values()))
+        for _ in range(2):
+            self.napp.notify_topology_update(link)
+            self.napp.notify_topology_update(link)
+            self.napp._topology_updates.flush()
+        updates = self.sent('kytos/topology.updated')
+        self.assertEqual([update['version'] for update in updates],
+                         [version + 1, version + 2])
+        self.assertEqual(updates[1]['changes']['links'], [link.id])
+        self.assertEqual(len(self.sent('kytos/topology.delta')[1]['changes']),
+                         2)
+
+    def test_nothing_changed(self):
+        """No event is sent when nothing changed."""
+        self.napp.notify_topology_update()
+        self.napp._topology_updates.flush()
+        self.assertEqual(self.events, [])
+
+
+class TestBulk(NAppTestCase):
+    """Test the bulk enable, disable and metadata endpoints."""
+
+    def setUp(self):
+        """Pick interfaces and forget the events sent so far."""
+        super().setUp()
+        self.interfaces = self.topology.interfaces[:3]
+        self.ids = [interface.id for interface in self.interfaces]
+        self.events.clear()
+
+    def post(self, view, body, method='POST'):
+        """Call a bulk endpoint of interfaces with a JSON body."""
+        response, status = self.request(view, 'interfaces', method=method,
+                                        json=body)
+        return response.get_json(), status
+
+    def test_add_metadata(self):
+        """Metadata is added per id, with one event and one write."""
+        body = {self.ids[0]: {'color': 'red'}, self.ids[1]: {'color': 'blue'},
+                self.ids[2]: 'red', 'unknown:1': {'color': 'red'}}
+        results, status = self.post('bulk_add_metadata', body)
+        self.assertEqual(status, 200)
+        self.assertEqual({obj_id: result['code']
+                          for obj_id, result in results.items()},
+                         {self.ids[0]: 200, self.ids[1]: 200, self.ids[2]: 400,
+                          'unknown:1': 404})
+        self.assertEqual(self.interfaces[0].metadata['color'], 'red')
+        self.assertNotIn('color', self.interfaces[2].metadata)
+
+        events = self.sent('kytos/topology.interfaces.metadata.bulk_added')
+        self.assertEqual(len(events), 1)
+        self.assertEqual(set(events[0]['metadata']), set(self.ids[:2]))
+        self.assertEqual(self.sent('kytos/topology.interface.metadata.added'),
+                         [])
+        self.napp._metadata_writes.flush()
+        self.assertEqual(
+            self.napp.store_items['interfaces'].data,
+            {self.ids[0]: {'color': 'red'}, self.ids[1]: {'color': 'blue'}})
+
+    def test_delete_metadata(self):
+        """Keys are deleted per id; ids without any of them are 404."""
+        for interface in self.interfaces[:2]:
+            interface.extend_metadata({'color': 'red', 'size': 1})
+        body = {self.ids[0]: ['color'], self.ids[1]: ['missing'],
+                self.ids[2]: 'color'}
+        results, status = self.post('bulk_delete_metadata', body, 'DELETE')
+        self.assertEqual(status, 200)
+        self.assertEqual({obj_id: result['code']
+                          for obj_id, result in results.items()},
+                         {self.ids[0]: 200, self.ids[1]: 404,
+                          self.ids[2]: 400})
+        self.assertEqual(self.interfaces[0].metadata, {'size': 1})
+        self.assertEqual(
+            len(self.sent('kytos/topology.interfaces.metadata.bulk_removed')),
+            1)
+
+    def test_disable_enable(self):
+        """Entities are disabled and enabled, notified in one update."""
+        results, status = self.post('bulk_disable', self.ids + ['unknown:1'])
+        self.assertEqual(status, 200)
+        self.assertEqual(results['unknown:1']['code'], 404)
+        self.assertFalse(any(interface.is_enabled()
+                             for interface in self.interfaces))
+
+        self.post('bulk_enable', self.ids[:1])
+        self.assertTrue(self.interfaces[0].is_enabled())
+        self.assertFalse(self.interfaces[1].is_enabled())
+        self.napp._topology_updates.flush()
+        delta = self.sent('kytos/topology.delta')
+        self.assertEqual(len(delta), 1)
+        self.assertEqual([record['action'] for record in delta[0]['changes']],
+                         ['disabled'] * 3 + ['enabled'])
+
+    def test_bad_requests(self):
+        """Bodies of the wrong type and unknown entities are rejected."""
+        self.assertEqual(self.post('bulk_disable', {})[1], 400)
+        self.assertEqual(self.post('bulk_add_metadata', [])[1], 400)
+        self.assertEqual(self.post('bulk_delete_metadata', [], 'DELETE')[1],
+                         400)
+        response, status = self.request('bulk_enable', 'hosts',
+                                        method='POST', json=[])
+        self.assertEqual(status, 404)
+        self.assertEqual(self.events, [])
+
+
+class TestMetadataWrites(NAppTestCase):
+    """Test the batched metadata writes to storehouse."""
+
+    def test_box_not_loaded(self):
+        """Writes to a box not loaded yet wait for it, even when many."""
+        box = self.napp.store_items.pop('interfaces')
+        interfaces = self.topology.interfaces[:6]
+        body = {interface.id: {'color': 'red'} for interface in interfaces}
+
+        thread = Thread(target=self.request, daemon=True,
+                        args=('bulk_add_metadata', 'interfaces'),
+                        kwargs={'method': 'POST', 'json': body})
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(box.data, {})
+
+        self.napp.store_items['interfaces'] = box
+        self.napp._metadata_writes.flush()
+        self.assertEqual(box.data, {interface.id: {'color': 'red'}
+                                    for interface in interfaces})
+
+
+class TestStats(NAppTestCase):
+    """Test the stats served by v3/stats."""
+
+    def test_storehouse_load_seconds(self):
+        """The load time of every storehouse box is served."""
+        data = self.request('get_stats')[0].get_json()
+        self.assertEqual(set(data['storehouse_load_seconds']),
+                         {'switches', 'interfaces', 'links'})
+        self.assertEqual(data['storehouse_load_seconds'],
+                         {entities: round(seconds, 6) for entities, seconds
+                          in self.napp.store_load_times.items()})
+        prometheus = self.request('get_stats_prometheus').get_data(True)
+        self.assertIn('kytos_topology_storehouse_load_seconds{box="links"}',
+                      prometheus)
+
+
+class TestShortestPaths(NAppTestCase):
+    """Test the arguments of v3/paths."""
+
+    def test_k_limit(self):
+        """k must be between 1 and MAX_SHORTEST_PATHS."""
+        self.discover_links()
+        source, destination = list(self.topology.switches)[:2]
+        for k, status in ((0, 400), (1, 200),
+                          (settings.MAX_SHORTEST_PATHS, 200),
+                          (settings.MAX_SHORTEST_PATHS + 1, 400)):
+            response = self.request('get_shortest_paths', source, destination,
+                                    query_string={'k': k})
+            self.assertEqual(response[1], status, k)
+
+
+class TestLatePorts(NAppTestCase):
+    """Test the ports added after their switch connected."""
+
+    def test_ports_after_switch(self):
+        """Ports described after the switch connects are listed."""
+        switch = Switch('00:00:00:00:00:00:00:ff')
+        self.controller.switches[switch.id] = switch
+        self.handle(self.napp, 'handle_new_switch',
+                    'kytos/of_core.switch.new', switch=switch)
+        self.napp._topology_updates.flush()
+        for port in 1, 2:
+            switch.update_interface(Interface(f'eth{port}', port, switch))
+
+        response = self.request('get_interfaces', query_string='switch=' +
+                                switch.id)
+        ids = {f'{switch.id}:1', f'{switch.id}:2'}
+        self.assertEqual(set(response.get_json()['interfaces']), ids)
+
+        # Another switch changes: the snapshot is built upon the previous.
+        self.napp.notify_topology_update(
+            next(iter(self.topology.switches.values())))
+        self.napp._topology_updates.flush()
+        for interface_id in ids:
+            self.assertIn(self.napp.snapshot.index_of(interface_id),
+                          self.napp.snapshot.interfaces)
+
+
+class TestConnectionLost(NAppTestCase):
+    """Test the deactivation of a switch whose connection is lost."""
+
+    def test_links_follow_interfaces(self):
+        """Links go down and come back up with their switch, notified."""
+        self.discover_links()
+        switch = next(iter(self.topology.switches.values()))
+        interfaces = list(switch.interfaces.values())
+        links = [link for link in self.napp.links.values()
+                 if link.endpoint_a in interfaces
+                 or link.endpoint_b in interfaces]
+        self.assertTrue(links)
+
+        with patch.object(self.napp, 'notify_topology_update') as notify:
+            self.handle(self.napp, 'handle_connection_lost',
+                        'kytos/core.openflow.connection.lost',
+                        source=SimpleNamespace(switch=switch))
+        changed = notify.call_args[0]
+        self.assertEqual(notify.call_args[1], {'action': 'deactivated'})
+        self.assertEqual({obj.id for obj in changed},
+                         {obj.id for obj in [switch, *interfaces, *links]})
+        for link in links:
+            self.assertFalse(link.is_active())
+            self.assertTrue(link._active)
+
+        with patch.object(self.napp, 'notify_topology_update') as notify:
+            self.handle(self.napp, 'handle_new_switch',
+                        'kytos/of_core.switch.reconnected', switch=switch)
+        changed = notify.call_args[0]
+        self.assertEqual(notify.call_args[1], {'action': 'activated'})
+        self.assertEqual({obj.id for obj in changed},
+                         {obj.id for obj in [*interfaces, *links]})
+        for obj in interfaces + links:
+            self.assertTrue(obj.is_active(), obj.id)
+
+    def test_interfaces_down_before(self):
+        """Interfaces already down when the connection is lost stay down."""
+        self.discover_links()
+        switch = next(iter(self.topology.switches.values()))
+        down, *interfaces = list(switch.interfaces.values())
+        self.handle(self.napp, 'handle_interface_down',
+                    'kytos/of_core.switch.interface.down', interface=down)
+        self.handle(self.napp, 'handle_connection_lost',
+                    'kytos/core.openflow.connection.lost',
+                    source=SimpleNamespace(switch=switch))
+        self.handle(self.napp, 'handle_new_switch',
+                    'kytos/of_core.switch.reconnected', switch=switch)
+        self.assertFalse(down.is_active())
+        for interface in interfaces:
+            self.assertTrue(interface.is_active(), interface.id)
+
+
+class TestInterfaceEvents(NAppTestCase):
+    """Test the interface events taking links down with them."""
+
+    def test_deleted(self):
+        """A deleted interface takes its link down in the same handler."""
+        self.discover_links()
+        link = next(iter(self.napp.links.values()))
+        interface = link.endpoint_a
+        with patch.object(self.napp, 'notify_topology_update') as notify:
+            self.handle(self.napp, 'handle_interface_deleted',
+                        'kytos/of_core.switch.interface.deleted',
+                        interface=interface)
+        self.assertFalse(link.is_active())
+        self.assertEqual([(call[0], call[1]['action'])
+                          for call in notify.call_args_list],
+                         [((link,), 'deactivated'),
+                          ((interface,), 'removed')])
+        self.assertNotIn(interface.id, self.napp._interfaces)
+
+    def test_created(self):
+        """A created interface is added once, in the same handler."""
+        switch = next(iter(self.topology.switches.values()))
+        interface = Interface('eth99', 99, switch)
+        switch.update_interface(interface)
+        interface.deactivate()
+        with patch.object(self.napp, 'notify_topology_update') as notify:
+            self.handle(self.napp, 'handle_interface_created',
+                        'kytos/of_core.switch.interface.created',
+                        interface=interface)
+        self.assertTrue(interface.is_active())
+        notify.assert_called_once_with(interface, action='added')
+
+
+class TestTracing(NAppTestCase):
+    """Test recording the events handled."""
+
+    def test_recorded_under_lock(self):
+        """Writers record their events while holding the writer lock."""
+        owned = []
+        self.napp._recorder = SimpleNamespace(
+            record=lambda event: owned.append(
+                self.napp._write_lock._is_owned()))
+        switch = next(iter(self.topology.switches.values()))
+        self.handle(self.napp, 'handle_new_switch',
+                    'kytos/of_core.switch.new', switch=switch)
+        self.handle(self.napp, 'handle_interface_down',
+                    'kytos/of_core.switch.interface.down',
+                    interface=next(iter(switch.interfaces.values())))
+        self.assertEqual(owned, [True, True])
+
+
+class TestLinkAging(NAppTestCase):
+    """Test removing the links not confirmed for LINK_AGING_TTL seconds."""
+
+    def setUp(self):
+        """Discover the topology at second 100, aging links after 10."""
+        super().setUp()
+        patcher = patch.object(settings, 'LINK_AGING_TTL', 10.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.clock = patch('napps.kytos.topology.main.monotonic',
+                           return_value=100.0)
+        self.now = self.clock.start()
+        self.addCleanup(self.clock.stop)
+        self.discover_links()
+
+    def test_expire(self):
+        """Links expire once LINK_AGING_TTL seconds passed, not before."""
+        links = list(self.napp.links.values())
+        self.now.return_value = 109.9
+        self.assertEqual(self.napp.expire_links(), [])
+        self.assertEqual(len(self.request('get_link_expirations')[0]
+                             .get_json()['expirations']), len(links))
+
+        self.now.return_value = 110.0
+        self.assertEqual(set(self.napp.expire_links()), set(links))
+        self.assertEqual(len(self.napp.links), 0)
+        for link in links:
+            self.assertIsNone(link.endpoint_a.link)
+            self.assertIsNone(link.endpoint_b.link)
+        self.assertEqual(len(self.sent('kytos/topology.link.removed')),
+                         len(links))
+        self.assertEqual(self.napp.expire_links(), [])
+
+    def test_confirm(self):
+        """LLDP and link up events restart the aging of links."""
+        links = set(self.napp.links)
+        lldp = self.napp._get_link(*self.topology.links[0])
+        link_up = next(link for link in self.napp.links.values()
+                       if link is not lldp)
+        self.now.return_value = 105.0
+        self.handle(self.napp, 'add_links', 'kytos/of_lldp.interface.is.nni',
+                    links=self.topology.links[:1])
+        self.handle(self.napp, 'handle_interface_link_up',
+                    'kytos/of_core.switch.interface.link_up',
+                    interface=link_up.endpoint_a)
+        confirmed = {lldp.id, link_up.id}
+
+        self.now.return_value = 110.0
+        self.assertEqual({link.id for link in self.napp.expire_links()},
+                         links - confirmed)
+        self.assertEqual(set(self.napp.links), confirmed)
+        self.now.return_value = 115.0
+        self.assertEqual({link.id for link in self.napp.expire_links()},
+                         confirmed)
+
+    def test_disabled(self):
+        """No link expires when LINK_AGING_TTL is None."""
+        self.now.return_value = 1e6
+        with patch.object(settings, 'LINK_AGING_TTL', None):
+            self.assertEqual(self.napp.expire_links(), [])
+            self.assertEqual(self.request('get_link_expirations')[0]
+                             .get_json(), {'expirations': []})
+        self.assertTrue(self.napp.links)
+
+
+class TestDampening(NAppTestCase):
+    """Test releasing the links held down by flap dampening."""
+
+    def setUp(self):
+        """Enable dampening and discover the topology."""
+        patcher = patch.object(settings, 'LINK_FLAP_PENALTY', 1000)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
+        self.discover_links()
+        self.link = next(iter(self.napp.links.values()))
+
+    def link_event(self, state):
+        """Send a link up or link down event of the link."""
+        self.handle(self.napp, f'handle_interface_link_{state}',
+                    f'kytos/of_core.switch.interface.link_{state}',
+                    interface=self.link.endpoint_a)
+
+    def release(self, link_id):
+        """Return the status of a release request."""
+        return self.request('release_link_dampening', link_id,
+                            method='POST')[1]
+
+    def test_release(self):
+        """Suppressed links are released and activated if up."""
+        for state in 'down', 'up', 'down', 'up', 'down', 'up':
+            self.link_event(state)
+        self.assertTrue(self.link.metadata['suppressed'])
+        self.assertFalse(self.link.is_active())
+
+        self.assertEqual(self.release(self.link.id), 201)
+        self.assertNotIn('suppressed', self.link.metadata)
+        self.assertTrue(self.link.is_active())
+        self.assertEqual(self.napp._reuse_timers, {})
+        self.assertIsNone(self.napp._dampening.get_state(self.link.id))
+
+    def test_not_suppressed(self):
+        """Links not suppressed are left as they are."""
+        self.link_event('down')
+        self.link_event('up')
+        self.events.clear()
+        self.assertEqual(self.release(self.link.id), 409)
+        self.assertTrue(self.link.is_active())
+        self.assertEqual(self.events, [])
+        self.assertEqual(self.release('unknown'), 404)
+
+
+class TestConcurrency(NAppTestCase):
+    """Hammer the handlers, timers and readers from concurrent threads."""
+
+    def setUp(self):
+        """Prepare spare ports for a switch, and switch threads often."""
+        super().setUp()
+        self.discover_links()
+        self.switch = next(iter(self.topology.switches.values()))
+        self.ports = [Interface(f'spare{port}', port, self.switch)
+                      for port in range(100, 150)]
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'warm_start.tsv')
+        self.addCleanup(sys.setswitchinterval, sys.getswitchinterval())
+        sys.setswitchinterval(1e-6)
+
+    def run_threads(self, *targets):
+        """Run each target in its own thread and raise their first error.
+
+        The ports of the switch change in another thread until every target
+        ran `ROUNDS` times.
+        """
+        errors = []
+        done = Event()
+
+        def run(target, rounds):
+            try:
+                for _ in rounds:
+                    target()
+            except Exception as error:
+                errors.append(error)
+
+        churn = Thread(target=run, daemon=True,
+                       args=(self.churn_ports, iter(done.is_set, True)))
+        threads = [Thread(target=run, args=(target, range(ROUNDS)),
+                          daemon=True)
+                   for target in targets]
+        churn.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(60)
+            self.assertFalse(thread.is_alive())
+        done.set()
+        churn.join(5)
+        if errors:
+            raise errors[0]
+
+    def churn_ports(self):
+        """Add and remove ports in place, as of_core does."""
+        for interface in self.ports:
+            self.switch.update_interface(interface)
+        for interface in self.ports:
+            del self.switch.interfaces[interface.port_number]
+
+    def add_ports(self):
+        """Bring the ports up."""
+        for interface in self.ports:
+            self.handle(self.napp, 'handle_interface_up',
+                        'kytos/of_core.switch.interface.up',
+                        interface=interface)
+
+    def flap_switch(self):
+        """Lose and recover the connection of the switch."""
+        self.handle(self.napp, 'handle_connection_lost',
+                    'kytos/core.openflow.connection.lost',
+                    source=SimpleNamespace(switch=self.switch))
+        self.handle(self.napp, 'handle_new_switch',
+                    'kytos/of_core.switch.new', switch=self.switch)
+
+    def send_topology_update(self):
+        """Build the topology snapshot of a switch change, as the timer."""
+        self.napp.notify_topology_update(self.switch)
+        self.napp._topology_updates.flush()
+
+    def save_warm_start(self):
+        """Write the warm-start snapshot, as the timer."""
+        self.napp._warm_start_version = None
+        self.napp._save_warm_start()
+
+    def read(self):
+        """List the topology through the REST API."""
+        for view in ('get_topology', 'get_switches', 'get_interfaces',
+                     'get_links'):
+            self.request(view)
+
+    def test_save_warm_start(self):
+        """The snapshot file is written while ports change."""
+        with patch.object(settings, 'WARM_START_FILE', self.path):
+            self.run_threads(self.save_warm_start)
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_send_topology_update(self):
+        """The topology update is built while ports change."""
+        self.run_threads(self.send_topology_update)
+
+    def test_all(self):
+        """Handlers, timers and readers run together."""
+        with patch.object(settings, 'WARM_START_FILE', self.path):
+            self.run_threads(self.add_ports, self.flap_switch,
+                             self.send_topology_update,
+                             self.save_warm_start, self.read)
+
+
+class TestWarmStart(NAppTestCase):
+    """Test the restore of the topology snapshot."""
+
+    def setUp(self):
+        """Save the discovered topology to a snapshot file."""
+        super().setUp()
+        self.discover_links()
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'warm_start.tsv')
+        write_snapshot(self.path, 1, self.topology.switches.values(),
+                       self.napp.links.values())
+
+    def restore(self):
+        """Return a new NApp, without switches, once it restored the file."""
+        controller = StandInController()
+        with patch.object(settings, 'WARM_START_FILE', self.path):
+            napp = self.load_napp(controller)
+        self.addCleanup(napp._warm_start_timer.cancel)
+        if napp._warm_start_restore is not None:
+            napp._warm_start_restore.join(30)
+        return controller, napp
+
+    def test_restore(self):
+        """Restored interfaces and links are inactive and provisional."""
+        controller, napp = self.restore()
+        self.assertEqual(set(controller.switches),
+                         set(self.topology.switches))
+        self.assertEqual(set(napp.links), set(self.napp.links))
+        self.assertEqual(napp.provisional_links, set(napp.links))
+        self.assertEqual(len(napp.provisional_interfaces), 16)
+        for link in napp.links.values():
+            self.assertFalse(link.is_active())
+            self.assertIs(link.metadata[PROVISIONAL_KEY], True)
+            self.assertIs(link.endpoint_a.link, link)
+        for interface in napp._interfaces.values():
+            self.assertFalse(interface.is_active())
+            self.assertIs(interface.metadata[PROVISIONAL_KEY], True)
+
+    def test_confirm(self):
+        """Connected switches and LLDP confirm the restored objects."""
+        controller, napp = self.restore()
+        for switch in controller.switches.values():
+            self.handle(napp, 'handle_new_switch',
+                        'kytos/of_core.switch.new', switch=switch)
+        self.assertEqual(napp.provisional_interfaces, set())
+        for interface in napp._interfaces.values():
+            self.assertTrue(interface.is_active())
+            self.assertNotIn(PROVISIONAL_KEY, interface.metadata)
+        for link in napp.links.values():
+            self.assertTrue(link.is_active())
+
+        pairs = [(link.endpoint_a, link.endpoint_b)
+                 for link in napp.links.values()]
+        self.handle(napp, 'add_links', 'kytos/of_lldp.interface.is.nni',
+                    links=pairs)
+        self.assertEqual(napp.provisional_links, set())
+        for link in napp.links.values():
+            self.assertNotIn(PROVISIONAL_KEY, link.metadata)
+
+    def test_bad_record(self):
+        """A malformed record near the end of the file restores nothing."""
+        with open(self.path, 'a') as snapshot:
+            snapshot.write('L\tnot an interface\n')
+        controller, napp = self.restore()
+        self.assertEqual(controller.switches, {})
+        self.assertEqual(len(napp.links), 0)
+        self.assertEqual(len(napp._interfaces), 0)
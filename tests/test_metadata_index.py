@@ -0,0 +1,114 @@
+"""Tests of the inverted metadata index."""
+from types import SimpleNamespace
+from unittest import TestCase
+
+from napps.kytos.topology.metadata_index import (MetadataIndex, QueryError,
+                                                 to_number)
+
+
+class TestToNumber(TestCase):
+    """Test reading numbers from metadata values."""
+
+    def test_numbers(self):
+        """Numbers and strings with SI suffixes are read."""
+        for value, number in ((10, 10), (2.5, 2.5), ('100G', 100e9),
+                              ('1.5k', 1500), (' -3 ', -3), ('.5M', 5e5)):
+            self.assertEqual(to_number(value), number, value)
+
+    def test_not_numbers(self):
+        """Booleans, other strings and objects are not numbers."""
+        for value in True, False, '10 GB', 'fast', '', None, [1]:
+            self.assertIsNone(to_number(value), value)
+
+
+class TestMetadataIndex(TestCase):
+    """Test queries over the metadata of links."""
+
+    def setUp(self):
+        """Index links with a speed, a color and a flag."""
+        self.index = MetadataIndex(('switches', 'links'))
+        self.links = {}
+        for link_id, metadata in (('a', {'speed': '10G', 'color': 'red',
+                                         'flag': True}),
+                                  ('b', {'speed': 40e9, 'color': 'blue',
+                                         'flag': 1}),
+                                  ('c', {'speed': '100G', 'color': 'red',
+                                         'tags': ['x']}),
+                                  ('d', {'speed': '40G'})):
+            self.add(link_id, metadata)
+
+    def add(self, link_id, metadata):
+        """Index a link with its metadata."""
+        link = self.links[link_id] = SimpleNamespace(id=link_id,
+                                                     metadata=metadata)
+        self.index.update('links', link)
+
+    def query(self, **filters):
+        """Query the links."""
+        return self.index.query('links', filters)
+
+    def test_equality(self):
+        """A plain value is matched for equality."""
+        self.assertEqual(self.query(color='red'), ['a', 'c'])
+        self.assertEqual(self.query(color={'eq': 'blue'}), ['b'])
+        self.assertEqual(self.query(color='green'), [])
+
+    def test_booleans(self):
+        """Booleans do not match the numbers they compare equal to."""
+        self.assertEqual(self.query(flag=True), ['a'])
+        self.assertEqual(self.query(flag=1), ['b'])
+
+    def test_in(self):
+        """``in`` matches any of the values listed."""
+        self.assertEqual(self.query(color={'in': ['blue', 'green']}), ['b'])
+        self.assertEqual(self.query(color={'in': []}), [])
+
+    def test_ranges(self):
+        """Bounds are exclusive or inclusive, with SI suffixes."""
+        self.assertEqual(self.query(speed={'gt': '40G'}), ['c'])
+        self.assertEqual(self.query(speed={'gte': '40G'}), ['b', 'c', 'd'])
+        self.assertEqual(self.query(speed={'lt': 40e9}), ['a'])
+        self.assertEqual(self.query(speed={'lte': '40G'}), ['a', 'b', 'd'])
+        self.assertEqual(self.query(speed={'gt': '10G', 'lt': '100G'}),
+                         ['b', 'd'])
+        self.assertEqual(self.query(missing={'gt': 0}), [])
+
+    def test_every_filter(self):
+        """Objects must match every filter."""
+        self.assertEqual(self.query(color='red', speed={'gte': '50G'}), ['c'])
+        self.assertEqual(self.query(color='blue', speed={'gte': '50G'}), [])
+
+    def test_not_scalar(self):
+        """Values that are not scalars are not indexed."""
+        self.assertEqual(self.query(tags={'in': ['x']}), [])
+
+    def test_update(self):
+        """Re-indexing replaces the previous values of an object."""
+        self.links['a'].metadata = {'speed': '1G', 'color': 'blue'}
+        self.index.update('links', self.links['a'])
+        self.assertEqual(self.query(color='red'), ['c'])
+        self.assertEqual(self.query(speed={'lt': '10G'}), ['a'])
+        self.assertEqual(self.query(speed={'gte': '10G', 'lte': '10G'}), [])
+
+    def test_duplicate_numbers(self):
+        """Objects with the same number are removed one at a time."""
+        self.index.remove('links', 'b')
+        self.assertEqual(self.query(speed={'gte': '40G', 'lte': '40G'}),
+                         ['d'])
+        self.index.remove('links', 'd')
+        self.index.remove('links', 'unknown')
+        self.assertEqual(self.query(speed={'gte': 0}), ['a', 'c'])
+
+    def test_entities(self):
+        """Each kind of entity has its own index."""
+        self.assertEqual(self.index.query('switches', {'color': 'red'}), [])
+
+    def test_invalid(self):
+        """Invalid filters raise QueryError."""
+        for filters in ({}, [], {'color': {}},
+                        {'color': {'like': 'r'}},
+                        {'color': {'in': 'red'}},
+                        {'color': {'eq': ['red']}},
+                        {'speed': {'gt': 'fast'}}):
+            with self.assertRaises(QueryError, msg=filters):
+                self.index.query('links', filters)
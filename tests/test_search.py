@@ -0,0 +1,108 @@
+"""Tests of the switch search index."""
+import sys
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import patch
+
+from kytos.core.switch import Switch
+
+from napps.kytos.topology.search import SwitchSearchIndex, tokenize
+
+# kytos.core reads its own options from the command line whenever an entity
+# is created.
+sys.argv = sys.argv[:1]
+
+
+class TestTokenize(TestCase):
+    """Test the tokens of indexed values."""
+
+    def test_tokens(self):
+        """Words and the whole lowercase value are tokens."""
+        self.assertEqual(tokenize(' Core_Switch-01 '),
+                         {'core', 'switch', '01', 'core_switch-01'})
+
+    def test_empty(self):
+        """Blank values have no tokens."""
+        self.assertEqual(tokenize('  '), set())
+
+
+class TestSwitchSearchIndex(TestCase):
+    """Test searching switches by prefix."""
+
+    def setUp(self):
+        """Index three switches with names and cities."""
+        self.index = SwitchSearchIndex(('name', 'city'))
+        self.switches = {}
+        for number, name, city in ((1, 'Core One', 'Sao Paulo'),
+                                   (2, 'Core Two', 'Miami'),
+                                   (10, 'Edge', 'Sao Carlos')):
+            switch = Switch(f'00:00:00:00:00:00:00:{number:02x}')
+            switch.metadata.update({'name': name, 'city': city,
+                                    'owner': 'nobody'})
+            self.switches[number] = switch
+        self.index.update(*self.switches.values())
+
+    def search(self, query, limit=None):
+        """Return the ids of the switches found, as switch numbers."""
+        numbers = {switch.id: number
+                   for number, switch in self.switches.items()}
+        return [numbers[switch.id]
+                for switch in self.index.search(query, limit)]
+
+    def test_prefix(self):
+        """Prefixes of words match, ignoring case."""
+        self.assertEqual(self.search('co'), [1, 2])
+        self.assertEqual(self.search('MIA'), [2])
+
+    def test_dpid(self):
+        """Prefixes spanning separators match the whole dpid."""
+        self.assertEqual(self.search('00:00:00:00:00:00:00:0'), [1, 2, 10])
+        self.assertEqual(self.search('00:00:00:00:00:00:00:0a'), [10])
+
+    def test_words(self):
+        """Every word of a query must match."""
+        self.assertEqual(self.search('sao e'), [10])
+        self.assertEqual(self.search('core miami'), [2])
+        self.assertEqual(self.search('core edge'), [])
+
+    def test_empty_query(self):
+        """An empty query matches every switch, up to the limit."""
+        self.assertEqual(self.search(''), [1, 2, 10])
+        self.assertEqual(self.search('', limit=2), [1, 2])
+
+    def test_not_indexed(self):
+        """Metadata fields not indexed are not searched."""
+        self.assertEqual(self.search('nobody'), [])
+
+    def test_connection(self):
+        """The address of a switch connection is searched."""
+        self.switches[2].connection = SimpleNamespace(address='10.0.0.2',
+                                                      port=6653)
+        self.index.update(self.switches[2])
+        self.assertEqual(self.search('10.0.0'), [2])
+
+    def test_update(self):
+        """Updating a switch replaces its tokens."""
+        self.switches[1].metadata['name'] = 'Spine'
+        self.index.update(self.switches[1])
+        self.assertEqual(self.search('core'), [2])
+        self.assertEqual(self.search('spine'), [1])
+
+    def test_remove(self):
+        """Removed switches are no longer found, nor their tokens kept."""
+        self.index.remove(self.switches[2].id)
+        self.index.remove('unknown')
+        self.assertEqual(self.search('co'), [1])
+        self.assertNotIn('miami', self.index._tokens)
+
+    def test_summarize(self):
+        """Summaries are read from attributes, without serializing."""
+        switch = self.switches[1]
+        with patch.object(Switch, 'as_dict', side_effect=AssertionError):
+            summary = self.index.summarize(switch)
+        self.assertEqual(summary, {
+            'id': switch.id, 'name': switch.id, 'dpid': switch.dpid,
+            'connection': '', 'active': switch.is_active(),
+            'enabled': switch.is_enabled(),
+            'metadata': {'name': 'Core One', 'city': 'Sao Paulo'},
+            'interfaces': 0})
@@ -0,0 +1,168 @@
+"""Trace of the events handled by the NApp, to replay them offline.
+
+A trace is a text file written line by line. Its first line holds the
+format; every other line is an event:
+
+``<unix time>  <event name>  <content as JSON>``
+
+Switches, interfaces, links and connections in the content are written as
+references by their stable ids, as lists whose first item is their kind:
+
+- ``["S", <dpid>, [[<port number>, <name>], ...]]``
+- ``["I", <dpid>, <port number>, <name>]``
+- ``["L", <endpoint a reference>, <endpoint b reference>]``
+- ``["C", <switch reference>]`` for the source of a lost connection.
+
+The ``metadata`` of metadata events is written as it is.
+
+Traces are rotated once they reach a size: ``trace`` is renamed
+``trace.1``, ``trace.1`` is renamed ``trace.2`` and so on.
+"""
+import json
+import os
+from collections import deque
+from functools import wraps
+from threading import Lock
+from time import time
+
+from kytos.core.interface import Interface
+from kytos.core.link import Link
+from kytos.core.switch import Switch
+
+__all__ = ('FORMAT', 'TraceRecorder', 'encode', 'read_trace', 'recorded')
+
+#: Format name and version on the first line of each trace file.
+FORMAT = 'kytos-topology-trace/1'
+
+
+def _interface_ref(interface):
+    return ['I', interface.switch.dpid, interface.port_number, interface.name]
+
+
+def encode(content):
+    """Return the content of an event with entities replaced by references."""
+    return {key: value if key == 'metadata' else _encode(value)
+            for key, value in content.items()}
+
+
+def _encode(value):
+    if isinstance(value, Switch):
+        return ['S', value.dpid, [[interface.port_number, interface.name]
+                                  for interface in
+                                  list(value.interfaces.values())]]
+    if isinstance(value, Interface):
+        return _interface_ref(value)
+    if isinstance(value, Link):
+        return ['L', _interface_ref(value.endpoint_a),
+                _interface_ref(value.endpoint_b)]
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    switch = getattr(value, 'switch', None)
+    if isinstance(switch, Switch):
+        return ['C', _encode(switch)]
+    return value
+
+
+class TraceRecorder:
+    """Append the events handled by the NApp to a rotated trace file.
+
+    Lines are flushed as they are written, so the trace is complete up to
+    the last event if the controller dies. An event handled by more than
+    one handler is recorded once.
+    """
+
+    def __init__(self, path, max_bytes=64 * 2 ** 20, backups=5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = Lock()
+        self._recent = deque(maxlen=64)
+        self._file = None
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'a', buffering=1)
+        if self._file.tell() == 0:
+            self._file.write(f'{FORMAT}\n')
+
+    def _rotate(self):
+        self._file.close()
+        for number in range(self.backups - 1, 0, -1):
+            older = f'{self.path}.{number}'
+            if os.path.exists(older):
+                os.replace(older, f'{self.path}.{number + 1}')
+        if self.backups:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def record(self, event):
+        """Append an event to the trace, unless it was just recorded."""
+        with self._lock:
+            if any(recent is event for recent in self._recent):
+                return
+            self._recent.append(event)
+            line = (f'{time():.6f}\t{event.name}\t'
+                    f'{json.dumps(encode(event.content), default=repr)}\n')
+            if self._file is None:
+                self._open()
+            self._file.write(line)
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+
+    def close(self):
+        """Close the trace file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def recorded(handler):
+    """Record the events given to a handler if the NApp has a recorder.
+
+    The NApp must have a ``_recorder``, None when not recording. On
+    handlers that are also writers, ``writer`` goes above ``recorded`` so
+    that events are recorded while holding the lock, in the order they are
+    handled.
+    """
+    @wraps(handler)
+    def record(self, event):
+        if self._recorder is not None:
+            self._recorder.record(event)
+        return handler(self, event)
+    return record
+
+
+def _trace_files(path):
+    """Return the files of a rotated trace, oldest first."""
+    files = [path]
+    number = 1
+    while os.path.exists(f'{path}.{number}'):
+        files.append(f'{path}.{number}')
+        number += 1
+    files.reverse()
+    return [file for file in files if os.path.exists(file)]
+
+
+def read_trace(path):
+    """Yield the events of a trace and its rotated files, oldest first.
+
+    Events are yielded as (time, name, content) tuples, with content still
+    holding references. See :func:`encode`.
+
+    Raises:
+        ValueError: If a file is not a trace in a known format.
+    """
+    for file in _trace_files(path):
+        with open(file) as trace:
+            if trace.readline().rstrip('\n') != FORMAT:
+                raise ValueError(f'Unknown trace format in {file}.')
+            for line in trace:
+                if not line.endswith('\n'):
+                    break
+                timestamp, name, content = line.rstrip('\n').split('\t', 2)
+                yield float(timestamp), name, json.loads(content)
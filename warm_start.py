@@ -0,0 +1,136 @@
+"""Local snapshot of the discovered topology, used on warm restarts.
+
+The snapshot is a tab-separated text file read line by line. Its first
+line holds the format and the topology version; every other line is a
+record:
+
+- ``S  <dpid>  <enabled>``
+- ``I  <dpid>  <port number>  <name>  <nni>  <enabled>``
+- ``L  <endpoint a id>  <endpoint b id>  <enabled>``
+
+Booleans are written as ``0`` or ``1``.
+"""
+import os
+
+__all__ = ('FORMAT', 'PROVISIONAL_KEY', 'load_snapshot', 'read_snapshot',
+           'write_snapshot')
+
+#: Format name and version on the first line of the snapshot.
+FORMAT = 'kytos-topology-snapshot/1'
+
+#: Metadata key set on the interfaces and links restored from a snapshot
+#: until the network confirms them.
+PROVISIONAL_KEY = 'provisional'
+
+_BOOLEANS = {'0': False, '1': True}
+
+
+def _clean(value):
+    return str(value).replace('\t', ' ').replace('\n', ' ')
+
+
+def write_snapshot(path, version, switches, links):
+    """Write the snapshot of switches and links to a file.
+
+    The snapshot is written to a temporary file first and then renamed,
+    so readers never see a partial snapshot.
+
+    Args:
+        path (str): File to write.
+        version (int): Topology version of the snapshot.
+        switches (iterable): Switches whose admin state and interfaces are
+            saved.
+        links (iterable): Links to save.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as snapshot:
+        snapshot.write(f'{FORMAT}\t{version}\n')
+        for switch in switches:
+            snapshot.write(f'S\t{switch.id}\t{int(switch.is_enabled())}\n')
+            for interface in list(switch.interfaces.values()):
+                snapshot.write(f'I\t{switch.id}\t{interface.port_number}\t'
+                               f'{_clean(interface.name)}\t'
+                               f'{int(bool(interface.nni))}\t'
+                               f'{int(interface.is_enabled())}\n')
+        for link in links:
+            snapshot.write(f'L\t{link.endpoint_a.id}\t{link.endpoint_b.id}\t'
+                           f'{int(link.is_enabled())}\n')
+    os.replace(temporary, path)
+
+
+def read_snapshot(path):
+    """Yield the records of a snapshot file, as tuples of strings.
+
+    The first tuple has the format and the topology version.
+
+    Raises:
+        ValueError: If the file is not a snapshot in a known format.
+    """
+    with open(path) as snapshot:
+        header = snapshot.readline().rstrip('\n').split('\t')
+        if header[0] != FORMAT:
+            raise ValueError(f'Unknown snapshot format in {path}.')
+        yield tuple(header)
+        for line in snapshot:
+            yield tuple(line.rstrip('\n').split('\t'))
+
+
+def _boolean(value):
+    try:
+        return _BOOLEANS[value]
+    except KeyError:
+        raise ValueError(f'{value!r} is not 0 or 1')
+
+
+def load_snapshot(path):
+    """Read a whole snapshot file, checking every record.
+
+    Returns:
+        tuple: The topology version; the switches, as (dpid, enabled)
+        pairs; the interfaces of each switch dpid, as (port number, name,
+        nni, enabled) tuples; and the links, as (endpoint a id, endpoint b
+        id, enabled) tuples.
+
+    Raises:
+        ValueError: If the file is not a snapshot in a known format, or if
+            a record is malformed or refers to a switch or interface not
+            saved before it.
+    """
+    records = read_snapshot(path)
+    header = next(records)
+    if len(header) != 2 or not header[1].isdigit():
+        raise ValueError(f'Bad snapshot header in {path}.')
+
+    switches = []
+    interfaces = {}
+    interface_ids = set()
+    links = []
+    for number, record in enumerate(records, 2):
+        try:
+            kind, *fields = record
+            if kind == 'S':
+                dpid, enabled = fields
+                switches.append((dpid, _boolean(enabled)))
+                interfaces.setdefault(dpid, [])
+            elif kind == 'I':
+                dpid, port_number, name, nni, enabled = fields
+                if dpid not in interfaces:
+                    raise ValueError(f'unknown switch {dpid}')
+                interfaces[dpid].append((int(port_number), name,
+                                         _boolean(nni), _boolean(enabled)))
+                interface_ids.add(f'{dpid}:{int(port_number)}')
+            elif kind == 'L':
+                endpoint_a, endpoint_b, enabled = fields
+                for endpoint in endpoint_a, endpoint_b:
+                    if endpoint not in interface_ids:
+                        raise ValueError(f'unknown interface {endpoint}')
+                links.append((endpoint_a, endpoint_b, _boolean(enabled)))
+            else:
+                raise ValueError(f'unknown record {kind!r}')
+        except ValueError as error:
+            raise ValueError(f'Bad record in {path}, line {number}: '
+                             f'{error}.')
+    return int(header[1]), switches, interfaces, links